@@ -0,0 +1,99 @@
+"""Capacity-aware shelter assignment at scale.
+
+Plans 1M evacuees (household points pooled into ~500 m cells) over 10k
+shelters. Two layouts are used: shelters spread like the population, and
+shelters spread evenly around a concentrated population, where central
+shelters overflow. Then 100 shelters are closed and reopened incrementally.
+--check first compares a small instance with a global greedy over all
+(person, shelter) pairs and checks stability.
+
+Usage: python benchmarks/bench_assignment.py [--people 1000000] [--shelters 10000] [--check]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+from floodsafe.assignment import assign, bin_points, member_shelters  # noqa: E402
+from floodsafe.geometry import haversine_km  # noqa: E402
+
+
+def check(rng):
+    n, m = 3000, 60
+    lat, lon, count = rng.normal(19, .1, n), rng.normal(73, .1, n), rng.integers(1, 6, n)
+    slat, slon = rng.uniform(18.8, 19.2, m), rng.uniform(72.8, 73.2, m)
+    cap, occ = rng.integers(50, 400, m), rng.integers(0, 50, m)
+    plan = assign(lat, lon, count, slat, slon, cap, occ)
+    d = haversine_km(lat[:, None], lon[:, None], slat[None], slon[None])
+    free, left, total, placed = np.maximum(cap - occ, 0), count.copy(), 0.0, 0
+    for e in np.argsort(d, axis=None):
+        i, j = divmod(int(e), m)
+        x = min(left[i], free[j])
+        if x:
+            left[i] -= x
+            free[j] -= x
+            total += x * d[i, j]
+            placed += x
+    demand, shelter, people, km = plan.flows()
+    spare = np.maximum(cap - occ, 0) - plan.load
+    unstable = sum(bool((spare[d[i] < k - 1e-3] > 0).any()) for i, k in zip(demand, km))
+    s = plan.stats()
+    ok = s["placed"] == placed and unstable == 0 and (plan.load <= np.maximum(cap - occ, 0)).all()
+    print(f"check: mean {s['mean_km']:.3f} km vs global greedy {total / placed:.3f} km, "
+          f"{unstable} unstable splits -> {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--people", type=int, default=1_000_000)
+    ap.add_argument("--shelters", type=int, default=10_000)
+    ap.add_argument("--budget-s", type=float, default=15.0, help="full plan, worst layout")
+    ap.add_argument("--check", action="store_true")
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+    failed = args.check and not check(rng)
+
+    n, m = args.people, args.shelters
+    lat, lon = rng.normal(19.0, 0.3, n), rng.normal(73.0, 0.3, n)
+    t0 = time.perf_counter()
+    clat, clon, ccount, cell = bin_points(lat, lon)
+    print(f"binned {n:,} households into {len(clat):,} cells in {time.perf_counter() - t0:.2f} s")
+    layouts = {
+        "matched": (rng.normal(19.0, 0.3, m), rng.normal(73.0, 0.3, m)),
+        "overflow": (rng.uniform(18.0, 20.0, m), rng.uniform(72.0, 74.0, m)),
+    }
+    cap = rng.integers(50, 250, m)
+    for name, (slat, slon) in layouts.items():
+        t0 = time.perf_counter()
+        plan = assign(clat, clon, ccount, slat, slon, cap)
+        elapsed = time.perf_counter() - t0
+        s = plan.stats()
+        print(f"{name}: {elapsed:.2f} s, {s['placed']:,} placed, {s['unplaced']:,} unplaced, "
+              f"mean {s['mean_km']:.2f} km, {s['full_shelters']:,} shelters full, {s['rounds']} rounds")
+        if elapsed > args.budget_s:
+            print(f"FAIL: {elapsed:.2f} s > {args.budget_s} s")
+            failed = True
+
+    t0 = time.perf_counter()
+    homes = member_shelters(plan, cell)
+    print(f"per-household shelters: {time.perf_counter() - t0:.2f} s, "
+          f"matches plan load: {np.array_equal(np.bincount(homes[homes >= 0], minlength=m), plan.load)}")
+
+    plan = assign(clat, clon, ccount, *layouts["matched"], cap)
+    closed = rng.choice(m, 100, replace=False)
+    for label, occ in (("close", cap[closed]), ("reopen", 0)):
+        t0 = time.perf_counter()
+        plan.update_shelters(closed, occupancy=occ)
+        s = plan.stats()
+        print(f"{label} 100 shelters: {(time.perf_counter() - t0) * 1000:.0f} ms, "
+              f"mean {s['mean_km']:.3f} km, {s['unplaced']:,} unplaced")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Figure build time, serialization time and payload size vs. series length.
+
+Compares plotting a full series with plotly.express against floodsafe.charts
+(downsampled, WebGL when dense, cached by data hash). The charts columns
+should stay flat from 12 points to 500k.
+
+Usage: python benchmarks/bench_charts.py [--sizes 12,1000,50000,500000] [--naive-max 50000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from floodsafe import charts  # noqa: E402
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="12,1000,50000,500000")
+    ap.add_argument("--naive-max", type=int, default=50000, help="skip plotly.express above this many points")
+    args = ap.parse_args()
+
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    rng = np.random.default_rng(0)
+    print(f"{'points':>8} | {'px build':>9} {'px json':>8} {'px bytes':>10} | "
+          f"{'build':>7} {'cached':>7} {'json':>6} {'bytes':>8}  traces")
+    for n in map(int, args.sizes.split(",")):
+        t = np.datetime64("2024-01-01T00:00") + np.arange(n).astype("timedelta64[m]")
+        level = 4 + np.cumsum(rng.normal(0, 0.01, n))
+        rain = np.abs(rng.normal(0, 1, n)) * (rng.random(n) < 0.2)
+
+        if n <= args.naive_max:
+            fig, px_build = timed(lambda: px.line(x=t, y=level).add_bar(x=t, y=rain))
+            js, px_json = timed(fig.to_json)
+            naive = f"{px_build:>9.1f} {px_json:>8.1f} {len(js):>10,}"
+        else:
+            naive = f"{'-':>9} {'-':>8} {'-':>10}"
+
+        def build():
+            return go.Figure([charts.series_trace(t, level, "level"), charts.series_trace(t, rain, "rain", kind="bar")])
+
+        key = ("bench", charts.series_hash(level, rain))
+        charts._cache.pop(key, None)
+        _, fig_build = timed(lambda: charts._cached(key, build))
+        fig, cached = timed(lambda: charts._cached(key, build))
+        js, fig_json = timed(fig.to_json)
+        kinds = "+".join(type(tr).__name__ for tr in fig.data)
+        print(f"{n:>8,} | {naive} | {fig_build:>7.1f} {cached:>7.3f} {fig_json:>6.1f} {len(js):>8,}  {kinds}")
+
+
+if __name__ == "__main__":
+    main()
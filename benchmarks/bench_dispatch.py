@@ -0,0 +1,159 @@
+"""Dispatch 100k alerts through local stub SMS/webhook/SMTP servers.
+
+Also kills a dispatcher process mid-run and checks that a restarted one
+delivers every message (no loss across restart).
+
+Usage: python benchmarks/bench_dispatch.py [--messages 100000] [--fail-rate 0.02]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from floodsafe.dispatch import (EMAIL, SMS, WEBHOOK, Dispatcher, EmailChannel, Outbox,  # noqa: E402
+                                alert_text, sms_gateway, webhook)
+
+
+class StubHttp(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fail_rate):
+        self.fail_rate = fail_rate
+        self.received = set()
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _Handler)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if random.random() < self.server.fail_rate:
+            self.send_response(503)
+        else:
+            ids = [m["id"] for m in json.loads(body)["messages"]]
+            with self.server.lock:
+                self.server.received.update(ids)
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class StubSmtp:
+    """Just enough SMTP for smtplib.send_message; records X-Outbox-Id headers"""
+
+    def __init__(self):
+        self.received = set()
+        self.port = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait()
+
+    def _serve(self):
+        async def handle(reader, writer):
+            writer.write(b"220 stub\r\n")
+            while line := await reader.readline():
+                cmd = line[:4].upper()
+                if cmd in (b"EHLO", b"HELO"):
+                    writer.write(b"250 stub\r\n")
+                elif cmd == b"DATA":
+                    writer.write(b"354 go\r\n")
+                    while (data := await reader.readline()) != b".\r\n":
+                        if data.startswith(b"X-Outbox-Id:"):
+                            self.received.add(int(data.split(b":")[1]))
+                    writer.write(b"250 queued\r\n")
+                elif cmd == b"QUIT":
+                    writer.write(b"221 bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"250 ok\r\n")
+                await writer.drain()
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await server.serve_forever()
+
+        asyncio.run(main())
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def throughput(args, tmp):
+    sms_stub, hook_stub, smtp_stub = StubHttp(args.fail_rate), StubHttp(args.fail_rate), StubSmtp()
+    outbox = Outbox(os.path.join(tmp, "bench.sqlite3"))
+    n_email = args.messages // 20
+    n_hook = args.messages // 10
+    n_sms = args.messages - n_email - n_hook
+    text = alert_text("High", "Patna")
+    t0 = time.perf_counter()
+    outbox.enqueue(SMS, (f"+9190000{i:05d}" for i in range(n_sms)), text)
+    outbox.enqueue(WEBHOOK, (f"sub-{i}" for i in range(n_hook)), text)
+    outbox.enqueue(EMAIL, (f"user{i}@example.org" for i in range(n_email)), text, subject="Flood alert")
+    enqueue_s = time.perf_counter() - t0
+
+    channels = [sms_gateway(serve(sms_stub)), webhook(serve(hook_stub)), EmailChannel("127.0.0.1", smtp_stub.port)]
+    fast_retry = lambda attempts: 0.05 * attempts  # noqa: E731
+    t0 = time.perf_counter()
+    asyncio.run(Dispatcher(outbox, channels, backoff=fast_retry, idle_wait=0.05).run(stop_when_idle=True))
+    dispatch_s = time.perf_counter() - t0
+
+    delivered = len(sms_stub.received) + len(hook_stub.received) + len(smtp_stub.received)
+    print(f"messages: {args.messages:,} (sms {n_sms:,}, webhook {n_hook:,}, email {n_email:,})")
+    print(f"enqueue: {enqueue_s:.2f} s, dispatch: {dispatch_s:.2f} s, delivered: {delivered:,}, outbox: {outbox.counts()}")
+    return delivered == args.messages and dispatch_s < 60
+
+
+def restart(args, tmp):
+    stub = StubHttp(0.0)
+    url = serve(stub)
+    path = os.path.join(tmp, "restart.sqlite3")
+    outbox = Outbox(path)
+    n = 20_000
+    outbox.enqueue(SMS, (f"+9180000{i:05d}" for i in range(n)), "restart check")
+    proc = subprocess.Popen([sys.executable, "-m", "floodsafe.dispatch", "--outbox", path, "--sms-url", url,
+                             "--sms-concurrency", "1", "--sms-batch-size", "20", "--lease", "2"], cwd=ROOT)
+    while len(stub.received) < n // 10:
+        time.sleep(0.01)
+    proc.send_signal(signal.SIGKILL)
+    proc.wait()
+    before = len(stub.received)
+    # the killed dispatcher's in-flight batch is retried once its 2 s lease runs out
+    asyncio.run(Dispatcher(Outbox(path, lease=2), [sms_gateway(url)]).run(stop_when_idle=True))
+    ok = len(stub.received) == n
+    print(f"restart: {before:,} delivered before kill, {len(stub.received):,}/{n:,} after restart -> {'OK' if ok else 'LOST'}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=100_000)
+    ap.add_argument("--fail-rate", type=float, default=0.02, help="share of stub HTTP requests answered with 503")
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = throughput(args, tmp) & restart(args, tmp)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Scalar vs. vectorized route geometry on a (users x shelters) matrix.
+
+Usage: python benchmarks/bench_geometry.py [--pairs 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from floodsafe.geometry import route_matrix  # noqa: E402
+
+
+def scalar_route(lat1, lon1, lat2, lon2):
+    """The per-pair code path the dashboard used before the batch API"""
+    d_lon = lon2 - lon1
+    x = np.cos(np.radians(lat2)) * np.sin(np.radians(d_lon))
+    y = np.cos(np.radians(lat1)) * np.sin(np.radians(lat2)) - np.sin(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.cos(np.radians(d_lon))
+    bearing = (np.degrees(np.arctan2(x, y)) + 360) % 360
+    a = np.sin(np.radians(lat2 - lat1) / 2) ** 2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(np.radians(d_lon) / 2) ** 2
+    dist = 2 * 6371.0088 * np.arcsin(np.sqrt(a))
+    return dist, round(bearing / 45) % 8, int(dist * 2.5)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pairs", type=int, default=1_000_000)
+    ap.add_argument("--shelters", type=int, default=100)
+    ap.add_argument("--scalar-sample", type=int, default=20_000)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    n_users = args.pairs // args.shelters
+    ulat, ulon = rng.uniform(25, 27, n_users), rng.uniform(84, 88, n_users)
+    slat, slon = rng.uniform(25, 27, args.shelters), rng.uniform(84, 88, args.shelters)
+
+    t0 = time.perf_counter()
+    out = route_matrix(ulat, ulon, slat, slon)
+    vec_s = time.perf_counter() - t0
+
+    sample = min(args.scalar_sample, n_users * args.shelters)
+    t0 = time.perf_counter()
+    for k in range(sample):
+        i, j = divmod(k, args.shelters)
+        scalar_route(ulat[i], ulon[i], slat[j], slon[j])
+    scalar_s = (time.perf_counter() - t0) * (n_users * args.shelters) / sample
+
+    i, j = divmod(sample - 1, args.shelters)
+    dist, idx, eta = scalar_route(ulat[i], ulon[i], slat[j], slon[j])
+    assert np.isclose(out["distance_km"][i, j], dist) and out["direction_idx"][i, j] == idx and out["eta_min"][i, j] == eta
+
+    pairs = n_users * args.shelters
+    print(f"pairs: {pairs:,}")
+    print(f"vectorized: {vec_s:.3f} s")
+    print(f"scalar (extrapolated from {sample:,}): {scalar_s:.1f} s")
+    print(f"speedup: {scalar_s / vec_s:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
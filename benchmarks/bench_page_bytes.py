@@ -0,0 +1,110 @@
+"""Bytes the dashboard sends per rerun in each rendering mode.
+
+Runs sihproject.py under streamlit's AppTest against the local upstream
+stand-in (benchmarks/stub_upstream.py) and sums the serialized element
+protos of one rerun in normal, battery-saver and offline mode, and of the
+battery-saver rerun after clicking each of its buttons, plus the
+third-party scripts/stylesheets the page's HTML would pull in. Fails when
+any battery-saver rerun goes over the page's own budget (FLOODSAFE_LOWBAND_BUDGET,
+default floodsafe.lowband.BUDGET_BYTES), when its widgets outgrow the
+budget's FIXED_BYTES allowance, or when it loads any third-party asset or
+renders a map or chart.
+
+Usage: python benchmarks/bench_page_bytes.py
+"""
+import os
+import re
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, HERE)
+sys.path.insert(0, ROOT)
+from stub_upstream import StubUpstream  # noqa: E402
+
+EXTERNAL = re.compile(r"""(?:src|href)=["']https?://""")
+HEAVY = ("plotly_chart", "iframe", "deck_gl_json_chart")
+TEXT = ("markdown", "caption")
+
+
+def leaves(node):
+    children = getattr(node, "children", None)
+    if children:
+        for child in children.values():
+            yield from leaves(child)
+    else:
+        yield node
+
+
+def measure(at):
+    """(proto bytes, widget/heading bytes, external asset refs, heavy element types) of the last run"""
+    total, fixed, external, heavy = 0, 0, 0, []
+    for el in leaves(at._tree):
+        proto = getattr(el, "proto", None)
+        if proto is None or not hasattr(proto, "SerializeToString"):
+            continue
+        raw = proto.SerializeToString()
+        total += len(raw)
+        if getattr(el, "type", None) not in TEXT:
+            fixed += len(raw)
+        external += len(EXTERNAL.findall(raw.decode("utf-8", "ignore")))
+        if getattr(el, "type", None) in HEAVY:
+            heavy.append(el.type)
+    return total, fixed, external, heavy
+
+
+def main():
+    stub = StubUpstream().start()
+    tmp = tempfile.mkdtemp(prefix="floodsafe-bytes-")
+    os.environ.update(stub.env())
+    os.environ.update({
+        "FLOODSAFE_TRANSLATIONS_DB": os.path.join(tmp, "translations.sqlite3"),
+        "FLOODSAFE_STORE_DB": os.path.join(tmp, "store.sqlite3"),
+        "FLOODSAFE_OFFLINE_DIR": os.path.join(tmp, "offline"),
+        "FLOODSAFE_GAZETTEER_LEARNED": os.path.join(tmp, "learned.csv"),
+        "FLOODSAFE_RATE_PER_MIN": "1e9",
+    })
+    os.chdir(tmp)
+    from streamlit.testing.v1 import AppTest
+    from floodsafe.lowband import BUDGET_BYTES, FIXED_BYTES
+
+    at = AppTest.from_file(os.path.join(ROOT, "sihproject.py"), default_timeout=120)
+    modes = {}
+    at.run()
+    modes["normal"] = measure(at)
+    at.sidebar.checkbox(key="battery_saver").check().run()
+    modes["battery_saver"] = measure(at)
+    for label in [b.label for b in at.button]:
+        next(b for b in at.button if b.label == label).click().run()
+        modes["battery_saver: " + label] = measure(at)
+    at.sidebar.checkbox(key="battery_saver").uncheck()
+    at.sidebar.checkbox(key="offline_mode").check().run()
+    modes["offline"] = measure(at)
+    if at.exception:
+        sys.exit("page raised: " + at.exception[0].value)
+
+    width = max(map(len, modes))
+    print(f"{'mode':{width}} {'bytes':>9} {'widgets':>9} {'3rd-party assets':>17}  heavy elements")
+    for mode, (total, fixed, external, heavy) in modes.items():
+        print(f"{mode:{width}} {total:>9,} {fixed:>9,} {external:>17}  {', '.join(heavy) or '-'}")
+
+    problems = []
+    for mode, (total, fixed, external, heavy) in modes.items():
+        if not mode.startswith("battery_saver"):
+            continue
+        if total > BUDGET_BYTES:
+            problems.append(f"{mode} sends {total:,} bytes > budget {BUDGET_BYTES:,}")
+        if fixed > FIXED_BYTES:
+            problems.append(f"{mode} widgets take {fixed:,} bytes > allowance {FIXED_BYTES:,}")
+        if external:
+            problems.append(f"{mode} references {external} third-party asset(s)")
+        if heavy:
+            problems.append(f"{mode} renders " + ", ".join(heavy))
+    for p in problems:
+        print("FAIL: " + p)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
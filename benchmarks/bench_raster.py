@@ -0,0 +1,161 @@
+"""Zonal rainfall statistics over a synthetic nowcast grid.
+
+Writes a float32 raster (default 10k x 10k, 400 MB) with a JSON sidecar and a
+GeoJSON of jittered quadrilateral districts tiling it, then times the cell ->
+zone index build (first run) and floodsafe.raster.ingest. Reports the peak of
+Python/NumPy allocations (tracemalloc) so a regression to whole-grid loading
+shows up; memory-mapped pages are file-backed and not counted.
+--check first compares chunked results with a brute-force in-memory pass on a
+small grid.
+
+Usage: python benchmarks/bench_raster.py [--size 10000] [--districts 27] [--check]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+from floodsafe import raster  # noqa: E402
+
+LON0, LAT0, EXTENT = 80.0, 30.0, 6.0  # degrees
+
+
+def write_raster(path, size, rng, chunk_rows=500):
+    d = EXTENT / size
+    meta = {"width": size, "height": size, "dtype": "<f4", "lon0": LON0, "lat0": LAT0,
+            "dlon": d, "dlat": d, "nodata": -9999.0, "valid_time": "2024-07-28T06:00Z"}
+    # a few storm cells over light background rain
+    storms = rng.uniform(0, size, (12, 2))
+    cols = np.arange(size, dtype=np.float32)
+    with open(path, "wb") as f:
+        for r0 in range(0, size, chunk_rows):
+            rows = np.arange(r0, min(size, r0 + chunk_rows), dtype=np.float32)[:, None]
+            band = rng.gamma(0.5, 2.0, (len(rows), size)).astype(np.float32)
+            for sr, sc in storms:
+                band += 80.0 * np.exp(-((rows - sr) ** 2 + (cols - sc) ** 2) / (2 * (size / 25) ** 2))
+            band[rng.random(band.shape) < 1e-4] = -9999.0
+            band.tofile(f)
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def write_districts(path, n, rng):
+    """n x n quadrilaterals from a jittered vertex lattice, so they tile the grid"""
+    step = EXTENT / n
+    lon = LON0 + np.arange(n + 1) * step
+    lat = LAT0 - np.arange(n + 1) * step
+    vx, vy = np.meshgrid(lon, lat)
+    inner = (slice(1, -1), slice(1, -1))
+    vx[inner] += rng.uniform(-0.3, 0.3, vx[inner].shape) * step
+    vy[inner] += rng.uniform(-0.3, 0.3, vy[inner].shape) * step
+    feats = []
+    for i in range(n):
+        for j in range(n):
+            ring = [(vx[a, b], vy[a, b]) for a, b in ((i, j), (i, j + 1), (i + 1, j + 1), (i + 1, j), (i, j))]
+            feats.append({"type": "Feature", "properties": {"name": f"D{i:02d}{j:02d}"},
+                          "geometry": {"type": "Polygon", "coordinates": [[[float(x), float(y)] for x, y in ring]]}})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": feats}, f)
+
+
+def brute_force_check(tmp, rng):
+    size, n = 400, 6
+    path, gj = os.path.join(tmp, "small.bin"), os.path.join(tmp, "small.geojson")
+    write_raster(path, size, rng, chunk_rows=64)
+    write_districts(gj, n, rng)
+    r = raster.RawRaster(path)
+    index, names = raster.build_zone_index(r.grid, gj, tmp)
+    stats = raster.zonal_stats(r, index, len(names), chunk_rows=37)
+
+    # independent crossing-number test on every cell centre
+    _, polys = raster.load_districts(gj)
+    yc = LAT0 - (np.arange(size) + 0.5) * r.grid.dlat
+    xc = LON0 + (np.arange(size) + 0.5) * r.grid.dlon
+    X, Y = np.meshgrid(xc, yc)
+    expect = np.full((size, size), -1)
+    for z, rings in enumerate(polys):
+        inside = np.zeros_like(X, dtype=bool)
+        for ring in rings:
+            for (x0, y0), (x1, y1) in zip(ring[:-1], ring[1:]):
+                crosses = (y0 > Y) != (y1 > Y)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    xs = x0 + (Y - y0) * (x1 - x0) / (y1 - y0)
+                inside ^= crosses & (X < xs)
+        expect[inside] = z
+    mismatched = int(np.count_nonzero(np.asarray(index) != expect))
+    v = np.fromfile(path, dtype="<f4").reshape(size, size)
+    ok = (expect >= 0) & (v != -9999.0)
+    z, v = expect[ok], v[ok]
+    sums = np.bincount(z, weights=v, minlength=len(names))
+    maxima = np.array([v[z == k].max() for k in range(len(names))])
+    frac50 = np.bincount(z, weights=v >= 50, minlength=len(names)) / np.bincount(z, minlength=len(names))
+    good = (mismatched == 0 and np.allclose(sums, stats["sum"], rtol=1e-5)
+            and np.allclose(maxima, stats["max"]) and np.allclose(frac50, stats["exceed"][:, 2]))
+    print(f"check {size}x{size}, {len(names)} districts: {mismatched} cells mis-zoned, stats "
+          f"{'match' if good else 'DIFFER'}")
+    return good
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", type=int, default=10_000)
+    ap.add_argument("--districts", type=int, default=27, help="districts per side (27 -> 729)")
+    ap.add_argument("--budget-s", type=float, default=10.0, help="ingest time with a warm zone index")
+    ap.add_argument("--mem-budget-mb", type=float, default=200.0, help="peak allocations during ingest")
+    ap.add_argument("--check", action="store_true")
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp(prefix="floodsafe-raster-")
+    failed = False
+    try:
+        if args.check and not brute_force_check(tmp, rng):
+            failed = True
+        path, gj = os.path.join(tmp, "nowcast.bin"), os.path.join(tmp, "districts.geojson")
+        t0 = time.perf_counter()
+        write_raster(path, args.size, rng)
+        write_districts(gj, args.districts, rng)
+        print(f"wrote {args.size}x{args.size} raster ({os.path.getsize(path) / 1e6:.0f} MB) "
+              f"in {time.perf_counter() - t0:.1f} s")
+
+        out = os.path.join(tmp, "out")
+        t0 = time.perf_counter()
+        raster.ingest(path, gj, out)
+        cold = time.perf_counter() - t0
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        stats = raster.ingest(path, gj, out)
+        warm = time.perf_counter() - t0
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        print(f"ingest: {cold:.1f} s with zone index build, {warm:.1f} s with cached index; "
+              f"peak allocations {peak_mb:.0f} MB")
+
+        t0 = time.perf_counter()
+        lookups = 1000
+        pts = rng.uniform(0, EXTENT, (lookups, 2))
+        hits = sum(raster.district_rain(LAT0 - a, LON0 + b, out) is not None for a, b in pts)
+        print(f"district_rain: {(time.perf_counter() - t0) / lookups * 1e3:.3f} ms per lookup ({hits} hits)")
+        wet = stats["exceed"][:, 1] >= 0.25
+        print(f"{len(stats['count'])} districts; {int(wet.sum())} with >= 25% of area above 25 mm")
+
+        if warm > args.budget_s:
+            print(f"FAIL: ingest {warm:.1f} s > {args.budget_s} s")
+            failed = True
+        if peak_mb > args.mem_budget_mb:
+            print(f"FAIL: peak allocations {peak_mb:.0f} MB > {args.mem_budget_mb} MB")
+            failed = True
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Train the logistic risk model on synthetic data and time batch and per-location scoring.
+
+Checks 1M-cell batch inference under --batch-budget-ms and the per-location
+dashboard path (features + model) under --location-budget-ms.
+
+Usage: python benchmarks/bench_riskmodel.py [--rows 50000] [--cells 1000000]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+from floodsafe import riskmodel  # noqa: E402
+from floodsafe.risk import derive_risk_from_weather  # noqa: E402
+
+
+def synthetic_columns(n, rng):
+    cols = {
+        "rain_1h": rng.gamma(0.6, 8.0, n),
+        "forecast_6h": rng.gamma(0.8, 10.0, n),
+        "forecast_24h": rng.gamma(1.0, 25.0, n),
+        "forecast_72h": rng.gamma(1.2, 45.0, n),
+        "gauge_level": rng.normal(4.0, 0.8, n),
+        "gauge_delta_24h": rng.normal(0.0, 0.3, n),
+        "elevation_m": rng.gamma(2.0, 40.0, n),
+        "slope_deg": rng.gamma(1.5, 2.0, n),
+        "flood_prone": (rng.random(n) < 0.2).astype(np.float64),
+    }
+    for name in ("gauge_level", "gauge_delta_24h"):
+        cols[name][rng.random(n) < 0.4] = np.nan  # most places have no gauge
+    return cols
+
+
+def synthetic_labels(cols, rng):
+    """A made-up ground truth: wet, rising and low-lying means risky"""
+    z = (0.04 * cols["rain_1h"] + 0.03 * cols["forecast_24h"] + 0.01 * cols["forecast_72h"]
+         + 2.0 * np.nan_to_num(cols["gauge_delta_24h"]) - 0.015 * cols["elevation_m"]
+         + 0.8 * cols["flood_prone"] + rng.normal(0, 0.5, len(cols["rain_1h"])))
+    return np.digitize(z, [1.0, 2.5])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--cells", type=int, default=1_000_000)
+    ap.add_argument("--batch-budget-ms", type=float, default=1000.0)
+    ap.add_argument("--location-budget-ms", type=float, default=1.0)
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+
+    tmp = tempfile.mkdtemp(prefix="floodsafe-risk-")
+    train_csv = os.path.join(tmp, "train.csv")
+    cols = synthetic_columns(args.rows, rng)
+    labels = synthetic_labels(cols, rng)
+    with open(train_csv, "w", encoding="utf-8") as f:
+        f.write(",".join(riskmodel.FEATURES) + ",label\n")
+        for i in range(args.rows):
+            vals = ["" if np.isnan(cols[c][i]) else f"{cols[c][i]:.4f}" for c in riskmodel.FEATURES]
+            f.write(",".join(vals) + f",{labels[i]}\n")
+
+    model_path = os.path.join(tmp, "risk_model.npz")
+    t0 = time.perf_counter()
+    riskmodel.main(["train", train_csv, "--out", model_path])
+    print(f"train ({args.rows:,} rows): {time.perf_counter() - t0:.2f} s")
+    riskmodel.main(["evaluate", train_csv, "--model", model_path])
+
+    model = riskmodel.LogisticModel.load(model_path)
+    cells = {k: v.astype(np.float32) for k, v in synthetic_columns(args.cells, rng).items()}
+    riskmodel.score_batch(cells, model)
+    times = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        levels = riskmodel.score_batch(cells, model)
+        times.append((time.perf_counter() - t0) * 1000)
+    batch_ms = statistics.median(times)
+    print(f"batch score {args.cells:,} cells: {batch_ms:.0f} ms; levels {np.bincount(levels, minlength=3).tolist()}")
+
+    with open(os.path.join(HERE, "payloads", "openweather_forecast.json"), encoding="utf-8") as f:
+        forecast = json.load(f)
+    weather = {"city": "Patna", "rain_1h": 12.4, "temp": 29, "desc": "Moderate Rain"}
+
+    def per_location():
+        return derive_risk_from_weather(weather, riskmodel.location_features(weather, forecast, (4.6, 0.4)))
+
+    def timed_median(fn, n=2000):
+        fn()
+        ts = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            fn()
+            ts.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(ts)
+
+    riskmodel.set_model(None)
+    rules_ms = timed_median(per_location)
+    riskmodel.set_model(model)
+    model_ms = timed_median(per_location)
+    print(f"per-location: thresholds {rules_ms:.3f} ms, with model {model_ms:.3f} ms "
+          f"(+{model_ms - rules_ms:.3f} ms) -> {per_location()}")
+
+    failed = False
+    if batch_ms > args.batch_budget_ms:
+        print(f"FAIL: batch {batch_ms:.0f} ms > {args.batch_budget_ms:.0f} ms")
+        failed = True
+    if model_ms > args.location_budget_ms:
+        print(f"FAIL: per-location {model_ms:.3f} ms > {args.location_budget_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Road routing on a synthetic city extract.
+
+Writes nodes.csv/edges.csv for a jittered street grid (default 300 x 300
+nodes, with arterials, one-way streets and missing blocks) and loads it
+through floodsafe.roads. It then times:
+- the shelter forest build
+- A* routes to the three nearest shelters (what the page asks) and
+  nearest-shelter lookups
+- flood-zone updates (repair of the forest against a full rebuild)
+--check compares A* and the forest with plain Dijkstra on random queries.
+
+Usage: python benchmarks/bench_roads.py [--grid 300] [--shelters 200] [--queries 200] [--check]
+"""
+import argparse
+import heapq
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+from floodsafe import roads  # noqa: E402
+from floodsafe.spatial import GridIndex  # noqa: E402
+
+LAT0, LON0, STEP = 19.0, 72.8, 0.0009  # ~100 m blocks
+
+
+def write_extract(directory, n, rng):
+    ids = np.arange(n * n, dtype=np.int64) * 7 + 1000  # OSM-like sparse ids
+    r, c = np.divmod(np.arange(n * n), n)
+    lat = LAT0 + r * STEP + rng.normal(0, STEP * 0.15, n * n)
+    lon = LON0 + c * STEP + rng.normal(0, STEP * 0.15, n * n)
+    with open(os.path.join(directory, "nodes.csv"), "w", encoding="utf-8") as f:
+        f.write("id,lat,lon\n")
+        f.writelines(f"{i},{y:.7f},{x:.7f}\n" for i, y, x in zip(ids, lat, lon))
+    node = np.arange(n * n).reshape(n, n)
+    u = np.r_[node[:, :-1].ravel(), node[:-1, :].ravel()]
+    v = np.r_[node[:, 1:].ravel(), node[1:, :].ravel()]
+    row = np.r_[np.repeat(np.arange(n), n - 1), np.repeat(np.arange(n - 1), n)]
+    col = np.r_[np.tile(np.arange(n - 1), n), np.tile(np.arange(n), n - 1)]
+    arterial = (row % 20 == 0) | (col % 20 == 0)
+    highway = np.where(arterial, "primary", np.where(rng.random(len(u)) < 0.1, "service", "residential"))
+    oneway = np.where(~arterial & (rng.random(len(u)) < 0.15), "yes", "no")
+    keep = arterial | (rng.random(len(u)) > 0.05)
+    with open(os.path.join(directory, "edges.csv"), "w", encoding="utf-8") as f:
+        f.write("u,v,highway,oneway\n")
+        f.writelines(f"{ids[a]},{ids[b]},{h},{o}\n" for a, b, h, o in zip(u[keep], v[keep], highway[keep], oneway[keep]))
+    return lat, lon
+
+
+def dijkstra(graph, src):
+    dist = np.full(len(graph), np.inf)
+    dist[src] = 0.0
+    heap = [(0.0, src)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for e in range(graph.indptr[u], graph.indptr[u + 1]):
+            nd = d + graph.weight[e]
+            if nd < dist[graph.head[e]]:
+                dist[graph.head[e]] = nd
+                heapq.heappush(heap, (nd, int(graph.head[e])))
+    return dist
+
+
+def check(router, rng, n_queries=10):
+    g, ok = router.graph, True
+    for _ in range(n_queries):
+        src, dst = (int(x) for x in rng.integers(0, len(g), 2))
+        ref = dijkstra(g, src)
+        path, seconds = g.astar(src, dst)
+        if not np.isclose(seconds, ref[dst]):
+            print(f"check: A* {seconds:.1f} s != Dijkstra {ref[dst]:.1f} s")
+            ok = False
+        # forest: time to the nearest shelter equals the best over all shelters
+        nodes = router.trees.shelter_node[router.trees.shelter_node >= 0]
+        if not np.isclose(router.trees.dist[src], ref[nodes].min()):
+            print(f"check: forest {router.trees.dist[src]:.1f} s != {ref[nodes].min():.1f} s")
+            ok = False
+    print(f"check: A* and forest vs Dijkstra on {n_queries} sources -> {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--grid", type=int, default=300, help="nodes per side")
+    ap.add_argument("--shelters", type=int, default=200)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--query-budget-ms", type=float, default=10.0, help="median A* route to a nearby shelter")
+    ap.add_argument("--check", action="store_true")
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp(prefix="floodsafe-roads-")
+    failed = False
+    try:
+        lat, lon = write_extract(tmp, args.grid, rng)
+        t0 = time.perf_counter()
+        graph = roads.load_graph(tmp)
+        t_csv = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        graph = roads.load_graph(tmp)
+        print(f"graph: {len(graph):,} nodes, {len(graph.head):,} edges; "
+              f"from CSV {t_csv:.2f} s, from graph.npz {time.perf_counter() - t0:.2f} s")
+
+        pick = rng.choice(len(lat), args.shelters, replace=False)
+        t0 = time.perf_counter()
+        router = roads.Router(graph, lat[pick], lon[pick])
+        print(f"shelter forest ({args.shelters} shelters): {time.perf_counter() - t0:.2f} s")
+
+        # what the page asks: routes to the three nearest shelters, and the nearest by road
+        shelters = GridIndex(lat[pick], lon[pick])
+        times, near, cross = [], [], []
+        for a in rng.choice(len(lat), args.queries):
+            idx, _ = shelters.nearest_indices(lat[a], lon[a], 3)
+            for j in pick[shelters.order[idx]]:
+                t0 = time.perf_counter()
+                router.route_to(lat[a], lon[a], lat[j], lon[j])
+                times.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            router.nearest_shelter_route(lat[a], lon[a])
+            near.append((time.perf_counter() - t0) * 1000)
+        for a, b in rng.choice(len(lat), (20, 2)):
+            t0 = time.perf_counter()
+            router.route_to(lat[a], lon[a], lat[b], lon[b])
+            cross.append((time.perf_counter() - t0) * 1000)
+        astar_ms = statistics.median(times)
+        print(f"A* to the 3 nearest shelters: median {astar_ms:.1f} ms, p95 {np.percentile(times, 95):.1f} ms; "
+              f"nearest shelter by road: median {statistics.median(near):.2f} ms; "
+              f"random cross-city A*: median {statistics.median(cross):.0f} ms")
+
+        # a High and a Moderate flood zone
+        span = args.grid * STEP
+        zones = [("High", {"circle": (LAT0 + span * 0.5, LON0 + span * 0.5, span * 111_320 * 0.08)}),
+                 ("Moderate", {"polygon": [(LAT0 + span * 0.2, LON0 + span * 0.1), (LAT0 + span * 0.35, LON0 + span * 0.1),
+                                           (LAT0 + span * 0.35, LON0 + span * 0.4), (LAT0 + span * 0.2, LON0 + span * 0.4)]})]
+        t0 = time.perf_counter()
+        changed = router.set_flood_zones(zones)
+        t_update = time.perf_counter() - t0
+        repaired = router.trees.dist.copy()
+        t0 = time.perf_counter()
+        router.trees.build()
+        t_rebuild = time.perf_counter() - t0
+        same = np.allclose(repaired, router.trees.dist, equal_nan=True)
+        print(f"flood update: {changed:,} edges changed ({router.flooded:,} flooded); repair {t_update * 1000:.0f} ms "
+              f"vs rebuild {t_rebuild * 1000:.0f} ms; repaired forest {'matches' if same else 'DIFFERS'}")
+        router.set_flood_zones(zones)
+        t0 = time.perf_counter()
+        router.set_flood_zones([])
+        t_clear = time.perf_counter() - t0
+        restored = router.trees.dist.copy()
+        router.trees.build()
+        same_back = np.allclose(restored, router.trees.dist)
+        print(f"flood cleared: repair {t_clear * 1000:.0f} ms; repaired forest {'matches' if same_back else 'DIFFERS'}")
+        failed = not (same and same_back)
+        if args.check and not check(router, rng):
+            failed = True
+        if astar_ms > args.query_budget_ms:
+            print(f"FAIL: median A* {astar_ms:.1f} ms > {args.query_budget_ms} ms")
+            failed = True
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Cold-start import budget for the dashboard.
+
+Runs the module-level imports of sihproject.py (read from its AST, so the
+list never drifts) in fresh interpreters, reports the median wall time and
+the slowest modules from -X importtime, and fails when the median exceeds
+--budget-ms or when a dependency that should load lazily is imported.
+
+Usage: python benchmarks/bench_startup.py [--budget-ms 900] [--runs 5]
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PAGE = os.path.join(ROOT, "sihproject.py")
+# Only the sections that render them may import these (streamlit itself pulls in
+# plotly.graph_objects and PIL, so those are not checked)
+LAZY = ("pandas", "plotly.express", "folium", "branca", "googletrans", "streamlit_folium")
+
+
+def page_imports(path=PAGE):
+    """Source of the page's top-level import statements (nested imports are lazy by design)"""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return "\n".join(ast.get_source_segment(source, node) for node in tree.body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def run_once(imports, tmp_env):
+    probe = (
+        "import time, sys\n"
+        "t0 = time.perf_counter()\n"
+        + imports + "\n"
+        "print(round((time.perf_counter() - t0) * 1000, 2))\n"
+        "print(','.join(m for m in %r if m in sys.modules))\n" % (LAZY,)
+    )
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=ROOT, env=tmp_env,
+                         capture_output=True, text=True, check=True)
+    ms, loaded = out.stdout.splitlines()[-2:]
+    return float(ms), [m for m in loaded.split(",") if m], out.stderr
+
+
+def slowest(importtime_stderr, top=10):
+    """(cumulative us, module) for the slowest top-level imports"""
+    rows = []
+    for line in importtime_stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # top-level entries only
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-ms", type=float, default=900.0)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0")
+    imports = page_imports()
+    run_once(imports, env)  # warm the bytecode and OS file caches
+    results = [run_once(imports, env) for _ in range(args.runs)]
+    times = [r[0] for r in results]
+    median = statistics.median(times)
+    loaded = results[-1][1]
+
+    print(f"page imports: median {median:.0f} ms over {args.runs} runs (min {min(times):.0f}, max {max(times):.0f})")
+    print("slowest top-level imports:")
+    for us, name in slowest(results[-1][2]):
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if loaded:
+        print("eagerly imported (should be lazy): " + ", ".join(loaded))
+        failed = True
+    if median > args.budget_ms:
+        print(f"over budget: {median:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
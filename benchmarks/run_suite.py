@@ -0,0 +1,195 @@
+"""Microbenchmarks for the dashboard's hot paths against a local upstream stand-in.
+
+Every upstream call goes to benchmarks/stub_upstream.py (recorded OpenWeather,
+ipinfo and translate payloads with --latency-ms per request), and all SQLite
+state lives in a temporary directory. Results are written as JSON; with
+--baseline, any case whose median is more than --tolerance slower than the
+baseline's fails the run (exit status 1).
+
+Usage:
+    python benchmarks/run_suite.py --out before.json
+    python benchmarks/run_suite.py --baseline before.json [--tolerance 0.25] [--only maps]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_upstream import StubUpstream, load_payload  # noqa: E402
+
+LAT, LON = 25.5941, 85.1376
+# Differences below this are timer noise, whatever the ratio
+MIN_DELTA_MS = 0.05
+
+
+def measure(fn, min_time=0.5, max_runs=2000, min_runs=5):
+    """Per-call wall times in ms; one untimed warm-up call first"""
+    fn()
+    times = []
+    deadline = time.perf_counter() + min_time
+    while len(times) < min_runs or (len(times) < max_runs and time.perf_counter() < deadline):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    times.sort()
+    return {
+        "median_ms": round(statistics.median(times), 4),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 4),
+        "min_ms": round(times[0], 4),
+        "runs": len(times),
+    }
+
+
+def build_cases():
+    """(name, callable) pairs; imports happen here, after the environment points at the stub"""
+    import numpy as np
+
+    from floodsafe import analytics, charts, maps
+    from floodsafe.fetch import geocode_city, ip_location
+    from floodsafe.risk import derive_risk_from_weather
+    from floodsafe.routing import calculate_direction, get_evacuation_routes
+    from floodsafe.shelters import ShelterIndex, find_nearby_shelters
+    from floodsafe.translation import TRANSLATE_URL, TranslationMemo, http_backend
+    from floodsafe.weather import fetch_current_weather, fetch_forecast, get_current_weather
+
+    weather = fetch_current_weather(LAT, LON)
+    forecast = load_payload("openweather_forecast")
+    shelters = find_nearby_shelters(LAT, LON)
+
+    rng = np.random.default_rng(0)
+    n = 10_000
+    registry = ShelterIndex([f"Shelter {i}" for i in range(n)], rng.uniform(24, 27, n), rng.uniform(83, 88, n),
+                            ["School"] * n, rng.integers(100, 2000, n), rng.integers(0, 100, n))
+    slat, slon = np.array([s["lat"] for s in shelters]), np.array([s["lon"] for s in shelters])
+    labels = [s["name"] for s in shelters]
+    dense_lat, dense_lon = rng.normal(LAT, 0.05, 5000), rng.normal(LON, 0.05, 5000)
+
+    tmp = os.environ["FLOODSAFE_BENCH_TMP"]
+    memo = TranslationMemo(os.path.join(tmp, "memo.sqlite3"), backend=http_backend(TRANSLATE_URL))
+    page_strings = ["Flood risk: High", "Move to higher ground immediately.", "Nearby Shelters", "Evacuation Routes"]
+    page_strings += [f"Safety guideline {i}" for i in range(36)]
+    memo.translate_many(page_strings, "hi")
+    counter = iter(range(10 ** 9))
+
+    def fresh_batch():
+        k = next(counter)
+        memo.translate_many([f"Alert {k} line {i}" for i in range(10)], "hi")
+
+    def frame_cold():
+        analytics._frames.clear()
+        analytics.forecast_frame(forecast)
+
+    def figures():
+        # what the page pays for a new forecast: build the figures and serialize them
+        charts._cache.clear()
+        for fig in charts.forecast_figures(forecast):
+            fig.to_json()
+
+    get_current_weather(LAT, LON)
+    maps.render_map_html(LAT, LON, slat, slon, labels, "High")
+    return [
+        ("weather.fetch_current", lambda: fetch_current_weather(LAT, LON)),
+        ("weather.fetch_forecast", lambda: fetch_forecast(LAT, LON)),
+        ("weather.get_current_cached", lambda: get_current_weather(LAT, LON)),
+        ("fetch.ip_location", ip_location),
+        ("fetch.geocode_gazetteer", lambda: geocode_city("Patna", "x")),
+        ("risk.derive", lambda: derive_risk_from_weather(weather)),
+        ("shelters.find_nearby_demo", lambda: find_nearby_shelters(LAT, LON)),
+        ("shelters.registry_10k_within", lambda: registry.within(LAT, LON, 10)),
+        ("routing.evacuation_routes", lambda: get_evacuation_routes(LAT, LON, shelters)),
+        ("routing.calculate_direction", lambda: calculate_direction(LAT, LON, LAT + 0.02, LON - 0.01)),
+        ("translation.memo_hit_40", lambda: memo.translate_many(page_strings, "hi")),
+        ("translation.backend_batch_10", fresh_batch),
+        ("maps.build_render", lambda: maps.build_map(LAT, LON, slat, slon, labels, "High").get_root().render()),
+        ("maps.build_render_5k_clustered", lambda: maps.build_map(LAT, LON, dense_lat, dense_lon, [""] * 5000, "High").get_root().render()),
+        ("maps.render_cached", lambda: maps.render_map_html(LAT, LON, slat, slon, labels, "High")),
+        ("maps.static_svg", lambda: maps.render_static_svg(LAT, LON, slat, slon, "High")),
+        ("analytics.forecast_frame_cold", frame_cold),
+        ("analytics.forecast_frame_cached", lambda: analytics.forecast_frame(forecast)),
+        ("plotly.forecast_figures", figures),
+        ("plotly.forecast_figures_cached", lambda: charts.forecast_figures(forecast)),
+    ]
+
+
+def compare(results, baseline, tolerance):
+    """Print a comparison table; return the names of regressed cases"""
+    regressed = []
+    print(f"\n{'case':36} {'base ms':>10} {'now ms':>10} {'change':>8}")
+    for name, now in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:36} {'-':>10} {now['median_ms']:>10.3f} {'new':>8}")
+            continue
+        b, m = base["median_ms"], now["median_ms"]
+        change = (m - b) / b if b else 0.0
+        flag = ""
+        if m > b * (1 + tolerance) and m - b > MIN_DELTA_MS:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:36} {b:>10.3f} {m:>10.3f} {change:>+7.0%}{flag}")
+    return regressed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="stub upstream latency per request")
+    ap.add_argument("--min-time", type=float, default=0.5, help="seconds to spend on each case")
+    ap.add_argument("--only", help="run only cases whose name contains this substring")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", help="results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed median slowdown (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    stub = StubUpstream(latency_ms=args.latency_ms).start()
+    tmp = tempfile.mkdtemp(prefix="floodsafe-bench-")
+    os.environ.update(stub.env())
+    os.environ.update({
+        "FLOODSAFE_BENCH_TMP": tmp,
+        "FLOODSAFE_TRANSLATIONS_DB": os.path.join(tmp, "translations.sqlite3"),
+        "FLOODSAFE_STORE_DB": os.path.join(tmp, "store.sqlite3"),
+        "FLOODSAFE_GAZETTEER_LEARNED": os.path.join(tmp, "learned.csv"),
+        "FLOODSAFE_RATE_PER_MIN": "1e9",
+        "FLOODSAFE_RATE_BURST": "1e9",
+    })
+    os.environ.pop("FLOODSAFE_SHELTERS", None)
+
+    cases = build_cases()
+    results = {}
+    for name, fn in cases:
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(fn, args.min_time)
+        r = results[name]
+        print(f"{name:36} median {r['median_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  ({r['runs']} runs)")
+
+    doc = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "latency_ms": args.latency_ms,
+            "upstream_requests": stub.requests,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressed = compare(results, baseline, args.tolerance)
+        if regressed:
+            print(f"\n{len(regressed)} regression(s): {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Local stand-in for OpenWeather, ipinfo and a LibreTranslate-style endpoint.
+
+Replays the recorded payloads in benchmarks/payloads with a configurable
+per-request latency. Point the dashboard at it with
+
+    OPENWEATHER_BASE=http://127.0.0.1:8900
+    FLOODSAFE_GEOCODE_URL=http://127.0.0.1:8900/geo/1.0/direct
+    FLOODSAFE_IPINFO_URL=http://127.0.0.1:8900/json
+    FLOODSAFE_TRANSLATE_URL=http://127.0.0.1:8900/translate
+
+Usage: python benchmarks/stub_upstream.py [--port 8900] [--latency-ms 50]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+PAYLOADS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+
+
+def load_payload(name):
+    with open(os.path.join(PAYLOADS, name + ".json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StubUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency_ms=0.0):
+        self.latency_s = latency_ms / 1000.0
+        self.routes = {
+            "/data/2.5/weather": json.dumps(load_payload("openweather_current")).encode(),
+            "/data/2.5/forecast": json.dumps(load_payload("openweather_forecast")).encode(),
+            "/geo/1.0/direct": json.dumps(load_payload("openweather_geocode")).encode(),
+            "/json": json.dumps(load_payload("ipinfo")).encode(),
+        }
+        self.translations = load_payload("translate")
+        self.requests = 0
+        super().__init__(("127.0.0.1", port), _Handler)
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d" % self.server_address[1]
+
+    def env(self):
+        """Environment variables that point floodsafe at this server"""
+        return {
+            "OPENWEATHER_BASE": self.base_url,
+            "FLOODSAFE_GEOCODE_URL": self.base_url + "/geo/1.0/direct",
+            "FLOODSAFE_IPINFO_URL": self.base_url + "/json",
+            "FLOODSAFE_TRANSLATE_URL": self.base_url + "/translate",
+        }
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="stub-upstream", daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; without this, delayed ACKs add ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.requests += 1
+        body = self.server.routes.get(urlsplit(self.path).path)
+        self._reply(body)
+
+    def do_POST(self):
+        self.server.requests += 1
+        req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if urlsplit(self.path).path != "/translate":
+            return self._reply(None)
+        known = self.server.translations.get(req["target"], {})
+        # unrecorded strings come back tagged, line by line, like a real batch
+        out = "\n".join(known.get(line, "[%s] %s" % (req["target"], line)) for line in req["q"].split("\n"))
+        self._reply(json.dumps({"translatedText": out}, ensure_ascii=False).encode())
+
+    def _reply(self, body):
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        if body is None:
+            self.send_response(404)
+            body = b"{}"
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--latency-ms", type=float, default=50.0)
+    args = ap.parse_args()
+    server = StubUpstream(args.port, args.latency_ms)
+    for k, v in server.env().items():
+        print("%s=%s" % (k, v))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""FloodSafe helpers shared across Streamlit sessions (caches, data layers)."""
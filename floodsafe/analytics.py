@@ -0,0 +1,111 @@
+"""Forecast analytics over the full OpenWeather 5-day / 3-hour horizon.
+
+Forecast payloads are parsed once into a columnar frame (cached per payload
+hash). The accumulation, peak and binning helpers work on the last axis of
+any array, so the same code scores one location (time,) or many at once
+(locations x time).
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+SLOT_HOURS = 3
+WINDOWS_H = (6, 24, 72)
+
+# (label, lower bound mm, upper bound mm) per 3h slot, as shown in the intensity pie
+RAIN_BINS = (
+    ("High (>=5mm)", 5.0, np.inf),
+    ("Medium (1-5mm)", 1.0, 5.0),
+    ("Low (0mm)", 0.0, 0.0),
+)
+
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+_FRAMES_SIZE = 256
+
+
+def payload_hash(payload):
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def forecast_columns(payload):
+    """Column arrays (time, rain_mm, temp) for every slot in a forecast payload"""
+    points = payload.get("list", [])
+    dt = [p["dt"] for p in points]
+    return {
+        "time": [datetime.fromtimestamp(t) for t in dt],
+        "rain_mm": np.fromiter((p.get("rain", {}).get("3h", 0) for p in points), dtype=np.float64, count=len(points)),
+        "temp": np.fromiter((p["main"]["temp"] for p in points), dtype=np.float64, count=len(points)),
+    }
+
+
+def forecast_frame(payload):
+    """Parsed full-horizon DataFrame with rolling accumulations; cached per payload hash.
+
+    The returned frame is shared between sessions: treat it as read-only.
+    """
+    import pandas as pd
+    key = payload_hash(payload)
+    with _frames_lock:
+        df = _frames.get(key)
+        if df is not None:
+            _frames.move_to_end(key)
+            return df
+    cols = forecast_columns(payload)
+    df = pd.DataFrame(cols)
+    for hours, acc in rolling_accumulations(cols["rain_mm"]).items():
+        df[f"rain_{hours}h"] = acc
+    with _frames_lock:
+        _frames[key] = df
+        while len(_frames) > _FRAMES_SIZE:
+            _frames.popitem(last=False)
+    return df
+
+
+def stack_rain(payloads):
+    """(locations x time) rain array from many forecast payloads, zero-padded to equal length"""
+    rows = [forecast_columns(p)["rain_mm"] for p in payloads]
+    out = np.zeros((len(rows), max((len(r) for r in rows), default=0)))
+    for i, r in enumerate(rows):
+        out[i, :len(r)] = r
+    return out
+
+
+def rolling_accumulations(rain, windows_h=WINDOWS_H, slot_hours=SLOT_HOURS):
+    """Trailing rainfall sums over each window (hours), along the last axis.
+
+    Uses one cumulative sum per call; early slots sum over what is available.
+    """
+    rain = np.nan_to_num(np.asarray(rain, dtype=np.float64))
+    cs = np.cumsum(rain, axis=-1)
+    cs = np.concatenate([np.zeros(cs.shape[:-1] + (1,)), cs], axis=-1)
+    n = rain.shape[-1]
+    idx = np.arange(1, n + 1)
+    out = {}
+    for hours in windows_h:
+        w = max(1, int(hours // slot_hours))
+        out[hours] = cs[..., idx] - cs[..., np.maximum(idx - w, 0)]
+    return out
+
+
+def peak_intensity(rain, slot_hours=SLOT_HOURS):
+    """(slot index, mm/h) of the wettest slot along the last axis"""
+    rain = np.nan_to_num(np.asarray(rain, dtype=np.float64))
+    if rain.shape[-1] == 0:
+        return np.zeros(rain.shape[:-1], dtype=np.int64), np.zeros(rain.shape[:-1])
+    i = np.argmax(rain, axis=-1)
+    return i, np.take_along_axis(rain, i[..., None], axis=-1)[..., 0] / slot_hours
+
+
+def rain_bin_counts(rain):
+    """Slot counts per RAIN_BINS entry along the last axis (shape: ... x len(RAIN_BINS))"""
+    rain = np.nan_to_num(np.asarray(rain, dtype=np.float64))
+    counts = []
+    for _, lo, hi in RAIN_BINS:
+        mask = (rain == lo) if lo == hi else (rain >= lo) & (rain < hi)
+        counts.append(np.count_nonzero(mask, axis=-1))
+    return np.stack(counts, axis=-1)
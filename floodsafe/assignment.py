@@ -0,0 +1,378 @@
+"""Capacity-aware assignment of evacuees to shelters.
+
+Demand is a set of points with a head count each (households, or population
+grid cells). Each point gets its k nearest shelters as candidates
+(GridIndex.nearest_batch). People are then placed in proposal rounds, a
+capacitated deferred acceptance: every unplaced group proposes to its next
+candidate, and each shelter keeps its nearest proposers and current holders
+up to its free capacity. A group can be split across shelters. The rest are
+rejected and move on to their next candidate. Every round is a handful of
+sorts and cumulative sums over arrays, with no per-person Python.
+
+The result is stable: nobody is left farther away than necessary while a
+nearer shelter on their list has room or holds someone who lives farther
+away. Groups that run out of candidates get fresh ones, chosen among the
+shelters that still have space.
+
+update_shelters() re-plans only what a capacity or occupancy change affects.
+If a shelter is over-full, its farthest groups move on. If a shelter gains
+room, groups that would rather be there propose again.
+
+FLOODSAFE_POPULATION (CSV: lat, lon[, count]) with the shelter registry
+(FLOODSAFE_SHELTERS) gives the process-wide plan the dashboard uses. When the
+registry file is updated, the shelters whose capacity or occupancy changed
+are fed to update_shelters(); a different set of shelters means a new plan.
+"""
+import os
+import threading
+
+import numpy as np
+
+from floodsafe.spatial import GridIndex
+
+POPULATION_PATH = os.environ.get("FLOODSAFE_POPULATION")
+
+CANDIDATES = 8
+MAX_STAGES = 32
+# Households are pooled into cells of about 500 m before planning
+BIN_DEG = 0.005
+
+
+class Assignment:
+    def __init__(self, demand_lat, demand_lon, demand_count, shelter_lat, shelter_lon, capacity,
+                 occupancy=None, k=CANDIDATES, max_km=100.0):
+        self.demand_lat = np.asarray(demand_lat, dtype=np.float64)
+        self.demand_lon = np.asarray(demand_lon, dtype=np.float64)
+        self.demand_count = np.asarray(demand_count, dtype=np.int64)
+        self.shelter_lat = np.asarray(shelter_lat, dtype=np.float64)
+        self.shelter_lon = np.asarray(shelter_lon, dtype=np.float64)
+        self.capacity = np.asarray(capacity, dtype=np.int64).copy()
+        self.occupancy = (np.zeros_like(self.capacity) if occupancy is None
+                          else np.asarray(occupancy, dtype=np.int64).copy())
+        self.k = k
+        self.max_km = max_km
+        self.rounds = 0
+        self._demand_index = None
+        # Candidate rows: shelter ids and km for one demand point, nearest first
+        self.row_demand = np.empty(0, dtype=np.int64)
+        self.cand = np.empty((0, k), dtype=np.int64)
+        self.cand_km = np.empty((0, k), dtype=np.float32)
+        self.first_row = np.empty(0, dtype=np.int64)  # each demand point's all-shelter list
+        # Pieces: part of a demand point's head count, held at a shelter or not (-1)
+        self.p_row = np.empty(0, dtype=np.int64)
+        self.p_amount = np.empty(0, dtype=np.int64)
+        self.p_rank = np.empty(0, dtype=np.int64)
+        self.p_shelter = np.empty(0, dtype=np.int64)
+        self.p_km = np.empty(0, dtype=np.float32)
+
+    @property
+    def free(self):
+        return np.maximum(self.capacity - self.occupancy, 0)
+
+    def solve(self):
+        """Place all demand from scratch; returns self"""
+        live = np.flatnonzero(self.demand_count > 0)
+        self.row_demand = np.empty(0, dtype=np.int64)
+        self.cand = np.empty((0, self.k), dtype=np.int64)
+        self.cand_km = np.empty((0, self.k), dtype=np.float32)
+        rows = self._add_rows(live, np.ones(len(self.capacity), dtype=bool))
+        self.first_row = np.full(len(self.demand_count), -1, dtype=np.int64)
+        self.first_row[live] = rows
+        self.p_row, self.p_amount = rows, self.demand_count[live]
+        self.p_rank = np.zeros(len(rows), dtype=np.int64)
+        self.p_shelter = np.full(len(rows), -1, dtype=np.int64)
+        self.p_km = np.full(len(rows), np.nan, dtype=np.float32)
+        self._rounds(np.arange(len(rows)))
+        self._restage()
+        return self
+
+    def update_shelters(self, idx, capacity=None, occupancy=None):
+        """Apply new capacity/occupancy for shelters `idx` and re-plan only what changes"""
+        idx = np.atleast_1d(np.asarray(idx, dtype=np.int64))
+        before = self.free[idx]
+        if capacity is not None:
+            self.capacity[idx] = capacity
+        if occupancy is not None:
+            self.occupancy[idx] = occupancy
+        after = self.free[idx]
+        active = []
+        shrunk = idx[after < before]
+        if len(shrunk):
+            held = np.flatnonzero(np.isin(self.p_shelter, shrunk))
+            active.append(self._contest(held, self.p_shelter[held], self.p_km[held], np.zeros(len(held), dtype=bool)))
+        grown = idx[after > before]
+        if len(grown):
+            # groups with a grown shelter on their first list that is nearer than
+            # where they are now (or that are unplaced) propose to it again
+            pieces = np.flatnonzero(self.p_amount > 0)
+            first = self.first_row[self.row_demand[self.p_row[pieces]]]
+            current = np.where(self.p_shelter[pieces] >= 0, self.p_km[pieces], np.inf)
+            ahead = np.isin(self.cand[first], grown) & (self.cand_km[first] < current[:, None])
+            move = ahead.any(axis=1)
+            released = pieces[move]
+            self.p_row[released] = first[move]
+            self.p_rank[released] = np.argmax(ahead[move], axis=1)
+            self.p_shelter[released] = -1
+            self.p_km[released] = np.nan
+            active.append(released)
+        if active:
+            self._rounds(np.concatenate(active))
+        self._restage()
+        return self
+
+    def _add_rows(self, demands, shelter_mask):
+        """Append candidate rows for `demands` among the shelters in `shelter_mask`; returns row ids"""
+        ids = np.flatnonzero(shelter_mask)
+        cand = np.full((len(demands), self.k), -1, dtype=np.int64)
+        km = np.full((len(demands), self.k), np.inf, dtype=np.float32)
+        if len(ids) and len(demands):
+            index = GridIndex(self.shelter_lat[ids], self.shelter_lon[ids])
+            near, d = index.nearest_batch(self.demand_lat[demands], self.demand_lon[demands], self.k, self.max_km)
+            found = near >= 0
+            cols = near.shape[1]
+            cand[:, :cols] = np.where(found, ids[index.order[np.maximum(near, 0)]], -1)
+            km[:, :cols] = d
+        first = len(self.row_demand)
+        self.row_demand = np.concatenate([self.row_demand, demands])
+        self.cand = np.concatenate([self.cand, cand])
+        self.cand_km = np.concatenate([self.cand_km, km])
+        return np.arange(first, first + len(demands))
+
+    def _contest(self, ids, shelter, km, is_new):
+        """Pieces `ids` compete for `shelter`, nearest first, holders winning ties.
+
+        Winners are held there (split at the capacity boundary); losers are
+        released with their rank moved past it. Returns pieces needing a new proposal.
+        """
+        amount = self.p_amount[ids]
+        order = np.lexsort((is_new, km, shelter))
+        ids, shelter, km, amount = ids[order], shelter[order], km[order], amount[order]
+        total = np.cumsum(amount)
+        start = np.r_[True, shelter[1:] != shelter[:-1]]
+        group = np.cumsum(start) - 1
+        first = np.flatnonzero(start)
+        before = total - amount - (total[first] - amount[first])[group]
+        accepted = np.clip(self.free[shelter] - before, 0, amount)
+
+        won = accepted > 0
+        self.p_shelter[ids[won]] = shelter[won]
+        self.p_km[ids[won]] = km[won]
+        lost = ids[~won]
+        self.p_shelter[lost] = -1
+        self.p_km[lost] = np.nan
+        self.p_rank[lost] += 1
+
+        split = won & (accepted < amount)
+        rest = ids[split]
+        self.p_amount[rest] = accepted[split]
+        new = np.arange(len(self.p_row), len(self.p_row) + len(rest))
+        self.p_row = np.concatenate([self.p_row, self.p_row[rest]])
+        self.p_amount = np.concatenate([self.p_amount, (amount - accepted)[split]])
+        self.p_rank = np.concatenate([self.p_rank, self.p_rank[rest] + 1])
+        self.p_shelter = np.concatenate([self.p_shelter, np.full(len(rest), -1, dtype=np.int64)])
+        self.p_km = np.concatenate([self.p_km, np.full(len(rest), np.nan, dtype=np.float32)])
+        return np.concatenate([lost, new])
+
+    def _rounds(self, active):
+        while True:
+            active = active[self.p_rank[active] < self.k]
+            target = self.cand[self.p_row[active], self.p_rank[active]]
+            # padding (-1) means the list is exhausted
+            active, target = active[target >= 0], target[target >= 0]
+            if not len(active):
+                return
+            self.rounds += 1
+            km = self.cand_km[self.p_row[active], self.p_rank[active]]
+            held = np.flatnonzero(np.isin(self.p_shelter, np.unique(target)))
+            active = self._contest(
+                np.concatenate([held, active]),
+                np.concatenate([self.p_shelter[held], target]),
+                np.concatenate([self.p_km[held], km]),
+                np.r_[np.zeros(len(held), dtype=bool), np.ones(len(active), dtype=bool)],
+            )
+
+    def _restage(self):
+        """Fresh candidate lists, among shelters with room left, for groups that ran out"""
+        for _ in range(MAX_STAGES):
+            left = np.flatnonzero((self.p_shelter < 0) & (self.p_amount > 0))
+            spare = self.free - self.load
+            if not len(left) or not (spare > 0).any():
+                break
+            demands, inverse = np.unique(self.row_demand[self.p_row[left]], return_inverse=True)
+            amounts = np.bincount(inverse, weights=self.p_amount[left]).astype(np.int64)
+            self.p_amount[left] = 0
+            rows = self._add_rows(demands, spare > 0)
+            start = len(self.p_row)
+            self.p_row = np.concatenate([self.p_row, rows])
+            self.p_amount = np.concatenate([self.p_amount, amounts])
+            self.p_rank = np.concatenate([self.p_rank, np.zeros(len(rows), dtype=np.int64)])
+            self.p_shelter = np.concatenate([self.p_shelter, np.full(len(rows), -1, dtype=np.int64)])
+            self.p_km = np.concatenate([self.p_km, np.full(len(rows), np.nan, dtype=np.float32)])
+            placed = self.placed
+            self._rounds(np.arange(start, len(self.p_row)))
+            if self.placed == placed:
+                break
+        self._compact()
+
+    def _compact(self):
+        """Drop empty pieces and merge pieces of one row held at the same shelter"""
+        keep = self.p_amount > 0
+        key = np.stack([self.p_row[keep], self.p_shelter[keep], self.p_rank[keep]])
+        uniq, inverse = np.unique(key, axis=1, return_inverse=True)
+        inverse = inverse.ravel()
+        self.p_row, self.p_shelter, self.p_rank = uniq
+        self.p_amount = np.bincount(inverse, weights=self.p_amount[keep], minlength=uniq.shape[1]).astype(np.int64)
+        km = np.empty(uniq.shape[1], dtype=np.float32)
+        km[inverse] = self.p_km[keep]
+        self.p_km = km
+
+    @property
+    def load(self):
+        """People planned into each shelter, on top of its occupancy"""
+        held = self.p_shelter >= 0
+        return np.bincount(self.p_shelter[held], weights=self.p_amount[held], minlength=len(self.capacity)).astype(np.int64)
+
+    @property
+    def placed(self):
+        return int(self.p_amount[self.p_shelter >= 0].sum())
+
+    @property
+    def unplaced(self):
+        return int(self.p_amount[self.p_shelter < 0].sum())
+
+    def flows(self):
+        """(demand, shelter, people, km) arrays of the plan, one entry per split"""
+        held = np.flatnonzero(self.p_shelter >= 0)
+        return self.row_demand[self.p_row[held]], self.p_shelter[held], self.p_amount[held], self.p_km[held]
+
+    def stats(self):
+        _, _, people, km = self.flows()
+        placed = int(people.sum())
+        return {
+            "placed": placed,
+            "unplaced": self.unplaced,
+            "mean_km": float((people * km.astype(np.float64)).sum() / placed) if placed else None,
+            "max_km": float(km.max()) if len(km) else None,
+            "full_shelters": int(np.count_nonzero((self.load >= self.free) & (self.free > 0))),
+            "rounds": self.rounds,
+        }
+
+    def allocation_near(self, lat, lon, max_km=2.0):
+        """[(shelter id, people, km)] planned for the demand point nearest (lat, lon), or []"""
+        if self._demand_index is None:
+            self._demand_index = GridIndex(self.demand_lat, self.demand_lon)
+        idx, _ = self._demand_index.nearest_indices(lat, lon, 1, max_km)
+        if not len(idx):
+            return []
+        demand = self._demand_index.order[idx[0]]
+        pieces = np.flatnonzero((self.row_demand[self.p_row] == demand) & (self.p_shelter >= 0))
+        pieces = pieces[np.argsort(self.p_km[pieces], kind="stable")]
+        return [(int(self.p_shelter[p]), int(self.p_amount[p]), float(self.p_km[p])) for p in pieces]
+
+
+def bin_points(lat, lon, count=None, cell_deg=BIN_DEG):
+    """Aggregate demand points into grid cells.
+
+    Returns (cell lat, cell lon, cell count, cell of each point); cell
+    coordinates are the count-weighted centroid of their points.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    count = np.ones(len(lat), dtype=np.int64) if count is None else np.asarray(count, dtype=np.int64)
+    key = np.floor((lat + 90.0) / cell_deg).astype(np.int64) * int(np.ceil(360.0 / cell_deg) + 1) \
+        + np.floor((lon + 180.0) / cell_deg).astype(np.int64)
+    _, cell = np.unique(key, return_inverse=True)
+    cell = cell.ravel()
+    total = np.bincount(cell, weights=count).astype(np.int64)
+    w = np.maximum(total, 1)
+    return (np.bincount(cell, weights=lat * count) / w, np.bincount(cell, weights=lon * count) / w, total, cell)
+
+
+def member_shelters(plan, cell, count=None):
+    """Shelter id (-1 if unplaced) for each point binned into `cell` by bin_points.
+
+    A cell's points fill its splits nearest first, in input order; a household
+    straddling two splits goes with its first member.
+    """
+    cell = np.asarray(cell, dtype=np.int64)
+    count = np.ones(len(cell), dtype=np.int64) if count is None else np.asarray(count, dtype=np.int64)
+    pieces = np.flatnonzero(plan.p_amount > 0)
+    demand = plan.row_demand[plan.p_row[pieces]]
+    km = np.where(plan.p_shelter[pieces] >= 0, plan.p_km[pieces], np.inf)
+    pieces = pieces[np.lexsort((km, demand))]
+    ends = np.cumsum(plan.p_amount[pieces])
+    # splits and points both run cell by cell, so a point's first member sits at
+    # the same offset in the head count as in the splits
+    order = np.argsort(cell, kind="stable")
+    pos = np.empty(len(cell), dtype=np.int64)
+    pos[order] = np.cumsum(count[order]) - count[order]
+    return plan.p_shelter[pieces[np.searchsorted(ends, pos, side="right")]]
+
+
+def assign(demand_lat, demand_lon, demand_count, shelter_lat, shelter_lon, capacity, occupancy=None,
+           k=CANDIDATES, max_km=100.0):
+    """Solved Assignment for the given demand points and shelters"""
+    return Assignment(demand_lat, demand_lon, demand_count, shelter_lat, shelter_lon, capacity,
+                      occupancy, k, max_km).solve()
+
+
+def load_population(path):
+    """(lat, lon, count) arrays from a CSV; count defaults to 1 per row (households)"""
+    import pandas as pd
+    df = pd.read_csv(path)
+    count = df["count"].fillna(0) if "count" in df else np.ones(len(df))
+    return df["lat"].to_numpy(np.float64), df["lon"].to_numpy(np.float64), np.asarray(count, dtype=np.int64)
+
+
+_plan = None
+_plan_registry = None  # the registry _plan was solved over
+_demand = None
+_plan_version = 0  # bumped whenever the process-wide plan is solved or re-planned
+_plan_lock = threading.Lock()
+
+
+def get_plan():
+    """Process-wide plan over the shelter registry and FLOODSAFE_POPULATION, kept in
+    step with registry updates; None unless both are configured"""
+    global _plan, _plan_registry, _demand, _plan_version
+    if not POPULATION_PATH:
+        return None
+    from floodsafe.shelters import get_registry
+    registry = get_registry()
+    if registry is None:
+        return None
+    with _plan_lock:
+        if _plan is None or _plan_registry is not registry:
+            if _demand is None:
+                _demand = bin_points(*load_population(POPULATION_PATH))[:3]
+            _plan = assign(*_demand, registry.lat, registry.lon, registry.capacity, registry.occupancy)
+            _plan_registry = registry
+            _plan_version += 1
+        else:
+            changed = np.flatnonzero((_plan.capacity != registry.capacity) | (_plan.occupancy != registry.occupancy))
+            if len(changed):
+                _plan.update_shelters(changed, registry.capacity[changed], registry.occupancy[changed])
+                _plan_version += 1
+    return _plan
+
+
+def plan_version():
+    """Changes whenever the process-wide plan changes; 0 without a plan"""
+    get_plan()
+    return _plan_version
+
+
+def planned_shelters(lat, lon):
+    """Shelter dicts (as find_nearby_shelters) the plan assigns to people at (lat, lon),
+    each with the planned head count in `assigned`; [] without a plan"""
+    plan = get_plan()
+    if plan is None:
+        return []
+    from floodsafe.shelters import get_registry
+    registry = get_registry()
+    with _plan_lock:
+        alloc = plan.allocation_near(lat, lon)
+    shelters = registry.to_dicts([s for s, _, _ in alloc], [km for _, _, km in alloc])
+    for shelter, (_, people, _) in zip(shelters, alloc):
+        shelter["assigned"] = people
+    return shelters
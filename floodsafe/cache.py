@@ -0,0 +1,116 @@
+"""Process-wide TTL cache for OpenWeather lookups, keyed by location tile.
+
+Streamlit re-executes the page script on every widget interaction, but
+imported modules stay loaded, so a cache living here is shared by every
+session and every rerun in the server process.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from floodsafe.ratelimit import background
+
+# ~1.1 km of latitude per tile
+TILE_DEG = 0.01
+
+
+def tile_key(lat, lon, tile_deg=TILE_DEG):
+    """Quantize a lat/lon pair to the integer grid tile that contains it"""
+    return (int(math.floor(float(lat) / tile_deg)), int(math.floor(float(lon) / tile_deg)))
+
+
+class TileCache:
+    """Bounded LRU cache with TTL and stale-while-revalidate refresh.
+
+    Entries younger than `ttl` are served directly. Entries older than `ttl`
+    but younger than `ttl + stale_ttl` are served as-is while a background
+    refresh runs; anything older is fetched synchronously. Failed fetches
+    (None) are never stored.
+    """
+
+    def __init__(self, ttl=600, stale_ttl=1800, maxsize=4096, tile_deg=TILE_DEG):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.tile_deg = tile_deg
+        self._data = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tile-cache")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, kind, lat, lon):
+        return (kind,) + tile_key(lat, lon, self.tile_deg)
+
+    def get_or_fetch(self, kind, lat, lon, fetch):
+        """Return the cached value for (kind, tile) or call `fetch()` to fill it"""
+        key = self.key(kind, lat, lon)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                age = now - entry[0]
+                if age < self.ttl:
+                    self.hits += 1
+                    return entry[1]
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._refresher.submit(self._refresh, key, fetch)
+                    return entry[1]
+            self.misses += 1
+        value = fetch()
+        if value is not None:
+            self._put(key, value)
+        return value
+
+    def _refresh(self, key, fetch):
+        try:
+            with background():
+                value = fetch()
+            if value is not None:
+                self._put(key, value)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.stale_hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
+
+
+WEATHER_CACHE = TileCache(
+    ttl=float(os.environ.get("FLOODSAFE_WEATHER_TTL", 600)),
+    stale_ttl=float(os.environ.get("FLOODSAFE_WEATHER_STALE_TTL", 1800)),
+    maxsize=int(os.environ.get("FLOODSAFE_WEATHER_CACHE_SIZE", 4096)),
+)
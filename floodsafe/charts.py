@@ -0,0 +1,190 @@
+"""Cached, size-bounded plotly figures for the Analytics section.
+
+Figures are built with plotly.graph_objects (much cheaper than plotly.express)
+and cached by the hash of the data they plot, so an unchanged forecast costs
+one dict lookup per rerun. Series longer than MAX_POINTS are downsampled
+first: LTTB for smooth lines, per-bucket min/max for rain so peaks survive.
+Traces that still have more than WEBGL_THRESHOLD points are drawn with
+Scattergl. Either way a figure's size is bounded by MAX_POINTS, not by how long
+the series is.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from floodsafe.analytics import RAIN_BINS, forecast_columns, payload_hash, rain_bin_counts, rolling_accumulations
+
+MAX_POINTS = 2000
+WEBGL_THRESHOLD = 1000
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 128
+hits = 0
+misses = 0
+
+
+def series_hash(*arrays):
+    h = hashlib.sha1()
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(str(a.dtype).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
+def lttb_indices(x, y, n_out):
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling to n_out points"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_out):
+    """Indices of each bucket's min and max (in time order), about n_out in total.
+
+    NaNs count as 0.
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    k = -(-n // max(1, n_out // 2))  # bucket width
+    rows = -(-n // k)
+    padded = np.full(rows * k, np.nan)
+    padded[:n] = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    grid = padded.reshape(rows, k)
+    base = np.arange(rows) * k
+    pair = np.sort(np.stack([base + np.nanargmin(grid, axis=1), base + np.nanargmax(grid, axis=1)], axis=1), axis=1)
+    return np.unique(pair.ravel())
+
+
+def _as_float_x(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ms]").astype(np.int64).astype(np.float64)
+    if x.dtype == object:
+        return np.array([v.timestamp() for v in x], dtype=np.float64)
+    return x.astype(np.float64)
+
+
+def downsample(x, y, kind="line", max_points=MAX_POINTS):
+    """(x, y) reduced to at most ~max_points: LTTB for lines, min/max for bars"""
+    if len(y) <= max_points:
+        return x, y
+    idx = minmax_indices(y, max_points) if kind == "bar" else lttb_indices(_as_float_x(x), y, max_points)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+def series_trace(x, y, name, kind="line", max_points=MAX_POINTS, **style):
+    """One plotly trace, downsampled, as WebGL when it is still dense"""
+    import plotly.graph_objects as go
+    x, y = downsample(x, y, kind, max_points)
+    if np.issubdtype(np.asarray(x).dtype, np.datetime64):
+        # epoch milliseconds serialize far smaller than ISO strings; axes are set to type "date"
+        x = _as_float_x(x)
+    dense = len(y) > WEBGL_THRESHOLD
+    if kind == "bar":
+        if dense:
+            # thousands of bars as a stepped WebGL area
+            return go.Scattergl(x=x, y=y, name=name, mode="lines", line_shape="hv", fill="tozeroy", **style)
+        return go.Bar(x=x, y=y, name=name, **style)
+    return (go.Scattergl if dense else go.Scatter)(x=x, y=y, name=name, mode="lines", **style)
+
+
+def _cached(key, build):
+    global hits, misses
+    with _cache_lock:
+        fig = _cache.get(key)
+        if fig is not None:
+            _cache.move_to_end(key)
+            hits += 1
+            return fig
+        misses += 1
+    fig = build()
+    with _cache_lock:
+        _cache[key] = fig
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return fig
+
+
+def forecast_figures(forecast):
+    """(rain, temperature, intensity pie) figures for a forecast payload, cached by its hash.
+
+    The figures are shared between sessions: treat them as read-only.
+    """
+    return _cached(("forecast", payload_hash(forecast)), lambda: _build_forecast_figures(forecast))
+
+
+def _build_forecast_figures(forecast):
+    import plotly.graph_objects as go
+    cols = forecast_columns(forecast)
+    t = np.array(cols["time"], dtype="datetime64[s]")
+    rain = cols["rain_mm"]
+    rain_fig = go.Figure([
+        series_trace(t, rain, "Rain (mm)", kind="bar"),
+        series_trace(t, rolling_accumulations(rain, (24,))[24], "Rolling 24h total"),
+    ])
+    rain_fig.update_layout(title="Rain Forecast (next 5 days, per 3h)", yaxis_title="Rain (mm)", xaxis_type="date")
+    temp_fig = go.Figure([series_trace(t, cols["temp"], "Temperature")])
+    if len(t) <= WEBGL_THRESHOLD:
+        temp_fig.update_traces(mode="lines+markers")
+    temp_fig.update_layout(title="Temperature Forecast (next 5 days)", yaxis_title="temp", xaxis_type="date")
+    pie_fig = go.Figure([go.Pie(labels=[b[0] for b in RAIN_BINS], values=rain_bin_counts(rain).tolist())])
+    pie_fig.update_layout(title="Rain Intensity Slots in Forecast")
+    return rain_fig, temp_fig, pie_fig
+
+
+def gauge_figure(station_id, name, days=30, store=None, max_points=MAX_POINTS):
+    """Mean line with a min/max band for a gauge's last `days`, from the coarsest
+    time-series tier that still resolves it; cached by the records plotted"""
+    from floodsafe.timeseries import GAUGES
+    store = store or GAUGES
+    latest = store.latest(station_id)
+    if latest is None:
+        return None
+    end = latest[0] + 1
+    tier, rec = store.query(station_id, end - days * 86400, end, max_points=max_points)
+    if len(rec) == 0:
+        return None
+    return _cached(("gauge", station_id, tier, series_hash(rec)), lambda: _build_gauge_figure(name, tier, rec, max_points))
+
+
+def _build_gauge_figure(name, tier, rec, max_points):
+    import plotly.graph_objects as go
+    t = rec["t"].astype("datetime64[s]")
+    if tier == "raw":
+        traces = [series_trace(t, rec["v"], "Level (m)", max_points=max_points)]
+    else:
+        mean = rec["sum"] / np.maximum(rec["n"], 1)
+        band = dict(line=dict(width=0), showlegend=False)
+        traces = [
+            series_trace(t, rec["max"], "max", max_points=max_points, **band),
+            series_trace(t, rec["min"], "min", max_points=max_points, fillcolor="rgba(26,115,232,0.2)", **band),
+            series_trace(t, mean, f"Mean level ({tier})", max_points=max_points),
+        ]
+        traces[1].update(fill="tonexty")
+    fig = go.Figure(traces)
+    fig.update_layout(title=f"Water level: {name}", yaxis_title="Level (m)", xaxis_type="date")
+    return fig
+
+
+def cache_stats():
+    with _cache_lock:
+        return {"size": len(_cache), "hits": hits, "misses": misses}
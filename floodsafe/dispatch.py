@@ -0,0 +1,287 @@
+"""Alert and SOS dispatch pipeline.
+
+Messages are first written to a durable SQLite outbox, then an asyncio
+dispatcher drains it: each channel (SMS gateway, email, webhook) claims
+batches of pending messages, sends them with a per-provider concurrency
+limit, and marks them sent, or schedules a retry with exponential backoff.
+Claims take a write lock and stamp the claiming process and a lease, so
+several dispatchers can share one outbox; messages whose lease ran out (their
+dispatcher died or hung) are claimed again, so nothing is lost across
+restarts (delivery is at-least-once; every payload carries its outbox id for
+de-duplication downstream).
+
+The dashboard only enqueues. Run the dispatcher as its own process:
+    python -m floodsafe.dispatch --sms-url http://gateway/send --webhook-url http://ops/hook
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import smtplib
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+
+import requests
+
+OUTBOX_PATH = os.environ.get("FLOODSAFE_OUTBOX_DB", "floodsafe_outbox.sqlite3")
+
+# Seconds a claimed batch stays with its dispatcher before others may retry it;
+# keep it well above the slowest channel's send timeout
+LEASE_SECONDS = float(os.environ.get("FLOODSAFE_OUTBOX_LEASE", "120"))
+
+# Comma-separated phone numbers that receive SOS messages from the dashboard
+SOS_RECIPIENTS = [r.strip() for r in os.environ.get("FLOODSAFE_SOS_RECIPIENTS", "").split(",") if r.strip()]
+
+SMS, EMAIL, WEBHOOK = "sms", "email", "webhook"
+
+log = logging.getLogger("floodsafe.dispatch")
+
+
+class Outbox:
+    def __init__(self, path=OUTBOX_PATH, lease=LEASE_SECONDS):
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY, channel TEXT NOT NULL, recipient TEXT NOT NULL, "
+            "subject TEXT, body TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', "
+            "attempts INTEGER NOT NULL DEFAULT 0, next_attempt REAL NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, last_error TEXT, owner TEXT, lease_until REAL)"
+        )
+        columns = {r[1] for r in self._db.execute("PRAGMA table_info(outbox)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE outbox ADD COLUMN {column} {kind}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (channel, status, next_attempt)")
+        self._db.commit()
+
+    def enqueue(self, channel, recipients, body, subject=None):
+        """Durably queue one message per recipient; returns the number queued"""
+        now = time.time()
+        rows = [(channel, r, subject, body, now) for r in recipients]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO outbox (channel, recipient, subject, body, created_at) VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+        return len(rows)
+
+    def recover(self):
+        """Return messages whose lease expired (their dispatcher died) to the queue"""
+        with self._lock:
+            n = self._db.execute(
+                "UPDATE outbox SET status = 'pending', owner = NULL, lease_until = NULL "
+                "WHERE status = 'inflight' AND COALESCE(lease_until, 0) < ?", (time.time(),)).rowcount
+            self._db.commit()
+        return n
+
+    def claim(self, channel, limit):
+        """Mark up to `limit` due messages in-flight under this outbox's lease and return them.
+
+        BEGIN IMMEDIATE takes SQLite's write lock before the select, so
+        dispatchers in other processes never claim the same rows.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, recipient, subject, body, attempts FROM outbox WHERE channel = ? AND "
+                    "((status = 'pending' AND next_attempt <= ?) OR (status = 'inflight' AND COALESCE(lease_until, 0) < ?)) "
+                    "ORDER BY id LIMIT ?",
+                    (channel, now, now, limit),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE outbox SET status = 'inflight', owner = ?, lease_until = ? WHERE id = ?",
+                    [(self.owner, now + self.lease, r[0]) for r in rows])
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        return [{"id": r[0], "to": r[1], "subject": r[2], "text": r[3], "attempts": r[4]} for r in rows]
+
+    def mark_sent(self, ids):
+        with self._lock:
+            self._db.executemany("UPDATE outbox SET status = 'sent', owner = NULL, lease_until = NULL "
+                                 "WHERE id = ? AND owner = ?", [(i, self.owner) for i in ids])
+            self._db.commit()
+
+    def mark_failed(self, messages, error, max_attempts, backoff):
+        """Reschedule with backoff, or give up after `max_attempts`"""
+        rows = []
+        for m in messages:
+            attempts = m["attempts"] + 1
+            status = "failed" if attempts >= max_attempts else "pending"
+            rows.append((status, attempts, time.time() + backoff(attempts), str(error)[:500], m["id"], self.owner))
+        with self._lock:
+            self._db.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, last_error = ?, "
+                "owner = NULL, lease_until = NULL WHERE id = ? AND owner = ?", rows)
+            self._db.commit()
+
+    def counts(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def has_work(self, channel):
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM outbox WHERE channel = ? AND status IN ('pending', 'inflight') LIMIT 1", (channel,)
+            ).fetchone() is not None
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Process-wide outbox at FLOODSAFE_OUTBOX_DB, opened on first use"""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox()
+        return _outbox
+
+
+class HttpBatchChannel:
+    """POSTs batches as JSON: {"messages": [{"id", "to", "text"}, ...]}"""
+
+    def __init__(self, name, url, batch_size=500, concurrency=8, timeout=10):
+        self.name = name
+        self.url = url
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def send(self, messages):
+        payload = {"messages": [{"id": m["id"], "to": m["to"], "text": m["text"]} for m in messages]}
+        r = self._session.post(self.url, json=payload, timeout=self.timeout)
+        r.raise_for_status()
+
+
+def sms_gateway(url, **kw):
+    return HttpBatchChannel(SMS, url, **kw)
+
+
+def webhook(url, **kw):
+    return HttpBatchChannel(WEBHOOK, url, **kw)
+
+
+class EmailChannel:
+    """One SMTP connection per batch"""
+
+    def __init__(self, host, port=25, sender="alerts@floodsafe.local", batch_size=100, concurrency=2, timeout=10):
+        self.name = EMAIL
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def send(self, messages):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            for m in messages:
+                msg = EmailMessage()
+                msg["From"] = self.sender
+                msg["To"] = m["to"]
+                msg["Subject"] = m["subject"] or "FloodSafe alert"
+                msg["X-Outbox-Id"] = str(m["id"])
+                msg.set_content(m["text"])
+                smtp.send_message(msg)
+
+
+def exponential_backoff(attempts, base=1.0, cap=300.0):
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+class Dispatcher:
+    def __init__(self, outbox, channels, max_attempts=8, backoff=exponential_backoff, idle_wait=0.5):
+        self.outbox = outbox
+        self.channels = {c.name: c for c in channels}
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.idle_wait = idle_wait
+        self.sent = 0
+        self.retried = 0
+
+    async def _send_batch(self, channel, batch, sem):
+        try:
+            await asyncio.to_thread(channel.send, batch)
+        except Exception as e:
+            self.retried += len(batch)
+            await asyncio.to_thread(self.outbox.mark_failed, batch, e, self.max_attempts, self.backoff)
+        else:
+            self.sent += len(batch)
+            await asyncio.to_thread(self.outbox.mark_sent, [m["id"] for m in batch])
+        finally:
+            sem.release()
+
+    async def _drain_channel(self, channel, stop_when_idle):
+        sem = asyncio.Semaphore(channel.concurrency)
+        tasks = set()
+        while True:
+            await sem.acquire()
+            batch = await asyncio.to_thread(self.outbox.claim, channel.name, channel.batch_size)
+            if not batch:
+                sem.release()
+                if stop_when_idle and not tasks and not await asyncio.to_thread(self.outbox.has_work, channel.name):
+                    return
+                await asyncio.sleep(self.idle_wait if not tasks else 0.01)
+                continue
+            task = asyncio.create_task(self._send_batch(channel, batch, sem))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    async def run(self, stop_when_idle=False):
+        """Drain every channel; with stop_when_idle, return once nothing is pending"""
+        await asyncio.to_thread(self.outbox.recover)
+        await asyncio.gather(*(self._drain_channel(c, stop_when_idle) for c in self.channels.values()))
+
+
+def alert_text(level, area):
+    return f"FloodSafe {level} flood risk alert for {area}. Follow local evacuation guidance and keep emergency numbers handy."
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--outbox", default=OUTBOX_PATH)
+    ap.add_argument("--lease", type=float, default=LEASE_SECONDS, help="seconds before another dispatcher may retry a claim")
+    ap.add_argument("--sms-url")
+    ap.add_argument("--webhook-url")
+    ap.add_argument("--smtp-host")
+    ap.add_argument("--smtp-port", type=int, default=25)
+    ap.add_argument("--sms-concurrency", type=int, default=8)
+    ap.add_argument("--sms-batch-size", type=int, default=500)
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    channels = []
+    if args.sms_url:
+        channels.append(sms_gateway(args.sms_url, batch_size=args.sms_batch_size, concurrency=args.sms_concurrency))
+    if args.webhook_url:
+        channels.append(webhook(args.webhook_url))
+    if args.smtp_host:
+        channels.append(EmailChannel(args.smtp_host, args.smtp_port))
+    if not channels:
+        ap.error("configure at least one of --sms-url, --webhook-url, --smtp-host")
+    try:
+        asyncio.run(Dispatcher(Outbox(args.outbox, args.lease), channels).run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Concurrent fetch layer for the dashboard's upstream calls.
+
+All calls share one pooled keep-alive `requests.Session`, and independent
+calls (geocoding, IP lookup, weather, forecast) run concurrently on a thread
+pool so a rerun waits for the slowest call rather than the sum of them.
+Identical concurrent requests are coalesced into one, and each API key is
+held to a token-bucket budget (see floodsafe.ratelimit).
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from floodsafe.gazetteer import get_gazetteer, remember
+from floodsafe.ratelimit import FLIGHTS, bucket_for, current_priority, key_label
+from floodsafe.telemetry import observe_upstream, traced
+
+# Overridable so the dashboard and benchmarks can run against a local stand-in
+GEOCODE_URL = os.environ.get("FLOODSAFE_GEOCODE_URL", "https://api.openweathermap.org/geo/1.0/direct")
+IPINFO_URL = os.environ.get("FLOODSAFE_IPINFO_URL", "https://ipinfo.io/json")
+
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="fetch")
+
+
+def get_json(url, params=None, timeout=8):
+    """GET `url` on the shared session and decode the JSON body.
+
+    Concurrent identical requests share one call; each call spends a token
+    from its API key's bucket and raises ratelimit.Throttled when none is left.
+    """
+    params = params or {}
+    key = (url, tuple(sorted((k, str(v)) for k, v in params.items())))
+    priority = current_priority()
+
+    host = urlsplit(url).netloc
+    label = key_label(params["appid"]) if params.get("appid") else host
+
+    def call():
+        bucket_for(label).acquire(priority)
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            r = SESSION.get(url, params=params, timeout=timeout)
+            r.raise_for_status()
+            ok = True
+            return r.json()
+        finally:
+            observe_upstream(host, time.perf_counter() - t0, ok)
+
+    return FLIGHTS.do(key, call)
+
+
+def geocode_city(city, api_key):
+    """Resolve a city name from an exact local gazetteer match, otherwise from
+    OpenWeather geocoding (whose answer is memoized locally); None if not found"""
+    hit = get_gazetteer().lookup(city)
+    if hit is not None:
+        return {"lat": hit["lat"], "lon": hit["lon"]}
+    geo = get_json(GEOCODE_URL, params={"q": city, "limit": 1, "appid": api_key}, timeout=8)
+    if not geo:
+        return None
+    lat, lon = float(geo[0]["lat"]), float(geo[0]["lon"])
+    remember(geo[0].get("name") or city, lat, lon, geo[0].get("state", ""), query=city)
+    return {"lat": lat, "lon": lon}
+
+
+def ip_location():
+    """Approximate location of the server/client IP via ipinfo.io"""
+    info = get_json(IPINFO_URL, timeout=5)
+    lat, lon = map(float, info["loc"].split(","))
+    return {"lat": lat, "lon": lon}
+
+
+def load_dashboard_data(city, coords, fallback, get_weather, get_forecast, api_key):
+    """Resolve the dashboard location and fetch its weather and forecast.
+
+    Geocoding and the IP lookup run concurrently, and the IP lookup is only
+    made when there are no session coords. Weather and forecast are started
+    speculatively for the best location already known (session coords), so
+    when the city hasn't changed all calls overlap; they are only re-issued
+    if geocoding lands somewhere else.
+
+    Returns a dict with the resolved `lat`/`lon`, its `source`
+    ('city', 'session', 'ip' or 'manual'), the geocode result and error,
+    `weather` and `forecast`.
+    """
+    geo_f = EXECUTOR.submit(traced("geocode", geocode_city), city, api_key) if city else None
+    ip_f = EXECUTOR.submit(traced("ip_lookup", ip_location)) if coords is None else None
+
+    def start(loc):
+        return (EXECUTOR.submit(traced("weather", get_weather), loc["lat"], loc["lon"]),
+                EXECUTOR.submit(traced("forecast", get_forecast), loc["lat"], loc["lon"]))
+
+    guess = coords
+    pending = start(guess) if guess else None
+
+    geo, geo_error = None, None
+    if geo_f is not None:
+        try:
+            geo = geo_f.result()
+        except Exception as e:
+            geo_error = str(e)
+
+    if geo:
+        loc, source = geo, "city"
+    elif coords:
+        loc, source = coords, "session"
+    else:
+        loc, source = None, "manual"
+        if ip_f is not None:
+            try:
+                loc, source = ip_f.result(), "ip"
+            except Exception:
+                loc = None
+        if loc is None:
+            loc, source = fallback, "manual"
+
+    if pending is None or (loc["lat"], loc["lon"]) != (guess["lat"], guess["lon"]):
+        pending = start(loc)
+    weather_f, forecast_f = pending
+    return {
+        "lat": loc["lat"],
+        "lon": loc["lon"],
+        "source": source,
+        "geo": geo,
+        "geo_error": geo_error,
+        "weather": weather_f.result(),
+        "forecast": forecast_f.result(),
+    }
@@ -0,0 +1,253 @@
+"""Local gazetteer for instant city search and geocoding.
+
+Place names and their aliases are kept in two sorted key arrays: one of
+normalized names (exact and prefix lookups via bisect) and one of
+transliteration-folded names ("Kolkatta", "Calcuta" and "Kolkata" fold to
+related keys) for "did you mean" suggestions. Only exact name or alias
+matches resolve a search; on a miss the remote geocoder is asked, and its
+answers are added to the index and appended to a learned-places file under
+the geocoder's own place name (the user's spelling is kept as an alias only
+when it folds to that name, so a wrong remote match never becomes an exact
+hit for the query).
+
+Sources, in load order:
+  - floodsafe/data/gazetteer_in.csv (bundled major cities)
+  - FLOODSAFE_GAZETTEER: a GeoNames dump (e.g. IN.txt) or CSV with
+    name,state,lat,lon,population,aliases ("|"-separated)
+  - FLOODSAFE_GAZETTEER_LEARNED: places learned from the remote geocoder
+    (default: gazetteer_learned.csv in FLOODSAFE_DATA_DIR, ~/.floodsafe)
+"""
+import bisect
+import csv
+import difflib
+import io
+import os
+import re
+import threading
+import unicodedata
+
+BUNDLED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer_in.csv")
+EXTRA_PATH = os.environ.get("FLOODSAFE_GAZETTEER")
+DATA_DIR = os.environ.get("FLOODSAFE_DATA_DIR", os.path.join(os.path.expanduser("~"), ".floodsafe"))
+LEARNED_PATH = os.environ.get("FLOODSAFE_GAZETTEER_LEARNED", os.path.join(DATA_DIR, "gazetteer_learned.csv"))
+# The learned-places file stops growing at this size; new answers are then kept in memory only
+LEARNED_MAX_BYTES = int(os.environ.get("FLOODSAFE_GAZETTEER_LEARNED_MAX_BYTES", 1 << 20))
+
+# Spelling variants common in romanized Indian place names, applied in order
+_FOLDS = (
+    ("chh", "ch"), ("aa", "a"), ("ee", "i"), ("oo", "u"), ("ou", "u"), ("w", "v"),
+    ("ph", "f"), ("kh", "k"), ("gh", "g"), ("th", "t"), ("dh", "d"), ("bh", "b"),
+    ("sh", "s"), ("z", "j"), ("q", "k"), ("c", "k"), ("y", "i"),
+)
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_REPEATS = re.compile(r"(.)\1+")
+
+# fast key ranges: everything starting with `prefix` sorts before prefix + _HIGH
+_HIGH = "￿"
+
+
+def normalize(name):
+    """Lowercase ASCII form with accents stripped and punctuation collapsed to spaces"""
+    s = unicodedata.normalize("NFKD", name)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM.sub(" ", s).strip()
+
+
+def fold(name):
+    """Transliteration-insensitive key: spaces dropped, variant spellings merged"""
+    s = normalize(name).replace(" ", "")
+    for a, b in _FOLDS:
+        s = s.replace(a, b)
+    s = _REPEATS.sub(r"\1", s)
+    return s[:-1] if len(s) > 3 and s.endswith("a") else s
+
+
+class Gazetteer:
+    def __init__(self):
+        self.names = []
+        self.states = []
+        self.lat = []
+        self.lon = []
+        self.population = []
+        self._keys = []      # sorted normalized keys
+        self._key_ids = []   # entry index for each key
+        self._folded = []
+        self._folded_ids = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _entry(self, i):
+        return {"name": self.names[i], "state": self.states[i], "lat": self.lat[i],
+                "lon": self.lon[i], "population": self.population[i]}
+
+    def extend(self, records):
+        """Bulk-add (name, state, lat, lon, population, aliases) records, then re-sort once"""
+        keys, folded = [], []
+        for name, state, lat, lon, pop, aliases in records:
+            i = len(self.names)
+            self.names.append(name)
+            self.states.append(state)
+            self.lat.append(float(lat))
+            self.lon.append(float(lon))
+            self.population.append(int(pop or 0))
+            for alias in {name, *aliases}:
+                if normalize(alias):
+                    keys.append((normalize(alias), i))
+                    folded.append((fold(alias), i))
+        with self._lock:
+            merged = sorted(list(zip(self._keys, self._key_ids)) + keys)
+            self._keys = [k for k, _ in merged]
+            self._key_ids = [i for _, i in merged]
+            merged = sorted(list(zip(self._folded, self._folded_ids)) + folded)
+            self._folded = [k for k, _ in merged]
+            self._folded_ids = [i for _, i in merged]
+
+    def add(self, name, lat, lon, state="", population=0, aliases=()):
+        """Insert one place (e.g. a remote geocoder answer) without a full re-sort"""
+        with self._lock:
+            i = len(self.names)
+            self.names.append(name)
+            self.states.append(state)
+            self.lat.append(float(lat))
+            self.lon.append(float(lon))
+            self.population.append(int(population or 0))
+            for alias in {name, *aliases}:
+                for keys, ids, key in ((self._keys, self._key_ids, normalize(alias)), (self._folded, self._folded_ids, fold(alias))):
+                    pos = bisect.bisect_left(keys, key)
+                    keys.insert(pos, key)
+                    ids.insert(pos, i)
+        return i
+
+    @staticmethod
+    def _range(keys, lo_key, hi_key):
+        return bisect.bisect_left(keys, lo_key), bisect.bisect_right(keys, hi_key)
+
+    def _best(self, ids):
+        return max(ids, key=lambda i: self.population[i]) if ids else None
+
+    def exact(self, name):
+        key = normalize(name)
+        lo, hi = self._range(self._keys, key, key)
+        i = self._best(self._key_ids[lo:hi])
+        return None if i is None else self._entry(i)
+
+    def prefix(self, text, limit=8, scan=2000):
+        """Autocomplete: places whose name or alias starts with `text`, most populous first"""
+        key = normalize(text)
+        if not key:
+            return []
+        lo, hi = self._range(self._keys, key, key + _HIGH)
+        ids = list(dict.fromkeys(self._key_ids[lo:min(hi, lo + scan)]))
+        ids.sort(key=lambda i: -self.population[i])
+        return [self._entry(i) for i in ids[:limit]]
+
+    def fuzzy(self, text, limit=5, cutoff=0.8):
+        """Matches across transliterations and small typos, best first"""
+        key = fold(text)
+        if not key:
+            return []
+        lo, hi = self._range(self._folded, key, key)
+        if hi > lo:
+            return [self._entry(self._best(self._folded_ids[lo:hi]))]
+        # candidates share the first two folded letters and have a similar length
+        lo, hi = self._range(self._folded, key[:2], key[:2] + _HIGH)
+        cands = {}
+        for k, i in zip(self._folded[lo:hi], self._folded_ids[lo:hi]):
+            if abs(len(k) - len(key)) <= 3:
+                cands.setdefault(k, i)
+        matches = difflib.get_close_matches(key, list(cands), n=limit, cutoff=cutoff)
+        return [self._entry(cands[m]) for m in matches]
+
+    def lookup(self, text):
+        """Answer for a search: exact name/alias match only; None if nothing.
+
+        Fuzzy matches are never used as the answer ("Patan" is not Patna),
+        only offered through suggest().
+        """
+        return self.exact(text)
+
+    def suggest(self, text, limit=3):
+        """'Did you mean' candidates for a search that had no exact match"""
+        if self.exact(text) is not None:
+            return []
+        return self.fuzzy(text, limit=limit)
+
+
+def _read_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            aliases = [a for a in (row.get("aliases") or "").split("|") if a]
+            yield row["name"], row.get("state", ""), row["lat"], row["lon"], row.get("population") or 0, aliases
+
+
+def _read_geonames(path):
+    """GeoNames dump rows (tab-separated, no header); populated places only"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            c = line.rstrip("\n").split("\t")
+            if len(c) < 15 or c[6] != "P":
+                continue
+            aliases = [c[2]] + [a for a in c[3].split(",") if a and a.isascii()]
+            yield c[1], c[10], c[4], c[5], c[14] or 0, aliases
+
+
+def load_gazetteer(paths):
+    g = Gazetteer()
+    for path in paths:
+        if path and os.path.exists(path):
+            g.extend(_read_geonames(path) if path.lower().endswith(".txt") else _read_csv(path))
+    return g
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+_learned_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Process-wide gazetteer, loaded on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = load_gazetteer([BUNDLED_PATH, EXTRA_PATH, LEARNED_PATH])
+    return _gazetteer
+
+
+def remember(name, lat, lon, state="", query=None):
+    """Memoize a remote geocoder answer in the index and the learned-places file.
+
+    `name` is the geocoder's place name; the user's `query` is added as an
+    alias only when it folds to the same key. Places already known at (about)
+    the same position (within ~10 km) are skipped.
+    """
+    if not normalize(name):
+        return
+    aliases = [query] if query and normalize(query) != normalize(name) and fold(query) == fold(name) else []
+    g = get_gazetteer()
+    with _learned_lock:
+        known = g.exact(name)
+        if known is not None and abs(known["lat"] - lat) < 0.1 and abs(known["lon"] - lon) < 0.1:
+            return
+        g.add(name, lat, lon, state, aliases=aliases)
+        row = io.StringIO()
+        csv.writer(row).writerow([name, state, lat, lon, 0, "|".join(aliases)])
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(LEARNED_PATH)), exist_ok=True)
+            size = os.path.getsize(LEARNED_PATH) if os.path.exists(LEARNED_PATH) else 0
+            if size >= LEARNED_MAX_BYTES:
+                return
+            header = "" if size else "name,state,lat,lon,population,aliases\r\n"
+            # one append per row, so concurrent processes never interleave partial lines
+            with open(LEARNED_PATH, "a", encoding="utf-8", newline="") as f:
+                f.write(header + row.getvalue())
+        except OSError:
+            pass
+
+
+def preload_in_background():
+    """Start loading the gazetteer so the first city search doesn't pay for it"""
+    if _gazetteer is None:
+        threading.Thread(target=get_gazetteer, name="gazetteer-load", daemon=True).start()
@@ -0,0 +1,62 @@
+"""Vectorized spherical geometry helpers (NumPy, broadcastable inputs)."""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; scalars or any broadcastable arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+DIRECTIONS = np.array(["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"], dtype=object)
+
+# Walking-pace ETA used by the evacuation routes (minutes per km)
+MINUTES_PER_KM = 2.5
+
+
+def bearing_deg(lat1, lon1, lat2, lon2):
+    """Initial great-circle bearing in degrees [0, 360) from point 1 to point 2"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    d_lon = lon2 - lon1
+    cos_lat2 = np.cos(lat2)
+    x = cos_lat2 * np.sin(d_lon)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * cos_lat2 * np.cos(d_lon)
+    return np.degrees(np.arctan2(x, y)) % 360
+
+
+def cardinal_index(bearing):
+    """Index into DIRECTIONS for bearings in degrees (rounds half to even, like `round`)"""
+    return np.round(np.asarray(bearing) / 45).astype(np.int64) % 8
+
+
+def cardinal_direction(lat1, lon1, lat2, lon2):
+    """8-point direction name(s) from point 1 to point 2"""
+    return DIRECTIONS[cardinal_index(bearing_deg(lat1, lon1, lat2, lon2))]
+
+
+def eta_minutes(distance_km, minutes_per_km=MINUTES_PER_KM):
+    """Whole-minute ETA for the given distance(s)"""
+    return (np.asarray(distance_km, dtype=np.float64) * minutes_per_km).astype(np.int64)
+
+
+def route_matrix(user_lat, user_lon, shelter_lat, shelter_lon):
+    """Distances, bearings, direction indices and ETAs for every (user, shelter) pair.
+
+    Users and shelters are 1-D arrays; results are (n_users, n_shelters) arrays
+    computed in one broadcast pass.
+    """
+    ulat = np.asarray(user_lat, dtype=np.float64)[:, None]
+    ulon = np.asarray(user_lon, dtype=np.float64)[:, None]
+    slat = np.asarray(shelter_lat, dtype=np.float64)[None, :]
+    slon = np.asarray(shelter_lon, dtype=np.float64)[None, :]
+    dist = haversine_km(ulat, ulon, slat, slon)
+    bearing = bearing_deg(ulat, ulon, slat, slon)
+    return {
+        "distance_km": dist,
+        "bearing": bearing,
+        "direction_idx": cardinal_index(bearing),
+        "eta_min": eta_minutes(dist),
+    }
@@ -0,0 +1,120 @@
+"""Compact text rendering for battery-saver (low-bandwidth) mode.
+
+Battery saver skips folium, plotly and the decorative CSS/JS. Risk, forecast,
+shelters and routes come as a few short lines, cached per (tile, weather,
+forecast), so every session in the same ~1 km tile shares one computation.
+PageBudget caps the bytes a rerun emits, widgets included: every line of
+text-mode output is counted, controls and headings are covered by a fixed
+allowance, and once the cap is reached the lower-priority sections are
+dropped instead of sent. benchmarks/bench_page_bytes.py checks the whole
+rerun against the same cap.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from floodsafe.assignment import plan_version
+from floodsafe.analytics import SLOT_HOURS, forecast_columns, payload_hash, peak_intensity
+from floodsafe.cache import tile_key
+from floodsafe.roads import get_router
+from floodsafe.routing import get_evacuation_routes
+from floodsafe.shelters import find_nearby_shelters, registry_version
+
+BUDGET_BYTES = int(os.environ.get("FLOODSAFE_LOWBAND_BUDGET", 4096))
+# Serialized size of what the text page always sends besides its text: the
+# sidebar controls, buttons, headings and the closing caption
+FIXED_BYTES = 2048
+
+# Just enough style for the banners the text-mode page still uses
+LITE_CSS = (
+    "<style>.alert-banner{padding:8px;color:#111}.alert-danger{background:#f8d7da}"
+    ".alert-warning{background:#fff3cd}.alert-safe{background:#d4edda}</style>"
+)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 512
+
+
+class PageBudget:
+    """Running byte count for one rerun, starting from the fixed widget allowance"""
+
+    def __init__(self, limit=BUDGET_BYTES, fixed=FIXED_BYTES):
+        self.limit = limit
+        self.used = fixed
+        self.dropped = 0
+
+    def spend(self, text):
+        """Count `text` that is always sent (risk, shelters, contacts); may run past the
+        limit, in which case every later take() fails"""
+        self.used += len(text.encode("utf-8"))
+
+    def take(self, text):
+        """Reserve room for `text`; False (and nothing reserved) when it would not fit"""
+        n = len(text.encode("utf-8"))
+        if self.used + n > self.limit:
+            self.dropped += 1
+            return False
+        self.used += n
+        return True
+
+    def fit(self, lines):
+        """The lines that still fit, in order, joined as markdown (separators counted); "" if none"""
+        kept = [line for line in lines if self.take(line + "  \n")]
+        return "  \n".join(kept)
+
+
+def forecast_line(forecast, hours=24):
+    """'Next 24h: 18.5 mm, peak 2.1 mm/h Tue 15:00' from a forecast payload, or None"""
+    if not forecast or not forecast.get("list"):
+        return None
+    cols = forecast_columns(forecast)
+    rain = cols["rain_mm"][: max(1, hours // SLOT_HOURS)]
+    slot, mm_h = peak_intensity(rain)
+    when = cols["time"][int(slot)].strftime("%a %H:%M")
+    return f"Next {hours}h: {rain.sum():.1f} mm rain, peak {float(mm_h):.1f} mm/h {when}"
+
+
+def compact_summary(lat, lon, weather, forecast, risk_level, risk_reasons, route_shelters=None):
+    """Short lines for the text-only page: risk, forecast, shelters and routes (cached per
+    tile, and refreshed when the shelter registry, plan or flood zones change).
+
+    Routes go to `route_shelters` when given (assignment.planned_shelters, as on the
+    full page), else to the nearest shelters with space.
+    """
+    router = get_router()
+    key = (tile_key(lat, lon), risk_level,
+           payload_hash(weather) if weather else None,
+           payload_hash(forecast) if forecast else None,
+           registry_version(), router.version if router is not None else None,
+           plan_version() if route_shelters else None)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+    if weather:
+        risk = [f"Flood risk: {risk_level}. Rain (1h): {weather.get('rain_1h', 0)} mm, {weather.get('desc', '')}, {weather.get('temp')}°C."]
+        risk += [f"- {r}" for r in risk_reasons]
+    else:
+        risk = ["Weather data not available for this location."]
+    shelters = find_nearby_shelters(lat, lon)
+    routes = get_evacuation_routes(lat, lon, route_shelters or shelters)
+    summary = {
+        "risk": risk,
+        "forecast": forecast_line(forecast),
+        "shelters": [
+            f"{s['name']}: {s['distance_km']} km, {s['capacity'] - s['occupancy']} places free" for s in shelters[:3]
+        ],
+        "routes": [f"{r['shelter']}: head {r['direction']}, {r['distance']} km, ~{r['estimated_time']}" for r in routes],
+    }
+    with _cache_lock:
+        _cache[key] = summary
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return summary
+
+
+def contacts_line(contacts):
+    """All emergency numbers on one line"""
+    return " · ".join(f"{c['name']} {c['number']}" for group in contacts.values() for c in group)
@@ -0,0 +1,148 @@
+"""Cached folium rendering for the dashboard map.
+
+Rendered HTML is cached by (tile, zoom, risk level, marker-set hash, route). Small
+marker sets get one folium.Marker each; large ones are aggregated server-side
+into grid clusters drawn as a single GeoJSON layer, so HTML size is bounded by
+the number of clusters rather than the number of points. Offline mode gets a
+static SVG sketch with no map tiles or JavaScript; battery-saver mode shows
+no map at all (see floodsafe.lowband).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from floodsafe.cache import tile_key
+from floodsafe.risk import RISK_COLORS, RISK_RADIUS_M
+
+
+# Above this many markers, points are clustered instead of drawn one by one
+CLUSTER_THRESHOLD = 200
+# Map HTML is shared within ~110 m tiles; the user marker moves by at most that much
+MAP_TILE_DEG = 0.001
+
+# Upper bound on clusters in one layer; the grid coarsens until it fits
+MAX_CLUSTERS = 400
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 128
+hits = 0
+misses = 0
+
+
+def marker_set_hash(lat, lon, labels):
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(lat, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(lon, dtype=np.float64).tobytes())
+    h.update("\x00".join(map(str, labels)).encode("utf-8"))
+    return h.hexdigest()
+
+
+def cluster_points(lat, lon, zoom, max_clusters=MAX_CLUSTERS):
+    """Aggregate points into grid cells sized for `zoom`: (centroid lat, centroid lon, counts)"""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    cell = 360.0 / 2 ** zoom * 0.25  # roughly 64 px at this zoom
+    while True:
+        keys = np.floor(lat / cell).astype(np.int64) * 1_000_003 + np.floor(lon / cell).astype(np.int64)
+        uniq, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        if len(uniq) <= max_clusters:
+            break
+        cell *= 2
+    clat = np.bincount(inverse, weights=lat) / counts
+    clon = np.bincount(inverse, weights=lon) / counts
+    return clat, clon, counts
+
+
+def _add_clusters(m, lat, lon, zoom):
+    import folium
+    clat, clon, counts = cluster_points(lat, lon, zoom)
+    features = [
+        {"type": "Feature", "properties": {"count": int(c)}, "geometry": {"type": "Point", "coordinates": [round(x, 5), round(y, 5)]}}
+        for y, x, c in zip(clat.tolist(), clon.tolist(), counts.tolist())
+    ]
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": features},
+        name="shelters",
+        marker=folium.CircleMarker(radius=8, color="#1e8e3e", fill=True, fill_opacity=0.7),
+        style_function=lambda f: {"radius": 6 + 3 * np.log2(f["properties"]["count"])},
+        tooltip=folium.GeoJsonTooltip(fields=["count"], aliases=["Shelters"]),
+    ).add_to(m)
+
+
+def build_map(lat, lon, marker_lat, marker_lon, labels, risk_level=None, zoom=13, route=None):
+    import folium
+    m = folium.Map(location=[lat, lon], zoom_start=zoom, control_scale=True)
+    folium.Marker([lat, lon], popup="Selected Location", icon=folium.Icon(color="blue", icon="user")).add_to(m)
+    if len(marker_lat) > CLUSTER_THRESHOLD:
+        _add_clusters(m, marker_lat, marker_lon, zoom)
+    else:
+        for y, x, label in zip(marker_lat, marker_lon, labels):
+            folium.Marker([float(y), float(x)], popup=label, icon=folium.Icon(color="green", icon="home")).add_to(m)
+    if risk_level in RISK_COLORS:
+        folium.Circle([lat, lon], radius=RISK_RADIUS_M[risk_level],
+                      color=RISK_COLORS[risk_level], fill=True, fill_opacity=0.25).add_to(m)
+    if route:
+        folium.PolyLine(route, color="#1a73e8", weight=5, opacity=0.8, tooltip="Evacuation route").add_to(m)
+    return m
+
+
+def render_static_svg(lat, lon, marker_lat, marker_lon, risk_level=None, size=320, span_km=12.0, route=None):
+    """Tile-free SVG sketch: user at the centre, shelters as dots, risk ring and route to scale"""
+    km_per_px = span_km / size
+    cx = cy = size / 2
+    dx = (np.asarray(marker_lon, dtype=np.float64) - lon) * 111.32 * np.cos(np.radians(lat)) / km_per_px + cx
+    dy = cy - (np.asarray(marker_lat, dtype=np.float64) - lat) * 111.32 / km_per_px
+    inside = (dx >= 0) & (dx <= size) & (dy >= 0) & (dy <= size)
+    if inside.sum() > CLUSTER_THRESHOLD:
+        # one dot per occupied pixel block keeps the SVG small
+        cells = np.unique(np.stack([dx[inside] // 16, dy[inside] // 16], axis=1), axis=0) * 16 + 8
+        dx, dy = cells[:, 0], cells[:, 1]
+    else:
+        dx, dy = dx[inside], dy[inside]
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" style="background:#eef3f8">']
+    if risk_level in RISK_COLORS:
+        r = RISK_RADIUS_M[risk_level] / 1000 / km_per_px
+        parts.append(f'<circle cx="{cx}" cy="{cy}" r="{r:.0f}" fill="{RISK_COLORS[risk_level]}" fill-opacity="0.25"/>')
+    if route:
+        ry, rx = np.asarray(route, dtype=np.float64).T
+        px = (rx - lon) * 111.32 * np.cos(np.radians(lat)) / km_per_px + cx
+        py = cy - (ry - lat) * 111.32 / km_per_px
+        points = " ".join(f"{x:.0f},{y:.0f}" for x, y in zip(px, py))
+        parts.append(f'<polyline points="{points}" fill="none" stroke="#1a73e8" stroke-width="3"/>')
+    parts.extend(f'<circle cx="{x:.0f}" cy="{y:.0f}" r="3" fill="#1e8e3e"/>' for x, y in zip(dx, dy))
+    parts.append(f'<circle cx="{cx}" cy="{cy}" r="5" fill="#1a73e8"/></svg>')
+    return "".join(parts)
+
+
+def render_map_html(lat, lon, marker_lat, marker_lon, labels, risk_level=None, zoom=13, static=False, route=None):
+    """Map HTML for the dashboard, served from cache when nothing relevant changed.
+
+    `route` is an optional [[lat, lon], ...] road path drawn as a polyline.
+    """
+    global hits, misses
+    route_key = hashlib.sha1(np.ascontiguousarray(route, dtype=np.float64).tobytes()).hexdigest() if route else None
+    key = (tile_key(lat, lon, MAP_TILE_DEG), zoom, risk_level, static, marker_set_hash(marker_lat, marker_lon, labels), route_key)
+    with _cache_lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key)
+            hits += 1
+            return html
+        misses += 1
+    if static:
+        html = render_static_svg(lat, lon, marker_lat, marker_lon, risk_level, route=route)
+    else:
+        html = build_map(lat, lon, marker_lat, marker_lon, labels, risk_level, zoom, route).get_root().render()
+    with _cache_lock:
+        _cache[key] = html
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return html
+
+
+def cache_stats():
+    with _cache_lock:
+        return {"size": len(_cache), "hits": hits, "misses": misses}
@@ -0,0 +1,154 @@
+"""In-memory, content-addressed offline map packages.
+
+A package is a zip holding the folium map HTML, centred on and marking the
+requested location, and a shelters GeoJSON. It is built entirely in memory
+and identified by a hash of (position, shelters, risk), so repeat downloads
+from the same place are served from cache. Nothing is written to disk unless
+FLOODSAFE_OFFLINE_DIR names a directory; then packages are also kept there
+(one immutable file per hash), so packages prebuilt by the worker are
+visible to every dashboard process.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+from floodsafe.risk import RISK_COLORS, RISK_RADIUS_M
+from floodsafe.shelters import get_registry
+
+OFFLINE_DIR = os.environ.get("FLOODSAFE_OFFLINE_DIR")  # unset: in-memory only
+
+
+_cache = OrderedDict()  # digest -> zip bytes
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 64
+
+
+def offline_shelters(lat, lon):
+    """Shelters bundled with a package: the registry's nearest, else fixed demo offsets"""
+    registry = get_registry()
+    if registry is not None:
+        return [{"name": s["name"], "lat": s["lat"], "lon": s["lon"]} for s in registry.nearest(lat, lon, k=10)]
+    return [
+        {"name":"Central High School","lat":lat+0.003,"lon":lon+0.004},
+        {"name":"Community Center","lat":lat-0.004,"lon":lon-0.003},
+        {"name":"City Hospital","lat":lat+0.006,"lon":lon-0.002}
+    ]
+
+
+def package_key(position, shelters, risk_level):
+    blob = json.dumps({"position": list(position), "shelters": shelters, "risk": risk_level}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def shelters_geojson(shelters):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type":"Feature","properties":{"name":s['name']},"geometry":{"type":"Point","coordinates":[s['lon'], s['lat']]}}
+            for s in shelters
+        ],
+    }
+
+
+def render_map_html(lat, lon, shelters, risk_level=None):
+    import folium
+    m = folium.Map(location=[lat, lon], zoom_start=12)
+    folium.TileLayer("OpenStreetMap").add_to(m)
+    folium.Marker([lat, lon], popup="Selected Location").add_to(m)
+    for s in shelters:
+        folium.Marker([s['lat'], s['lon']], popup=s['name']).add_to(m)
+    if risk_level in RISK_COLORS:
+        folium.Circle([lat, lon], radius=RISK_RADIUS_M[risk_level], color=RISK_COLORS[risk_level],
+                      fill=True, fill_opacity=0.25).add_to(m)
+    return m.get_root().render()
+
+
+def _build(lat, lon, shelters, risk_level):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("offline_map.html", render_map_html(lat, lon, shelters, risk_level))
+        zf.writestr("shelters.geojson", json.dumps(shelters_geojson(shelters)))
+    return buf.getvalue()
+
+
+def _remember(digest, data):
+    with _cache_lock:
+        _cache[digest] = data
+        _cache.move_to_end(digest)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _disk_path(digest):
+    return os.path.join(OFFLINE_DIR, digest + ".zip")
+
+
+def get_offline_package(lat, lon, risk_level=None):
+    """(zip bytes, digest) for a map around (lat, lon); built at most once per content"""
+    # ~1 m precision: the marker sits where the user is, not at a shared tile centre
+    lat, lon = round(float(lat), 5), round(float(lon), 5)
+    shelters = offline_shelters(lat, lon)
+    digest = package_key((lat, lon), shelters, risk_level)
+    with _cache_lock:
+        data = _cache.get(digest)
+        if data is not None:
+            _cache.move_to_end(digest)
+            return data, digest
+    data = _read_disk(digest)
+    if data is None:
+        data = _build(lat, lon, shelters, risk_level)
+        _write_atomic(digest, data)
+    _remember(digest, data)
+    return data, digest
+
+
+def _read_disk(digest):
+    if not OFFLINE_DIR:
+        return None
+    try:
+        with open(_disk_path(digest), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_atomic(digest, data):
+    """Best-effort write of an immutable, content-addressed file (only with FLOODSAFE_OFFLINE_DIR)"""
+    if not OFFLINE_DIR:
+        return
+    try:
+        os.makedirs(OFFLINE_DIR, exist_ok=True)
+        tmp = _disk_path(digest) + ".%d.tmp" % threading.get_ident()
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, _disk_path(digest))
+    except OSError:
+        pass
+
+
+_RISK_ORDER = {"High": 0, "Moderate": 1, "Low": 2}
+
+
+def prebuild(regions, top_n=10, store=None):
+    """Build packages for the `top_n` riskiest regions (risk read from the snapshot store).
+
+    Other processes only see them when FLOODSAFE_OFFLINE_DIR is set.
+    """
+    if store is None:
+        from floodsafe.store import STORE as store
+    ranked = []
+    for r in regions:
+        risk = store.get("risk", r["lat"], r["lon"], max_age=None) or {}
+        ranked.append((_RISK_ORDER.get(risk.get("level"), 3), r, risk.get("level")))
+    ranked.sort(key=lambda x: x[0])
+    return [get_offline_package(r["lat"], r["lon"], level)[1] for _, r, level in ranked[:top_n]]
+
+
+def prebuild_in_background(regions, top_n=10, store=None):
+    t = threading.Thread(target=prebuild, args=(regions, top_n, store), name="offline-prebuild", daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,313 @@
+"""Gridded rainfall ingestion with zonal statistics per district.
+
+Nowcast rasters are read a band of rows at a time and are never held whole
+in memory. The readers are:
+
+- raw binary (.bin/.f32) with a JSON sidecar, memory-mapped per band
+- NetCDF, through netCDF4 if it is installed
+- GeoTIFF, through rasterio if it is installed
+
+District polygons are rasterized once per grid into a cell -> zone index array
+(.npy, memory-mapped on later runs). Each band is then reduced with np.bincount
+(sums, counts, exceedance counts) and np.maximum.at (maxima). The latest result
+is saved next to the index. district_rain() answers "which district is this
+point in and how wet is it" for the Area Summary.
+
+Sidecar for raw rasters (<file>.json):
+    {"width": 10000, "height": 10000, "dtype": "<f4", "lon0": 68.0, "lat0": 37.0,
+     "dlon": 0.003, "dlat": 0.003, "nodata": -9999, "valid_time": "2024-07-28T06:00Z"}
+lon0/lat0 are the west/north edges of the grid; rows run north to south.
+
+Ingest: python -m floodsafe.raster ingest nowcast.bin --districts districts.geojson
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+RASTER_DIR = os.environ.get("FLOODSAFE_RASTER_DIR", "rasters")
+DISTRICTS_PATH = os.environ.get("FLOODSAFE_DISTRICTS")
+
+# Exceedance thresholds, mm per nowcast period
+THRESHOLDS_MM = (10.0, 25.0, 50.0)
+CHUNK_ROWS = 512
+
+
+class Grid:
+    def __init__(self, width, height, lon0, lat0, dlon, dlat):
+        self.width, self.height = int(width), int(height)
+        self.lon0, self.lat0 = float(lon0), float(lat0)
+        self.dlon, self.dlat = float(dlon), float(dlat)
+
+    def signature(self):
+        return (self.width, self.height, round(self.lon0, 9), round(self.lat0, 9), round(self.dlon, 12), round(self.dlat, 12))
+
+    def cell(self, lat, lon):
+        """(row, col) containing a point, or None outside the grid"""
+        r = int((self.lat0 - lat) // self.dlat)
+        c = int((lon - self.lon0) // self.dlon)
+        if 0 <= r < self.height and 0 <= c < self.width:
+            return r, c
+        return None
+
+
+class RawRaster:
+    """Headerless binary grid, memory-mapped one band of rows at a time"""
+
+    def __init__(self, path, meta=None):
+        if meta is None:
+            with open(path + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+        self.path = path
+        self.dtype = np.dtype(meta.get("dtype", "<f4"))
+        self.grid = Grid(meta["width"], meta["height"], meta["lon0"], meta["lat0"], meta["dlon"], meta["dlat"])
+        self.nodata = meta.get("nodata")
+        self.valid_time = meta.get("valid_time")
+
+    def rows(self, r0, r1):
+        w = self.grid.width
+        band = np.memmap(self.path, dtype=self.dtype, mode="r", offset=r0 * w * self.dtype.itemsize, shape=(r1 - r0, w))
+        out = np.array(band, dtype=np.float32)
+        del band  # unmap so resident memory stays at one band
+        return out
+
+
+class NetCDFRaster:
+    """A 2-D (lat, lon) or 3-D (time, lat, lon) NetCDF variable, sliced lazily"""
+
+    def __init__(self, path, variable="precipitation"):
+        import netCDF4
+        self.ds = netCDF4.Dataset(path)
+        self.var = self.ds.variables[variable]
+        lat = self.ds.variables["lat"][:]
+        lon = self.ds.variables["lon"][:]
+        self.flip = lat[0] < lat[-1]  # grids stored south to north
+        dlat, dlon = abs(float(lat[1] - lat[0])), float(lon[1] - lon[0])
+        self.grid = Grid(len(lon), len(lat), float(lon[0]) - dlon / 2, float(lat.max()) + dlat / 2, dlon, dlat)
+        self.nodata = getattr(self.var, "_FillValue", None)
+        self.valid_time = None
+
+    def rows(self, r0, r1):
+        h = self.grid.height
+        sl = slice(h - r1, h - r0) if self.flip else slice(r0, r1)
+        band = self.var[-1, sl, :] if self.var.ndim == 3 else self.var[sl, :]
+        band = np.ma.filled(band, np.nan).astype(np.float32)
+        return band[::-1] if self.flip else band
+
+
+class GeoTiffRaster:
+    """Band 1 of a north-up GeoTIFF, read with windowed reads"""
+
+    def __init__(self, path):
+        import rasterio
+        self.ds = rasterio.open(path)
+        t = self.ds.transform
+        self.grid = Grid(self.ds.width, self.ds.height, t.c, t.f, t.a, -t.e)
+        self.nodata = self.ds.nodata
+        self.valid_time = self.ds.tags().get("valid_time")
+
+    def rows(self, r0, r1):
+        from rasterio.windows import Window
+        return self.ds.read(1, window=Window(0, r0, self.grid.width, r1 - r0)).astype(np.float32)
+
+
+def open_raster(path, variable="precipitation"):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".nc", ".nc4", ".netcdf"):
+        return NetCDFRaster(path, variable)
+    if ext in (".tif", ".tiff"):
+        return GeoTiffRaster(path)
+    return RawRaster(path)
+
+
+# ---- districts -> cell/zone index ----
+
+def load_districts(path):
+    """(names, polygons) from GeoJSON; each polygon is a list of rings of (lon, lat)"""
+    with open(path, encoding="utf-8") as f:
+        fc = json.load(f)
+    names, polys = [], []
+    for i, feat in enumerate(fc["features"]):
+        geom = feat["geometry"]
+        parts = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+        props = feat.get("properties") or {}
+        names.append(str(props.get("name") or props.get("district") or f"zone {i}"))
+        polys.append([np.asarray(ring, dtype=np.float64) for part in parts for ring in part])
+    return names, polys
+
+
+def _fill_polygon(index, grid, rings, zone_id, rows_per_pass=256):
+    """Scanline even-odd fill of cells whose centre lies inside `rings` (holes included)"""
+    edges = np.concatenate([np.stack([ring[:-1], ring[1:]], axis=1) if np.array_equal(ring[0], ring[-1])
+                            else np.stack([ring, np.roll(ring, -1, axis=0)], axis=1) for ring in rings])
+    x0, y0, x1, y1 = edges[:, 0, 0], edges[:, 0, 1], edges[:, 1, 0], edges[:, 1, 1]
+    lat_max, lat_min = max(y0.max(), y1.max()), min(y0.min(), y1.min())
+    r_lo = max(0, int((grid.lat0 - lat_max) / grid.dlat - 0.5))
+    r_hi = min(grid.height, int((grid.lat0 - lat_min) / grid.dlat + 0.5) + 1)
+    for start in range(r_lo, r_hi, rows_per_pass):
+        stop = min(r_hi, start + rows_per_pass)
+        yc = grid.lat0 - (np.arange(start, stop) + 0.5) * grid.dlat
+        # half-open rule so a vertex on the scanline is counted once
+        crosses = (y0[None, :] > yc[:, None]) != (y1[None, :] > yc[:, None])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            xs = x0 + (yc[:, None] - y0) * (x1 - x0) / (y1 - y0)
+        xs = np.where(crosses, xs, np.inf)
+        xs.sort(axis=1)
+        for k, row in enumerate(range(start, stop)):
+            n = int(np.count_nonzero(crosses[k]))
+            for a, b in xs[k, :n].reshape(-1, 2):
+                c0 = max(0, int(np.ceil((a - grid.lon0) / grid.dlon - 0.5)))
+                c1 = min(grid.width, int(np.ceil((b - grid.lon0) / grid.dlon - 0.5)))
+                if c1 > c0:
+                    index[row, c0:c1] = zone_id
+
+
+def zone_index_path(grid, districts_path, directory=RASTER_DIR):
+    st = os.stat(districts_path)
+    key = json.dumps([grid.signature(), os.path.abspath(districts_path), st.st_size, st.st_mtime_ns])
+    return os.path.join(directory, "zones_%s.npy" % hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def build_zone_index(grid, districts_path, directory=RASTER_DIR):
+    """(memmapped int16/int32 index, names): cell -> district number, -1 outside.
+
+    Built once per (grid, districts file) and reused from disk afterwards.
+    """
+    names, polys = load_districts(districts_path)
+    path = zone_index_path(grid, districts_path, directory)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        dtype = np.int16 if len(names) < np.iinfo(np.int16).max else np.int32
+        tmp = path + ".tmp.npy"
+        index = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=(grid.height, grid.width))
+        index[:] = -1
+        for zone_id, rings in enumerate(polys):
+            _fill_polygon(index, grid, rings, zone_id)
+        index.flush()
+        del index
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode="r"), names
+
+
+# ---- zonal statistics ----
+
+def zonal_stats(raster, index, n_zones, thresholds=THRESHOLDS_MM, chunk_rows=CHUNK_ROWS):
+    """Per-zone count, sum, mean, max and exceedance fraction per threshold.
+
+    One band of rows is in memory at a time; everything is bincount/ufunc.at.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float32)
+    nt = len(thresholds) + 1
+    sums = np.zeros(n_zones)
+    maxima = np.full(n_zones, -np.inf, dtype=np.float32)
+    binned = np.zeros(n_zones * nt, dtype=np.int64)
+    for r0 in range(0, raster.grid.height, chunk_rows):
+        r1 = min(raster.grid.height, r0 + chunk_rows)
+        z = np.asarray(index[r0:r1]).ravel()
+        v = raster.rows(r0, r1).ravel()
+        ok = (z >= 0) & np.isfinite(v)
+        if raster.nodata is not None:
+            ok &= v != raster.nodata
+        z, v = z[ok].astype(np.intp), v[ok]
+        sums += np.bincount(z, weights=v, minlength=n_zones)
+        np.maximum.at(maxima, z, v)
+        # one pass for all thresholds: count cells per (zone, threshold bin)
+        binned += np.bincount(z * nt + np.searchsorted(thresholds, v, side="right"), minlength=n_zones * nt)
+    binned = binned.reshape(n_zones, nt)
+    counts = binned.sum(axis=1)
+    above = np.cumsum(binned[:, ::-1], axis=1)[:, ::-1][:, 1:]  # cells >= each threshold
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "count": counts,
+            "sum": sums,
+            "mean": np.where(counts > 0, sums / counts, np.nan),
+            "max": np.where(counts > 0, maxima, np.nan),
+            "exceed": np.where(counts[:, None] > 0, above / counts[:, None], np.nan),
+            "thresholds": thresholds,
+        }
+
+
+def latest_path(directory=RASTER_DIR):
+    return os.path.join(directory, "zonal_latest.npz")
+
+
+def ingest(raster_path, districts_path, directory=RASTER_DIR, thresholds=THRESHOLDS_MM, variable="precipitation"):
+    """Zonal statistics for one raster, saved as the latest result; returns the stats dict"""
+    raster = open_raster(raster_path, variable)
+    index, names = build_zone_index(raster.grid, districts_path, directory)
+    stats = zonal_stats(raster, index, len(names), thresholds)
+    tmp = latest_path(directory) + ".tmp.npz"
+    np.savez(tmp, names=np.array(names), index_path=np.array(zone_index_path(raster.grid, districts_path, directory)),
+             grid=np.array(raster.grid.signature(), dtype=np.float64), valid_time=np.array(raster.valid_time or ""),
+             ingested_at=np.array(time.time()), **stats)
+    os.replace(tmp, latest_path(directory))
+    return stats
+
+
+_latest = None
+_latest_mtime = None
+_latest_lock = threading.Lock()
+
+
+def _load_latest(directory=RASTER_DIR):
+    global _latest, _latest_mtime
+    path = latest_path(directory)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    with _latest_lock:
+        if mtime != _latest_mtime:
+            with np.load(path, allow_pickle=False) as z:
+                data = {k: z[k] for k in z.files}
+            w, h, lon0, lat0, dlon, dlat = data["grid"]
+            data["grid"] = Grid(w, h, lon0, lat0, dlon, dlat)
+            data["index"] = np.load(str(data["index_path"]), mmap_mode="r")
+            _latest, _latest_mtime = data, mtime
+        return _latest
+
+
+def district_rain(lat, lon, directory=RASTER_DIR):
+    """Latest zonal rainfall for the district containing (lat, lon), or None.
+
+    Returns {'district', 'mean_mm', 'max_mm', 'exceed': {threshold: fraction}, 'valid_time'}.
+    """
+    data = _load_latest(directory)
+    if data is None:
+        return None
+    cell = data["grid"].cell(lat, lon)
+    if cell is None:
+        return None
+    zone = int(data["index"][cell])
+    if zone < 0 or data["count"][zone] == 0:
+        return None
+    return {
+        "district": str(data["names"][zone]),
+        "mean_mm": float(data["mean"][zone]),
+        "max_mm": float(data["max"][zone]),
+        "exceed": {float(t): float(f) for t, f in zip(data["thresholds"], data["exceed"][zone])},
+        "valid_time": str(data["valid_time"]) or None,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ing = sub.add_parser("ingest", help="compute zonal statistics for one raster")
+    ing.add_argument("raster")
+    ing.add_argument("--districts", default=DISTRICTS_PATH, required=DISTRICTS_PATH is None)
+    ing.add_argument("--variable", default="precipitation", help="NetCDF variable name")
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    stats = ingest(args.raster, args.districts, variable=args.variable)
+    wet = int(np.count_nonzero(stats["exceed"][:, -1] > 0))
+    print(f"{len(stats['count'])} districts in {time.perf_counter() - t0:.1f} s; "
+          f"{wet} with cells >= {THRESHOLDS_MM[-1]:g} mm")
+
+
+if __name__ == "__main__":
+    main()
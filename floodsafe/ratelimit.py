@@ -0,0 +1,182 @@
+"""Single-flight request coalescing and per-key token-bucket rate limiting.
+
+Identical in-flight requests share one upstream call. Every upstream call
+also takes a token from the bucket of its API key; background work (cache
+refresh, the polling worker) may not dip into the reserve kept for
+interactive dashboard requests.
+
+Buckets live in process memory. FLOODSAFE_RATE_PER_MIN and
+FLOODSAFE_RATE_BURST are the budget of one API key across the whole
+deployment and are split evenly between the FLOODSAFE_RATE_PROCESSES
+processes that share the key (by default 2: the dashboard and the polling
+worker), so together they stay within the provider's quota.
+"""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+RATE_PER_MIN = float(os.environ.get("FLOODSAFE_RATE_PER_MIN", 60))
+BURST = float(os.environ.get("FLOODSAFE_RATE_BURST", 20))
+# Processes calling upstream with the same key; each gets an equal share
+PROCESSES = max(1, int(os.environ.get("FLOODSAFE_RATE_PROCESSES", 2)))
+# Share of the bucket only interactive requests may use
+INTERACTIVE_RESERVE = float(os.environ.get("FLOODSAFE_INTERACTIVE_RESERVE", 0.25))
+# How long a caller will wait for a token before giving up (seconds)
+MAX_WAIT = {INTERACTIVE: 2.0, BACKGROUND: 30.0}
+
+
+class Throttled(Exception):
+    """No token became available within the caller's wait budget"""
+
+
+_priority = threading.local()
+
+
+def current_priority():
+    return getattr(_priority, "value", INTERACTIVE)
+
+
+@contextmanager
+def background():
+    """Mark upstream calls made by this thread as background work"""
+    prev = current_priority()
+    _priority.value = BACKGROUND
+    try:
+        yield
+    finally:
+        _priority.value = prev
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec, capacity, reserve=INTERACTIVE_RESERVE):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.reserve = capacity * reserve
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.cond = threading.Condition()
+        self.granted = 0
+        self.throttled = 0
+        self.delayed = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority=INTERACTIVE, max_wait=None):
+        """Take one token, waiting up to `max_wait` seconds; raises Throttled"""
+        floor = 0.0 if priority == INTERACTIVE else self.reserve
+        deadline = time.monotonic() + (MAX_WAIT[priority] if max_wait is None else max_wait)
+        waited = False
+        with self.cond:
+            while True:
+                self._refill()
+                if self.tokens - 1 >= floor:
+                    self.tokens -= 1
+                    self.granted += 1
+                    self.delayed += waited
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.throttled += 1
+                    raise Throttled(f"rate limit reached ({priority})")
+                waited = True
+                self.cond.wait(min(remaining, (floor + 1 - self.tokens) / self.rate))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters", "priority")
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.overtaken = 0
+
+    def do(self, key, fn):
+        """Run `fn()` once for all concurrent callers with the same key.
+
+        An interactive caller joining a background call waits at most its own
+        MAX_WAIT for it (the leader may be queued for a background token) and
+        then runs `fn()` itself against the interactive reserve.
+        """
+        priority = current_priority()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call(priority)
+                self.leaders += 1
+                leader = True
+        if not leader:
+            if priority == INTERACTIVE and call.priority != INTERACTIVE:
+                if not call.done.wait(MAX_WAIT[INTERACTIVE]):
+                    self.overtaken += 1
+                    return fn()
+            else:
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+FLIGHTS = SingleFlight()
+
+
+def key_label(api_key):
+    """Stable, non-secret bucket name for an API key (shown in stats())"""
+    return "key-" + hashlib.sha256(api_key.encode()).hexdigest()[:8]
+
+
+def bucket_for(label):
+    """This process's bucket for `label`; never pass a raw API key (see key_label)"""
+    with _buckets_lock:
+        b = _buckets.get(label)
+        if b is None:
+            b = _buckets[label] = TokenBucket(RATE_PER_MIN / 60.0 / PROCESSES, max(1.0, BURST / PROCESSES))
+        return b
+
+
+def stats():
+    with _buckets_lock:
+        buckets = dict(_buckets)
+    return {
+        "upstream_calls": FLIGHTS.leaders,
+        "coalesced_callers": FLIGHTS.coalesced,
+        "overtaken_background_calls": FLIGHTS.overtaken,
+        "buckets": {
+            k: {"tokens": round(b.tokens, 2), "granted": b.granted, "delayed": b.delayed, "throttled": b.throttled}
+            for k, b in buckets.items()
+        },
+    }
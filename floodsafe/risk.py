@@ -0,0 +1,138 @@
+"""Columnar flood-risk engine.
+
+Scores many locations in one NumPy pass: inputs are parallel arrays (rain in
+the last hour, city id), outputs are integer level codes plus a bitmask of
+reason codes. Human-readable reasons are only built for rows that are shown.
+"""
+import numpy as np
+
+LEVELS = ("Low", "Moderate", "High")
+LOW, MODERATE, HIGH = 0, 1, 2
+
+HEAVY_RAIN_MM = 50
+SIGNIFICANT_RAIN_MM = 20
+FLOOD_PRONE_RAIN_MM = 5
+
+FLOOD_PRONE_CITIES = ("Mumbai", "Chennai", "Kolkata", "Guwahati", "Patna")
+
+# Risk zone drawn around a location, by level
+RISK_COLORS = {"High": "#ea4335", "Moderate": "#fbbc05", "Low": "#34a853"}
+RISK_RADIUS_M = {"High": 3500, "Moderate": 2000, "Low": 1200}
+
+# reason bitmask
+R_VERY_HEAVY_RAIN = 1
+R_SIGNIFICANT_RAIN = 2
+R_NO_HEAVY_RAIN = 4
+R_FLOOD_PRONE_CITY = 8
+R_DISTRICT_EXCEEDANCE = 16
+
+# District-wide rainfall from gridded nowcasts (floodsafe.raster): a level
+# applies once this fraction of the district's cells is at or above the depth
+DISTRICT_HIGH = (50.0, 0.10)      # mm, fraction of area
+DISTRICT_MODERATE = (25.0, 0.25)
+
+
+def encode_cities(names):
+    """Map city names to (ids, vocabulary, flood_prone_by_id) for columnar scoring"""
+    vocab, ids = np.unique(np.asarray(names, dtype=object).astype(str), return_inverse=True)
+    return ids, vocab, np.isin(vocab, FLOOD_PRONE_CITIES)
+
+
+def score(rain_1h, flood_prone=None):
+    """Vectorized risk levels and reason bits.
+
+    rain_1h: rainfall in mm over the last hour, one value per location.
+    flood_prone: optional boolean array, True where the location is in a flood-prone city.
+    Returns (levels int8, reasons uint8).
+    """
+    rain = np.nan_to_num(np.asarray(rain_1h, dtype=np.float64))
+    heavy = rain >= HEAVY_RAIN_MM
+    significant = ~heavy & (rain >= SIGNIFICANT_RAIN_MM)
+    levels = np.where(heavy, HIGH, np.where(significant, MODERATE, LOW)).astype(np.int8)
+    reasons = np.where(heavy, R_VERY_HEAVY_RAIN, np.where(significant, R_SIGNIFICANT_RAIN, R_NO_HEAVY_RAIN)).astype(np.uint8)
+    if flood_prone is not None:
+        bump = np.asarray(flood_prone, dtype=bool) & (rain >= FLOOD_PRONE_RAIN_MM)
+        levels[bump] = HIGH
+        reasons[bump] |= R_FLOOD_PRONE_CITY
+    return levels, reasons
+
+
+class RiskBatch:
+    """Risk results for a batch of locations; reason text is built on demand per row"""
+
+    def __init__(self, rain_1h, city_ids=None, city_vocab=None, flood_prone_by_id=None):
+        self.rain_1h = rain_1h
+        self.city_ids = city_ids
+        self.city_vocab = city_vocab
+        prone = None
+        if city_ids is not None and flood_prone_by_id is not None:
+            prone = np.asarray(flood_prone_by_id, dtype=bool)[np.asarray(city_ids)]
+        self.levels, self.reasons = score(rain_1h, prone)
+
+    def __len__(self):
+        return len(self.levels)
+
+    @classmethod
+    def from_cities(cls, rain_1h, city_names):
+        ids, vocab, prone = encode_cities(city_names)
+        return cls(rain_1h, ids, vocab, prone)
+
+    def level(self, i):
+        return LEVELS[self.levels[i]]
+
+    def count(self, level):
+        return int(np.count_nonzero(self.levels == LEVELS.index(level)))
+
+    def reason_text(self, i):
+        bits = int(self.reasons[i])
+        rain = self.rain_1h[i]
+        out = []
+        if bits & R_VERY_HEAVY_RAIN:
+            out.append(f"Very heavy recent rainfall: {rain} mm/h")
+        elif bits & R_SIGNIFICANT_RAIN:
+            out.append(f"Significant recent rainfall: {rain} mm/h")
+        elif bits & R_NO_HEAVY_RAIN:
+            out.append("No heavy rainfall detected in last hour")
+        if bits & R_FLOOD_PRONE_CITY:
+            out.append(f"{self.city_vocab[self.city_ids[i]]} is flood-prone; small rains can escalate")
+        return out
+
+
+def district_level(district):
+    """(level code, reason bits, reason string or None) from raster.district_rain output"""
+    if not district:
+        return LOW, 0, None
+    exceed = district["exceed"]
+    for level, (mm, frac) in ((HIGH, DISTRICT_HIGH), (MODERATE, DISTRICT_MODERATE)):
+        share = exceed.get(mm, 0.0)
+        if share >= frac:
+            return level, R_DISTRICT_EXCEEDANCE, (
+                f"District {district['district']}: {share:.0%} of area above {mm:g} mm (max {district['max_mm']:.0f} mm)")
+    return LOW, 0, None
+
+
+def derive_risk_from_weather(weather, features=None, district=None):
+    """Single-location wrapper over the columnar engine: (level name, reason strings).
+
+    When a learned model is configured (floodsafe.riskmodel) it can raise the
+    level, never lower it below the fixed thresholds. `features` is its input
+    (riskmodel.location_features); by default only the weather is used.
+    `district` (raster.district_rain) raises the level when much of the
+    surrounding district is under heavy gridded rainfall.
+    """
+    if not weather:
+        return "Unknown", ["Weather data unavailable"]
+    batch = RiskBatch.from_cities([weather.get("rain_1h", 0)], [weather.get("city") or ""])
+    level, reasons = int(batch.levels[0]), batch.reason_text(0)
+    zonal_level, _, zonal_reason = district_level(district)
+    if zonal_reason:
+        reasons.append(zonal_reason)
+        level = max(level, zonal_level)
+    from floodsafe.riskmodel import explain, get_model, location_features
+    model = get_model()
+    if model is None:
+        return LEVELS[level], reasons
+    model_level, _, model_reasons = explain(model, features or location_features(weather))
+    if model_level > level:
+        return LEVELS[model_level], model_reasons + reasons
+    return LEVELS[level], reasons + model_reasons[:1]
@@ -0,0 +1,249 @@
+"""Pluggable learned flood-risk model.
+
+A model maps a feature matrix (one row per location or grid cell, columns in
+FEATURES order) to Low/Moderate/High probabilities. The bundled model is a
+multinomial logistic regression in plain NumPy, trained offline from a CSV and
+saved as .npz. Missing feature values (NaN) are imputed with the training mean,
+so locations without a gauge or terrain data still score.
+
+FLOODSAFE_RISK_MODEL points at the saved model; it is loaded on first use.
+Without it, risk.derive_risk_from_weather keeps using the fixed thresholds.
+Any object with `features` and `predict_proba(X)` can be installed with
+set_model().
+
+Train: python -m floodsafe.riskmodel train labelled.csv --out risk_model.npz
+       (columns: the FEATURES below plus `label` = Low/Moderate/High or 0/1/2)
+"""
+import argparse
+import csv
+import os
+import threading
+
+import numpy as np
+
+from floodsafe.analytics import forecast_columns, rolling_accumulations
+from floodsafe.risk import FLOOD_PRONE_CITIES, LEVELS
+
+MODEL_PATH = os.environ.get("FLOODSAFE_RISK_MODEL")
+
+FEATURES = (
+    "rain_1h",            # mm, last hour
+    "forecast_6h",        # mm, max 6h accumulation over the forecast horizon
+    "forecast_24h",       # mm, max 24h accumulation
+    "forecast_72h",       # mm, max 72h accumulation
+    "gauge_level",        # m, nearest gauge
+    "gauge_delta_24h",    # m, change over the last 24 h
+    "elevation_m",        # terrain height
+    "slope_deg",          # terrain slope
+    "flood_prone",        # 1 if in a flood-prone city
+)
+
+# Readable names for the top contributing features in reason text
+FEATURE_TEXT = {
+    "rain_1h": "recent rainfall",
+    "forecast_6h": "6h forecast rain",
+    "forecast_24h": "24h forecast rain",
+    "forecast_72h": "72h forecast rain",
+    "gauge_level": "river gauge level",
+    "gauge_delta_24h": "24h rise at the gauge",
+    "elevation_m": "low elevation",
+    "slope_deg": "flat terrain",
+    "flood_prone": "flood-prone city",
+}
+
+
+class LogisticModel:
+    """Multinomial logistic regression over standardized features"""
+
+    def __init__(self, weights, bias, mean, std, features=FEATURES):
+        self.features = tuple(features)
+        # Standardization is folded into the weights so scoring is one matmul
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self._w = self.weights / self.std[:, None]
+        self._b = self.bias - self.mean @ self._w
+
+    def logits(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        nan = np.isnan(X)
+        if nan.any():
+            X = np.where(nan, self.mean, X)
+        return X @ self._w + self._b
+
+    def predict_proba(self, X):
+        z = self.logits(X)
+        z -= z.max(axis=1, keepdims=True)
+        np.exp(z, out=z)
+        z /= z.sum(axis=1, keepdims=True)
+        return z
+
+    def predict(self, X):
+        """Level codes (0 Low, 1 Moderate, 2 High); argmax needs no softmax"""
+        return np.argmax(self.logits(X), axis=1).astype(np.int8)
+
+    def contributions(self, x, level):
+        """Per-feature push of one row towards `level`, in standardized units"""
+        x = np.where(np.isnan(x), self.mean, np.asarray(x, dtype=np.float32))
+        w = self.weights[:, level] - self.weights.mean(axis=1)
+        return (x - self.mean) / self.std * w
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, bias=self.bias, mean=self.mean, std=self.std,
+                 features=np.array(self.features))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            return cls(z["weights"], z["bias"], z["mean"], z["std"], [str(f) for f in z["features"]])
+
+
+def train_logistic(X, y, l2=1e-3, epochs=500, lr=0.5, features=FEATURES):
+    """Full-batch gradient descent on softmax cross-entropy; returns a LogisticModel"""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int64)
+    mean = np.nanmean(X, axis=0)
+    mean = np.where(np.isnan(mean), 0.0, mean)
+    X = np.where(np.isnan(X), mean, X)
+    std = X.std(axis=0)
+    std = np.where(std > 0, std, 1.0)
+    Z = (X - mean) / std
+    n, k = len(y), len(LEVELS)
+    onehot = np.eye(k)[y]
+    W = np.zeros((Z.shape[1], k))
+    b = np.zeros(k)
+    for _ in range(epochs):
+        logits = Z @ W + b
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        p /= p.sum(axis=1, keepdims=True)
+        g = (p - onehot) / n
+        W -= lr * (Z.T @ g + l2 * W)
+        b -= lr * g.sum(axis=0)
+    return LogisticModel(W, b, mean, std, features)
+
+
+def read_training_csv(path, features=FEATURES):
+    """(X, y) from a labelled CSV; blank cells become NaN"""
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    X = np.array([[float(r[c]) if r.get(c) not in (None, "") else np.nan for c in features] for r in rows])
+    y = np.array([LEVELS.index(r["label"]) if r["label"] in LEVELS else int(r["label"]) for r in rows])
+    return X, y
+
+
+def feature_matrix(columns, n=None, features=FEATURES):
+    """Stack per-feature arrays (missing ones as NaN) into an (n x features) float32 matrix"""
+    n = n if n is not None else len(next(iter(columns.values())))
+    X = np.full((n, len(features)), np.nan, dtype=np.float32)
+    for j, name in enumerate(features):
+        if name in columns:
+            X[:, j] = columns[name]
+    return X
+
+
+def location_features(weather, forecast=None, gauge=None, terrain=None):
+    """Feature dict for one location from what the dashboard already has.
+
+    gauge: GAUGES.change_since() tuple (level m, 24h change m or None, age s); terrain: {'elevation_m', 'slope_deg'}.
+    """
+    feats = {
+        "rain_1h": (weather or {}).get("rain_1h", 0),
+        "flood_prone": float((weather or {}).get("city") in FLOOD_PRONE_CITIES),
+    }
+    if forecast and forecast.get("list"):
+        acc = rolling_accumulations(forecast_columns(forecast)["rain_mm"], (6, 24, 72))
+        for hours, series in acc.items():
+            feats[f"forecast_{hours}h"] = float(series.max())
+    if gauge:
+        feats["gauge_level"] = gauge[0]
+        if gauge[1] is not None:
+            feats["gauge_delta_24h"] = gauge[1]
+    if terrain:
+        feats.update({k: v for k, v in terrain.items() if k in FEATURES})
+    return feats
+
+
+_model = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def get_model():
+    """The configured model, loaded on first call; None when none is configured"""
+    global _model, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                if MODEL_PATH and os.path.exists(MODEL_PATH):
+                    _model = LogisticModel.load(MODEL_PATH)
+                _loaded = True
+    return _model
+
+
+def set_model(model):
+    """Install any object with `features` and `predict_proba(X)` as the risk model"""
+    global _model, _loaded
+    with _lock:
+        _model, _loaded = model, True
+
+
+def score_batch(columns, model=None, chunk=262144):
+    """Level codes for many cells from a dict of feature arrays, in cache-sized chunks"""
+    model = model or get_model()
+    n = len(next(iter(columns.values())))
+    out = np.empty(n, dtype=np.int8)
+    for start in range(0, n, chunk):
+        part = {k: np.asarray(v)[start:start + chunk] for k, v in columns.items()}
+        X = feature_matrix(part, min(chunk, n - start), model.features)
+        if hasattr(model, "predict"):
+            out[start:start + chunk] = model.predict(X)
+        else:
+            out[start:start + chunk] = np.argmax(model.predict_proba(X), axis=1)
+    return out
+
+
+def explain(model, feats, top=2):
+    """(level code, probability, reason strings) for one location's feature dict"""
+    x = feature_matrix({k: [v] for k, v in feats.items()}, 1, model.features)
+    p = model.predict_proba(x)[0]
+    level = int(np.argmax(p))
+    reasons = [f"Model estimate: {LEVELS[level]} ({p[level]:.0%})"]
+    if hasattr(model, "contributions"):
+        push = model.contributions(x[0], level)
+        for j in np.argsort(-push)[:top]:
+            if push[j] > 0:
+                reasons.append(f"Driven by {FEATURE_TEXT.get(model.features[j], model.features[j])}")
+    return level, float(p[level]), reasons
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    tr = sub.add_parser("train", help="fit a logistic model on a labelled CSV")
+    tr.add_argument("csv")
+    tr.add_argument("--out", default="risk_model.npz")
+    tr.add_argument("--l2", type=float, default=1e-3)
+    tr.add_argument("--epochs", type=int, default=500)
+    ev = sub.add_parser("evaluate", help="accuracy and confusion matrix of a saved model on a CSV")
+    ev.add_argument("csv")
+    ev.add_argument("--model", default=MODEL_PATH or "risk_model.npz")
+    args = ap.parse_args(argv)
+
+    X, y = read_training_csv(args.csv)
+    if args.cmd == "train":
+        model = train_logistic(X, y, l2=args.l2, epochs=args.epochs)
+        model.save(args.out)
+        print(f"trained on {len(y)} rows; training accuracy {np.mean(model.predict(X) == y):.3f}; saved {args.out}")
+    else:
+        model = LogisticModel.load(args.model)
+        pred = model.predict(X)
+        confusion = np.zeros((len(LEVELS), len(LEVELS)), dtype=np.int64)
+        np.add.at(confusion, (y, pred), 1)
+        print(f"accuracy {np.mean(pred == y):.3f} on {len(y)} rows (rows: true, cols: predicted {LEVELS})")
+        print(confusion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+"""Road-network evacuation routing over a local OSM extract.
+
+The graph is held in CSR arrays: for node u, its out-edges are
+indptr[u]:indptr[u+1], with head node, length and travel time per edge. A
+reversed copy (in-edges) serves the searches towards shelters.
+
+- RoadGraph.astar: point-to-point A* on travel time. The heuristic is the
+  straight-line distance at the graph's top speed.
+- ShelterTrees: one multi-source Dijkstra from every shelter at once gives each
+  node its nearest shelter by road, the travel time and the next hop. A route
+  to the nearest shelter is then a walk along next hops. After edge weights
+  change, only the affected subtrees are repaired.
+- Flood zones (circles or polygons at a risk level) slow roads down. High
+  makes a road 20x slower, Moderate 3x. Routes then avoid flooded streets
+  wherever there is a way around, but someone already inside a zone still
+  gets the quickest way out.
+
+Extract format (directory with two CSVs, e.g. exported with osmium/pyosmium):
+    nodes.csv: id, lat, lon
+    edges.csv: u, v[, highway][, oneway][, length_m][, maxspeed]
+               one row per way segment between consecutive nodes; oneway is
+               yes/true/1 (u -> v only) or -1 (v -> u only)
+The first load writes <dir>/graph.npz, which later loads read directly.
+FLOODSAFE_ROADS points at the directory (or .npz); FLOODSAFE_FLOOD_ZONES at a
+GeoJSON of zone polygons with a `level` property, re-read when it changes.
+"""
+import heapq
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from floodsafe.geometry import EARTH_RADIUS_KM, haversine_km
+from floodsafe.spatial import GridIndex
+
+ROADS_PATH = os.environ.get("FLOODSAFE_ROADS")
+FLOOD_ZONES_PATH = os.environ.get("FLOODSAFE_FLOOD_ZONES")
+
+# Evacuation travel speeds by OSM highway class, km/h
+SPEED_KMH = {
+    "motorway": 60, "trunk": 50, "primary": 40, "secondary": 35, "tertiary": 30,
+    "unclassified": 25, "residential": 20, "living_street": 10, "service": 10,
+    "track": 10, "path": 5, "footway": 5, "pedestrian": 5, "steps": 3,
+}
+DEFAULT_SPEED_KMH = 20
+
+# Travel-time multiplier for roads inside a flood zone, by risk level
+FLOOD_FACTOR = {"High": 20.0, "Moderate": 3.0}
+
+SNAP_KM = 1.0
+
+
+class RoadGraph:
+    def __init__(self, lat, lon, indptr, head, length_m, base_s, osm_id=None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.head = np.asarray(head, dtype=np.int32)
+        self.length_m = np.asarray(length_m, dtype=np.float32)
+        self.base_s = np.asarray(base_s, dtype=np.float64)
+        self.weight = self.base_s.copy()
+        self.osm_id = osm_id
+        self.tail = np.repeat(np.arange(len(self.lat), dtype=np.int32), np.diff(self.indptr))
+        # in-edges, for searches that run towards a target
+        self.rev_edge = np.argsort(self.head, kind="stable").astype(np.int32)
+        self.rev_indptr = np.r_[0, np.cumsum(np.bincount(self.head, minlength=len(self.lat)))]
+        # Python lists: the search loops index them one element at a time
+        self._indptr = self.indptr.tolist()
+        self._head = self.head.tolist()
+        self._rev_indptr = self.rev_indptr.tolist()
+        self._rev_edge = self.rev_edge.tolist()
+        self._tail = self.tail.tolist()
+        self._w = self.weight.tolist()
+        top = np.max(np.where(self.base_s > 0, self.length_m / np.maximum(self.base_s, 1e-9), 0), initial=0.0)
+        self.max_speed_ms = float(top) or DEFAULT_SPEED_KMH / 3.6
+        self._nodes = GridIndex(self.lat, self.lon, cell_deg=0.005)
+        self._mid = None
+        self._rad = None
+
+    def __len__(self):
+        return len(self.lat)
+
+    def save(self, path):
+        np.savez(path, lat=self.lat, lon=self.lon, indptr=self.indptr, head=self.head,
+                 length_m=self.length_m, base_s=self.base_s,
+                 osm_id=self.osm_id if self.osm_id is not None else np.arange(len(self.lat)))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            return cls(z["lat"], z["lon"], z["indptr"], z["head"], z["length_m"], z["base_s"], z["osm_id"])
+
+    def nearest_node(self, lat, lon, max_km=SNAP_KM):
+        """(node, km) of the road node nearest a point, or (None, None) beyond `max_km`"""
+        idx, d = self._nodes.nearest_indices(lat, lon, 1, max_km)
+        if not len(idx):
+            return None, None
+        return int(self._nodes.order[idx[0]]), float(d[0])
+
+    def set_weights(self, edges, weights):
+        """Change travel times (s) of `edges`; returns the edges that actually changed"""
+        edges = np.asarray(edges, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        changed = self.weight[edges] != weights
+        edges, weights = edges[changed], weights[changed]
+        self.weight[edges] = weights
+        for e, w in zip(edges.tolist(), weights.tolist()):
+            self._w[e] = w
+        return edges
+
+    def astar(self, src, dst):
+        """(node path, seconds) of the fastest route src -> dst, or (None, inf)"""
+        if src == dst:
+            return [src], 0.0
+        if self._rad is None:
+            self._rad = (np.radians(self.lat).tolist(), np.radians(self.lon).tolist())
+        lat, lon = self._rad
+        tlat, tlon = lat[dst], lon[dst]
+        coslat = math.cos(tlat)
+        # straight line at top speed never overestimates the remaining time
+        per_rad = 2 * EARTH_RADIUS_KM * 1000.0 / self.max_speed_ms
+
+        def h(n):
+            a = math.sin((tlat - lat[n]) / 2) ** 2 + math.cos(lat[n]) * coslat * math.sin((tlon - lon[n]) / 2) ** 2
+            return per_rad * math.asin(math.sqrt(min(a, 1.0)))
+
+        indptr, head, w = self._indptr, self._head, self._w
+        dist = {src: 0.0}
+        parent = {src: -1}
+        heap = [(h(src), 0.0, src)]
+        done = set()
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            if u == dst:
+                path = [u]
+                while parent[path[-1]] != -1:
+                    path.append(parent[path[-1]])
+                return path[::-1], d
+            done.add(u)
+            for e in range(indptr[u], indptr[u + 1]):
+                v = head[e]
+                nd = d + w[e]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    parent[v] = u
+                    heapq.heappush(heap, (nd + h(v), nd, v))
+        return None, math.inf
+
+    def path_km(self, path):
+        if len(path) < 2:
+            return 0.0
+        p = np.asarray(path)
+        return float(haversine_km(self.lat[p[:-1]], self.lon[p[:-1]], self.lat[p[1:]], self.lon[p[1:]]).sum())
+
+    def path_coords(self, path):
+        """[[lat, lon], ...] for folium.PolyLine"""
+        p = np.asarray(path)
+        return np.round(np.stack([self.lat[p], self.lon[p]], axis=1), 5).tolist()
+
+    def edges_in(self, zone):
+        """Edges whose midpoint lies in {"circle": (lat, lon, radius_m)} or {"polygon": [(lat, lon), ...]}"""
+        if self._mid is None:
+            self._mid = GridIndex((self.lat[self.tail] + self.lat[self.head]) / 2,
+                                  (self.lon[self.tail] + self.lon[self.head]) / 2, cell_deg=0.005)
+        if "circle" in zone:
+            lat, lon, radius_m = zone["circle"]
+            idx = self._mid.radius_indices(lat, lon, radius_m / 1000.0)[0]
+        else:
+            idx = self._mid.polygon_indices(zone["polygon"])
+        return self._mid.order[idx]
+
+
+def _oneway(values):
+    v = np.asarray(values, dtype=object).astype(str)
+    v = np.char.lower(v)
+    forward = np.isin(v, ("yes", "true", "1"))
+    backward = v == "-1"
+    return forward, backward
+
+
+def read_osm_csv(directory):
+    """Build a RoadGraph from nodes.csv and edges.csv (see module docstring)"""
+    import pandas as pd
+    nodes = pd.read_csv(os.path.join(directory, "nodes.csv"))
+    edges = pd.read_csv(os.path.join(directory, "edges.csv"))
+    osm_id = nodes["id"].to_numpy(np.int64)
+    order = np.argsort(osm_id)
+    osm_id = osm_id[order]
+    lat = nodes["lat"].to_numpy(np.float64)[order]
+    lon = nodes["lon"].to_numpy(np.float64)[order]
+
+    def node_index(ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(osm_id, ids), len(osm_id) - 1)
+        return np.where(osm_id[pos] == ids, pos, -1)
+
+    u, v = node_index(edges["u"]), node_index(edges["v"])
+    ok = (u >= 0) & (v >= 0) & (u != v)
+    edges, u, v = edges[ok], u[ok], v[ok]
+    if "length_m" in edges:
+        length = edges["length_m"].to_numpy(np.float64)
+    else:
+        length = haversine_km(lat[u], lon[u], lat[v], lon[v]) * 1000.0
+    highway = edges["highway"].astype(str).to_numpy() if "highway" in edges else np.full(len(u), "")
+    speed = np.array([SPEED_KMH.get(h, DEFAULT_SPEED_KMH) for h in highway], dtype=np.float64)
+    if "maxspeed" in edges:
+        posted = pd.to_numeric(edges["maxspeed"], errors="coerce").to_numpy(np.float64)
+        speed = np.where(np.isfinite(posted) & (posted > 0), np.minimum(speed, posted), speed)
+    seconds = length / (speed / 3.6)
+    forward, backward = _oneway(edges["oneway"]) if "oneway" in edges else (np.zeros(len(u), bool),) * 2
+    fwd, bwd = ~backward, ~forward
+    tail = np.r_[u[fwd], v[bwd]]
+    head = np.r_[v[fwd], u[bwd]]
+    length = np.r_[length[fwd], length[bwd]]
+    seconds = np.r_[seconds[fwd], seconds[bwd]]
+    by_tail = np.argsort(tail, kind="stable")
+    indptr = np.r_[0, np.cumsum(np.bincount(tail, minlength=len(lat)))]
+    return RoadGraph(lat, lon, indptr, head[by_tail], length[by_tail], seconds[by_tail], osm_id)
+
+
+def load_graph(path):
+    """RoadGraph from a saved .npz, or from an extract directory (caching graph.npz there)"""
+    if path.endswith(".npz"):
+        return RoadGraph.load(path)
+    cached = os.path.join(path, "graph.npz")
+    if os.path.exists(cached) and os.path.getmtime(cached) >= max(
+            os.path.getmtime(os.path.join(path, f)) for f in ("nodes.csv", "edges.csv")):
+        return RoadGraph.load(cached)
+    graph = read_osm_csv(path)
+    graph.save(cached)
+    return graph
+
+
+class ShelterTrees:
+    """Shortest-path forest towards the nearest shelter, over travel time.
+
+    For every node: seconds to its nearest shelter by road (`dist`), the next
+    node on the way (`next_node`, -1 at a shelter or when cut off) and which
+    shelter that is (`shelter`).
+    """
+
+    def __init__(self, graph, shelter_lat, shelter_lon):
+        self.graph = graph
+        n = len(graph)
+        self.shelter_node = np.full(len(shelter_lat), -1, dtype=np.int64)
+        for i, (y, x) in enumerate(zip(shelter_lat, shelter_lon)):
+            node, _ = graph.nearest_node(float(y), float(x))
+            if node is not None:
+                self.shelter_node[i] = node
+        self.dist = np.full(n, np.inf)
+        self.next_node = np.full(n, -1, dtype=np.int64)
+        self.next_edge = np.full(n, -1, dtype=np.int64)
+        self.shelter = np.full(n, -1, dtype=np.int64)
+        self.build()
+
+    def _sources(self):
+        seeds = {}
+        for i, node in enumerate(self.shelter_node.tolist()):
+            if node >= 0 and node not in seeds:
+                seeds[node] = i
+        return seeds
+
+    def build(self):
+        """Multi-source Dijkstra from all shelters on the reversed graph"""
+        self.dist[:] = np.inf
+        self.next_node[:] = -1
+        self.next_edge[:] = -1
+        self.shelter[:] = -1
+        seeds = self._sources()
+        for node, i in seeds.items():
+            self.dist[node] = 0.0
+            self.shelter[node] = i
+        self._run([(0.0, node) for node in seeds])
+
+    def _run(self, heap):
+        """Label-correcting Dijkstra over in-edges from the labelled nodes in `heap`"""
+        g = self.graph
+        rev_indptr, rev_edge, tail, w = g._rev_indptr, g._rev_edge, g._tail, g._w
+        dist, shelter = self.dist.tolist(), self.shelter.tolist()
+        next_node, next_edge = self.next_node.tolist(), self.next_edge.tolist()
+        heapq.heapify(heap)
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > dist[v]:
+                continue
+            s = shelter[v]
+            for k in range(rev_indptr[v], rev_indptr[v + 1]):
+                e = rev_edge[k]
+                u = tail[e]
+                nd = d + w[e]
+                if nd < dist[u]:
+                    dist[u] = nd
+                    next_node[u], next_edge[u], shelter[u] = v, e, s
+                    heapq.heappush(heap, (nd, u))
+        self.dist[:], self.shelter[:] = dist, shelter
+        self.next_node[:], self.next_edge[:] = next_node, next_edge
+
+    def _subtrees(self, roots):
+        """`roots` and every node whose route passes through one of them"""
+        parent = self.next_node
+        order = np.argsort(parent, kind="stable")
+        starts = np.searchsorted(parent[order], np.arange(len(parent) + 1))
+        seen = np.zeros(len(parent), dtype=bool)
+        frontier = np.unique(roots)
+        while len(frontier):
+            seen[frontier] = True
+            lo, hi = starts[frontier], starts[frontier + 1]
+            keep = hi > lo
+            if not keep.any():
+                break
+            children = order[np.concatenate([np.arange(a, b) for a, b in zip(lo[keep], hi[keep])])]
+            frontier = children[~seen[children]]
+        return np.flatnonzero(seen)
+
+    def update(self, edges):
+        """Repair the forest after the weights of `edges` changed (graph.set_weights)"""
+        edges = np.asarray(edges, dtype=np.int64)
+        if not len(edges):
+            return
+        g = self.graph
+        tails, heads = g.tail[edges], g.head[edges]
+        # routes through a changed tree edge are recomputed from scratch
+        tree = self.next_edge[tails] == edges
+        stale = self._subtrees(tails[tree]) if tree.any() else np.empty(0, dtype=np.int64)
+        stale = stale[self.dist[stale] > 0]  # shelters keep their zero label
+        self.dist[stale] = np.inf
+        self.next_node[stale] = -1
+        self.next_edge[stale] = -1
+        self.shelter[stale] = -1
+        # re-enter the stale region from its labelled out-neighbours
+        lo, hi = g.indptr[stale], g.indptr[stale + 1]
+        out = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)]) if len(stale) else np.empty(0, dtype=np.int64)
+        heap = [(float(d), int(v)) for d, v in zip(self.dist[g.head[out]], g.head[out]) if d < np.inf]
+        # a changed edge that got faster may give its tail a better route
+        better = self.dist[heads] + g.weight[edges] < self.dist[tails]
+        heap += [(float(d), int(v)) for d, v in zip(self.dist[heads[better]], heads[better])]
+        self._run(heap)
+
+    def route(self, node):
+        """(shelter id, seconds, node path) to the nearest shelter from `node`, or None"""
+        if node is None or not np.isfinite(self.dist[node]):
+            return None
+        path = [node]
+        nxt = self.next_node
+        while nxt[path[-1]] >= 0:
+            path.append(int(nxt[path[-1]]))
+        return int(self.shelter[node]), float(self.dist[node]), path
+
+
+def load_flood_zones(path):
+    """[(level, {"polygon": [(lat, lon), ...]})] from a GeoJSON of zone polygons"""
+    with open(path, encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    zones = []
+    for feat in features:
+        level = (feat.get("properties") or {}).get("level")
+        geom = feat["geometry"]
+        polys = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+        for poly in polys:
+            zones.append((level, {"polygon": [(y, x) for x, y in poly[0]]}))
+    return zones
+
+
+class Router:
+    """Road graph, shelter forest and current flood zones for the dashboard"""
+
+    def __init__(self, graph, shelter_lat=(), shelter_lon=()):
+        self.graph = graph
+        self.trees = ShelterTrees(graph, shelter_lat, shelter_lon) if len(shelter_lat) else None
+        self.flooded = 0
+        self.version = 0  # bumped by every flood-zone update
+        self._lock = threading.Lock()
+
+    def set_flood_zones(self, zones):
+        """Apply [(level, zone)] on top of base travel times; returns the number of edges changed"""
+        g = self.graph
+        factor = np.ones(len(g.base_s))
+        for level, zone in zones:
+            f = FLOOD_FACTOR.get(level)
+            if f:
+                idx = g.edges_in(zone)
+                factor[idx] = np.maximum(factor[idx], f)
+        with self._lock:
+            changed = g.set_weights(np.arange(len(factor)), g.base_s * factor)
+            if self.trees is not None:
+                self.trees.update(changed)
+            self.flooded = int(np.count_nonzero(factor > 1))
+            self.version += 1
+        return len(changed)
+
+    def _leg(self, km):
+        # off-road stretch to the nearest road node, at walking pace
+        return km / 5.0 * 3600.0
+
+    def route_to(self, lat, lon, dest_lat, dest_lon):
+        """Fastest road route between two points: {'path', 'km', 'seconds'} or None when
+        either end is off the network; km is None when no road connects them"""
+        src, a = self.graph.nearest_node(lat, lon)
+        dst, b = self.graph.nearest_node(dest_lat, dest_lon)
+        if src is None or dst is None:
+            return None
+        with self._lock:
+            path, seconds = self.graph.astar(src, dst)
+        if path is None:
+            return {"path": [], "km": None, "seconds": np.inf}
+        return {"path": self.graph.path_coords(path), "km": self.graph.path_km(path) + a + b,
+                "seconds": seconds + self._leg(a + b)}
+
+    def nearest_shelter_route(self, lat, lon):
+        """Route to the nearest shelter by road, full or not: {'shelter', 'path', 'km', 'seconds'}
+        or None. The page recommends through routing.get_evacuation_routes, which respects capacity."""
+        if self.trees is None:
+            return None
+        node, a = self.graph.nearest_node(lat, lon)
+        with self._lock:
+            found = self.trees.route(node)
+        if found is None:
+            return None
+        shelter, seconds, path = found
+        return {"shelter": shelter, "path": self.graph.path_coords(path),
+                "km": self.graph.path_km(path) + a, "seconds": seconds + self._leg(a)}
+
+
+_router = None
+_zones_mtime = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Process-wide Router over FLOODSAFE_ROADS and the shelter registry, with
+    FLOODSAFE_FLOOD_ZONES re-applied whenever the file changes; None if unset"""
+    global _router, _zones_mtime
+    if not ROADS_PATH:
+        return None
+    with _router_lock:
+        if _router is None:
+            from floodsafe.shelters import get_registry
+            registry = get_registry()
+            _router = Router(load_graph(ROADS_PATH), *((registry.lat, registry.lon) if registry is not None else ((), ())))
+        if FLOOD_ZONES_PATH:
+            try:
+                mtime = os.stat(FLOOD_ZONES_PATH).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != _zones_mtime:
+                _router.set_flood_zones(load_flood_zones(FLOOD_ZONES_PATH) if mtime else [])
+                _zones_mtime = mtime
+    return _router
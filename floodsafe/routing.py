@@ -0,0 +1,39 @@
+"""Evacuation route advice from a location to its nearest shelters."""
+from floodsafe.geometry import cardinal_direction, eta_minutes
+from floodsafe.roads import get_router
+
+
+def get_evacuation_routes(lat, lon, shelters):
+    """Generate evacuation routes to the nearest shelters that still have space.
+
+    Full shelters are only suggested when nothing nearby has room. Pass
+    floodsafe.assignment.planned_shelters() to follow the capacity plan.
+    With a road network (FLOODSAFE_ROADS) distance and ETA follow the fastest
+    road around flooded streets, each route carries its `path` for the map,
+    and shelters no road leads to go last.
+    """
+    router = get_router()
+    has_space = [s for s in shelters if s["capacity"] - s["occupancy"] > 0]
+    routes, blocked = [], []
+    # Top 3 nearest shelters; with roads, up to 5 are routed so cut-off ones can drop out of the 3 returned
+    for shelter in (has_space or shelters)[:5 if router else 3]:
+        route = {
+            "shelter": shelter["name"],
+            "distance": shelter["distance_km"],
+            "direction": calculate_direction(lat, lon, shelter["lat"], shelter["lon"]),
+            "estimated_time": f"{int(eta_minutes(shelter['distance_km']))} min"
+        }
+        road = router.route_to(lat, lon, shelter["lat"], shelter["lon"]) if router else None
+        if road is not None and road["km"] is None:
+            route["estimated_time"] = "no road route"
+            blocked.append(route)
+            continue
+        if road is not None:
+            route.update(distance=round(road["km"], 1), estimated_time=f"{int(road['seconds'] // 60)} min", path=road["path"])
+        routes.append(route)
+    return (routes + blocked)[:3]
+
+
+def calculate_direction(lat1, lon1, lat2, lon2):
+    """Calculate cardinal direction from point 1 to point 2 (see floodsafe.geometry for arrays)"""
+    return str(cardinal_direction(lat1, lon1, lat2, lon2))
@@ -0,0 +1,163 @@
+"""Shelter registry held in a lat/lon grid index for k-nearest and radius queries.
+
+The registry is loaded from a CSV or GeoJSON file with `name`, `lat`, `lon`,
+`type`, `capacity` and `occupancy` fields (GeoJSON takes lat/lon from Point
+geometries) and held in a floodsafe.spatial.GridIndex. When the file changes
+on disk (e.g. occupancy updated by district staff) it is re-read; if the same
+shelters are listed, capacity and occupancy are updated in place. A file that
+is missing or cannot be parsed (e.g. half-written) is logged and the last
+good registry kept, or none (demo shelters) if it never loaded.
+"""
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from floodsafe.geometry import haversine_km
+from floodsafe.spatial import GridIndex
+
+REGISTRY_PATH = os.environ.get("FLOODSAFE_SHELTERS")
+
+log = logging.getLogger("floodsafe.shelters")
+
+
+class ShelterIndex(GridIndex):
+    def __init__(self, names, lat, lon, types, capacity, occupancy, cell_deg=0.05):
+        super().__init__(lat, lon, cell_deg)
+        self.names = np.asarray(names, dtype=object)[self.order]
+        self.types = np.asarray(types, dtype=object)[self.order]
+        self.capacity = np.asarray(capacity, dtype=np.int64)[self.order]
+        self.occupancy = np.asarray(occupancy, dtype=np.int64)[self.order]
+
+    def within(self, lat, lon, radius_km=10, limit=None):
+        idx, d = self.radius_indices(lat, lon, radius_km)
+        return self.to_dicts(idx[:limit], d[:limit])
+
+    def nearest(self, lat, lon, k=5, max_km=500.0):
+        idx, d = self.nearest_indices(lat, lon, k, max_km)
+        return self.to_dicts(idx, d)
+
+    def same_shelters(self, other):
+        return (len(self) == len(other) and np.array_equal(self.names, other.names)
+                and np.allclose(self.lat, other.lat, rtol=0, atol=1e-7)
+                and np.allclose(self.lon, other.lon, rtol=0, atol=1e-7))
+
+    def to_dicts(self, idx, dist_km):
+        """Shelter dicts in the shape get_evacuation_routes consumes"""
+        return [
+            {
+                "name": self.names[i],
+                "lat": float(self.lat[i]),
+                "lon": float(self.lon[i]),
+                "type": self.types[i],
+                "capacity": int(self.capacity[i]),
+                "occupancy": int(self.occupancy[i]),
+                "distance_km": round(float(d), 1),
+            }
+            for i, d in zip(idx, dist_km)
+        ]
+
+
+def _records_from_geojson(path):
+    with open(path, encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    for feat in features:
+        props = feat.get("properties") or {}
+        lon, lat = feat["geometry"]["coordinates"][:2]
+        yield props.get("name", ""), lat, lon, props.get("type", ""), props.get("capacity", 0), props.get("occupancy", 0)
+
+
+def load_registry(path, cell_deg=0.05):
+    """Build a ShelterIndex from a district shelter registry (.csv or .geojson)"""
+    if path.lower().endswith((".geojson", ".json")):
+        names, lat, lon, types, cap, occ = (list(col) for col in zip(*_records_from_geojson(path)))
+    else:
+        import pandas as pd
+        df = pd.read_csv(path)
+        names, lat, lon = df["name"].astype(str), df["lat"], df["lon"]
+        types = df["type"].astype(str) if "type" in df else [""] * len(df)
+        cap = df["capacity"].fillna(0) if "capacity" in df else np.zeros(len(df))
+        occ = df["occupancy"].fillna(0) if "occupancy" in df else np.zeros(len(df))
+    return ShelterIndex(names, lat, lon, types, cap, occ, cell_deg=cell_deg)
+
+
+_registry = None
+_registry_mtime = None
+_registry_version = 0  # bumped on every (re)load, for caches derived from the registry
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry from FLOODSAFE_SHELTERS, re-read whenever the file
+    changes; the last good registry if the file is unreadable, None if unset"""
+    global _registry, _registry_mtime, _registry_version
+    if not REGISTRY_PATH:
+        return None
+    try:
+        mtime = os.stat(REGISTRY_PATH).st_mtime_ns
+    except OSError:
+        mtime = _registry_mtime
+        if mtime is None:
+            with _registry_lock:
+                if _registry_mtime is None:
+                    # a path that does not exist (yet) is warned about once, not on every rerun
+                    _registry_mtime = -1
+                    log.warning("shelter registry %s not found; using demo shelters", REGISTRY_PATH)
+            return _registry
+    if mtime != _registry_mtime:
+        with _registry_lock:
+            if mtime != _registry_mtime:
+                # a broken file is not re-parsed until it changes again
+                _registry_mtime = mtime
+                try:
+                    fresh = load_registry(REGISTRY_PATH)
+                except Exception as e:
+                    log.warning("could not read shelter registry %s (%s); keeping %s", REGISTRY_PATH, e,
+                                "the last good one" if _registry is not None else "demo shelters")
+                    return _registry
+                if _registry is not None and _registry.same_shelters(fresh):
+                    _registry.capacity[:] = fresh.capacity
+                    _registry.occupancy[:] = fresh.occupancy
+                else:
+                    _registry = fresh
+                _registry_version += 1
+    return _registry
+
+
+def registry_version():
+    """Changes whenever get_registry() (re)loads the registry file"""
+    get_registry()
+    return _registry_version
+
+
+def find_nearby_shelters(lat, lon, radius_km=10):
+    """Shelters within `radius_km` from the district registry (FLOODSAFE_SHELTERS),
+    nearest first; falls back to generated demo shelters when no registry is configured"""
+    registry = get_registry()
+    if registry is not None:
+        shelters = registry.within(lat, lon, radius_km)
+        return shelters if shelters else registry.nearest(lat, lon, k=5)
+    shelters = []
+    num_shelters = np.random.randint(5, 9)
+    for i in range(num_shelters):
+        angle = np.random.uniform(0, 2 * np.pi)
+        distance = np.random.uniform(0.5, radius_km) / 111  # Convert km to degrees
+        shelter_lat = lat + distance * np.cos(angle)
+        shelter_lon = lon + distance * np.sin(angle) / np.cos(np.radians(lat))  # longitude degrees shrink with latitude
+        shelter_types = ["School", "Community Center", "Hospital", "Government Building", "Religious Center"]
+        names = ["Central", "North", "South", "East", "West", "Public", "Community"]
+        shelter_type = np.random.choice(shelter_types)
+        name_prefix = np.random.choice(names)
+        shelters.append({
+            "name": f"{name_prefix} {shelter_type}",
+            "lat": shelter_lat,
+            "lon": shelter_lon,
+            "type": shelter_type,
+            "capacity": np.random.randint(50, 501),
+            "occupancy": np.random.randint(0, 401),
+            "distance_km": round(float(haversine_km(lat, lon, shelter_lat, shelter_lon)), 1)
+        })
+    shelters.sort(key=lambda x: x["distance_km"])
+    return shelters
@@ -0,0 +1,134 @@
+"""Offline mode: page data served from the local snapshot store.
+
+While online, every location the dashboard shows is tracked and its weather,
+forecast and shelters are written to the snapshot store; a background sync
+thread keeps recently viewed tiles fresh whenever the network is reachable.
+Tiles nobody has looked at for FLOODSAFE_SYNC_TTL seconds stop being synced,
+and at most FLOODSAFE_SYNC_MAX_TILES are kept (least recently viewed go
+first). With offline mode on, `load_offline_data` assembles the same data the
+page would fetch, from disk only, together with its age and, when it comes
+from a neighbouring tile, how far away that is.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from floodsafe.cache import tile_key
+from floodsafe.geometry import haversine_km
+from floodsafe.ratelimit import background
+from floodsafe.store import STORE
+from floodsafe.weather import fetch_current_weather, fetch_forecast
+
+SYNC_INTERVAL = float(os.environ.get("FLOODSAFE_SYNC_INTERVAL", 600))
+SYNC_TTL = float(os.environ.get("FLOODSAFE_SYNC_TTL", 6 * 3600))
+SYNC_MAX_TILES = int(os.environ.get("FLOODSAFE_SYNC_MAX_TILES", 256))
+# Farthest stored tile offline mode may stand in for the requested location
+OFFLINE_MAX_KM = float(os.environ.get("FLOODSAFE_OFFLINE_MAX_KM", 10))
+
+
+def save_snapshot(lat, lon, weather=None, forecast=None, shelters=None, store=STORE):
+    if weather is not None:
+        store.put("current", lat, lon, weather)
+    if forecast is not None:
+        store.put("forecast", lat, lon, forecast)
+    if shelters is not None:
+        store.put("shelters", lat, lon, shelters)
+
+
+def _nearby(store, kind, lat, lon, max_km):
+    """(payload, age_seconds, km) of the closest stored tile within `max_km`, or None"""
+    found = store.nearest(kind, lat, lon)
+    if found is None:
+        return None
+    ty, tx = found[2]
+    km = float(haversine_km(lat, lon, (ty + 0.5) * store.tile_deg, (tx + 0.5) * store.tile_deg))
+    return (found[0], found[1], km) if km <= max_km else None
+
+
+def load_offline_data(coords, fallback, store=STORE, max_km=OFFLINE_MAX_KM):
+    """Snapshot data for the session location (or the closest stored tile within
+    `max_km`); no network.
+
+    Returns the dict shape of fetch.load_dashboard_data plus `age_s`, the age
+    in seconds of the oldest piece shown (None when nothing is stored), and
+    `from_km`, how far from the location the farthest piece was saved (0 when
+    everything is from its own tile).
+    """
+    loc = coords or fallback
+    out = {"lat": loc["lat"], "lon": loc["lon"], "source": "offline", "geo": None, "geo_error": None,
+           "weather": None, "forecast": None, "shelters": None, "age_s": None, "from_km": None}
+    ages, dists = [], []
+    for kind, field in (("current", "weather"), ("forecast", "forecast"), ("shelters", "shelters")):
+        found = store.get_with_age(kind, loc["lat"], loc["lon"])
+        found = found + (0.0,) if found is not None else _nearby(store, kind, loc["lat"], loc["lon"], max_km)
+        if found is not None:
+            out[field] = found[0]
+            ages.append(found[1])
+            dists.append(found[2])
+    if ages:
+        out["age_s"] = max(ages)
+        out["from_km"] = max(dists)
+    return out
+
+
+class SnapshotSync:
+    """Tracks the tiles users look at and refreshes their snapshots in the background"""
+
+    def __init__(self, interval=SYNC_INTERVAL, store=STORE):
+        self.interval = interval
+        self.store = store
+        self._tiles = OrderedDict()  # tile -> (lat, lon, last viewed), least recently viewed first
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_sync_ok = None
+
+    def track(self, lat, lon, weather=None, forecast=None):
+        """Remember this location; the first time it is seen, persist what the page already has"""
+        tile = tile_key(lat, lon, self.store.tile_deg)
+        with self._lock:
+            new = tile not in self._tiles
+            self._tiles[tile] = (lat, lon, time.monotonic())
+            self._tiles.move_to_end(tile)
+            while len(self._tiles) > SYNC_MAX_TILES:
+                self._tiles.popitem(last=False)
+        if new:
+            save_snapshot(lat, lon, weather, forecast, store=self.store)
+        self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="snapshot-sync", daemon=True)
+                self._thread.start()
+
+    def _expire(self):
+        """Drop tiles nobody has viewed for SYNC_TTL seconds"""
+        cutoff = time.monotonic() - SYNC_TTL
+        while self._tiles and next(iter(self._tiles.values()))[2] < cutoff:
+            self._tiles.popitem(last=False)
+
+    def sync_once(self):
+        with self._lock:
+            self._expire()
+            locations = [(lat, lon) for lat, lon, _ in self._tiles.values()]
+        ok = 0
+        with background():
+            for lat, lon in locations:
+                weather = fetch_current_weather(lat, lon)
+                forecast = fetch_forecast(lat, lon)
+                save_snapshot(lat, lon, weather, forecast, store=self.store)
+                ok += weather is not None
+        self.last_sync_ok = ok > 0 if locations else self.last_sync_ok
+        return ok
+
+    def _loop(self):
+        stop = threading.Event()
+        while not stop.wait(self.interval):
+            try:
+                self.sync_once()
+            except Exception:
+                self.last_sync_ok = False
+
+
+SYNC = SnapshotSync()
@@ -0,0 +1,153 @@
+"""Lat/lon grid index shared by the shelter and subscriber registries.
+
+Points are bucketed into square grid cells and stored sorted by cell id, so a
+query only touches the cells overlapping its search window: one
+`searchsorted` range per grid row, then vectorized filtering of the
+candidates. Subclasses permute their own per-point columns with `self.order`.
+"""
+import numpy as np
+
+from floodsafe.geometry import haversine_km
+
+KM_PER_DEG = 111.32
+
+
+class GridIndex:
+    def __init__(self, lat, lon, cell_deg=0.05):
+        self.cell_deg = cell_deg
+        self._ncols = int(np.ceil(360.0 / cell_deg)) + 1
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        cells = self._cell_ids(lat, lon)
+        self.order = np.argsort(cells, kind="stable")
+        self.cells = cells[self.order]
+        self.lat = lat[self.order]
+        self.lon = lon[self.order]
+        self._lat32 = self._lon32 = None  # float32 copies for batch distance scans
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _rows_cols(self, lat, lon):
+        rows = np.floor((np.asarray(lat) + 90.0) / self.cell_deg).astype(np.int64)
+        cols = np.floor((np.asarray(lon) + 180.0) / self.cell_deg).astype(np.int64)
+        return rows, cols
+
+    def _cell_ids(self, lat, lon):
+        rows, cols = self._rows_cols(lat, lon)
+        return rows * self._ncols + cols
+
+    def bbox_candidates(self, lat_min, lat_max, lon_min, lon_max):
+        """Indices of points in the grid cells overlapping a lat/lon box"""
+        (r0, r1), (c0, c1) = self._rows_cols([lat_min, lat_max], [lon_min, lon_max])
+        rows = np.arange(r0, r1 + 1, dtype=np.int64)
+        lo = np.searchsorted(self.cells, rows * self._ncols + c0, side="left")
+        hi = np.searchsorted(self.cells, rows * self._ncols + c1, side="right")
+        keep = hi > lo
+        if not keep.any():
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(a, b) for a, b in zip(lo[keep], hi[keep])])
+
+    def _candidates(self, lat, lon, radius_km):
+        """Indices of points in the grid cells overlapping the query's bounding box"""
+        dlat = radius_km / KM_PER_DEG
+        dlon = radius_km / (KM_PER_DEG * max(np.cos(np.radians(lat)), 0.01))
+        return self.bbox_candidates(lat - dlat, lat + dlat, lon - dlon, lon + dlon)
+
+    def radius_indices(self, lat, lon, radius_km):
+        """(indices, distances) of points within `radius_km`, nearest first"""
+        idx = self._candidates(lat, lon, radius_km)
+        d = haversine_km(lat, lon, self.lat[idx], self.lon[idx])
+        inside = d <= radius_km
+        idx, d = idx[inside], d[inside]
+        order = np.argsort(d, kind="stable")
+        return idx[order], d[order]
+
+    def nearest_indices(self, lat, lon, k=5, max_km=500.0):
+        """(indices, distances) of the k nearest points within `max_km`"""
+        k = min(k, len(self))
+        radius = self.cell_deg * KM_PER_DEG
+        while True:
+            idx, d = self.radius_indices(lat, lon, radius)
+            # everything within `radius` was scanned, so these are the true k nearest
+            if len(idx) >= k or radius >= max_km:
+                return idx[:k], d[:k]
+            radius = min(radius * 2, max_km)
+
+    def nearest_batch(self, lat, lon, k=8, max_km=500.0, group_deg=None, chunk=2048):
+        """(indices, distances) of the k nearest points for many queries, as (n, k)
+        arrays padded with -1 / inf where fewer than k lie within `max_km`.
+
+        Queries are grouped by grid cell (`group_deg`, default the index cell)
+        and each group is answered from one candidate scan; queries without k
+        candidates inside the scanned radius are rescanned with twice the
+        radius. Candidates are ranked by a local flat-earth distance; the
+        returned distances are great-circle.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        k = min(k, len(self))
+        out_idx = np.full((len(lat), k), -1, dtype=np.int64)
+        out_d = np.full((len(lat), k), np.inf)
+        if k == 0 or len(lat) == 0:
+            return out_idx, out_d
+        if self._lat32 is None:
+            self._lat32, self._lon32 = self.lat.astype(np.float32), self.lon.astype(np.float32)
+        group_deg = group_deg or self.cell_deg
+        gcells = np.floor((lat + 90.0) / group_deg).astype(np.int64) * int(np.ceil(360.0 / group_deg) + 1) \
+            + np.floor((lon + 180.0) / group_deg).astype(np.int64)
+        order = np.argsort(gcells, kind="stable")
+        bounds = np.flatnonzero(np.r_[True, gcells[order][1:] != gcells[order][:-1], True])
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            for c0 in range(a, b, chunk):
+                pending = order[c0:min(b, c0 + chunk)]
+                radius = self.cell_deg * KM_PER_DEG
+                while len(pending):
+                    # a query's `radius` ball lies inside the group's box widened by `radius`
+                    qlat, qlon = lat[pending], lon[pending]
+                    dlat = radius / KM_PER_DEG
+                    dlon = radius / (KM_PER_DEG * max(np.cos(np.radians(np.abs(qlat).max())), 0.01))
+                    cand = self.bbox_candidates(qlat.min() - dlat, qlat.max() + dlat, qlon.min() - dlon, qlon.max() + dlon)
+                    d = self._local_km(qlat, qlon, cand)
+                    done = np.count_nonzero(d <= radius, axis=1) >= k if radius < max_km else np.ones(len(pending), bool)
+                    kk = min(k, len(cand))
+                    if kk and done.any():
+                        q, d = pending[done], d[done]
+                        part = np.argpartition(d, kk - 1, axis=1)[:, :kk] if kk < len(cand) else np.broadcast_to(np.arange(kk), d.shape)
+                        pd = haversine_km(lat[q][:, None], lon[q][:, None], self.lat[cand[part]], self.lon[cand[part]])
+                        srt = np.argsort(pd, axis=1, kind="stable")
+                        part, pd = np.take_along_axis(part, srt, axis=1), np.take_along_axis(pd, srt, axis=1)
+                        far = pd > max_km
+                        out_idx[q, :kk] = np.where(far, -1, cand[part])
+                        out_d[q, :kk] = np.where(far, np.inf, pd)
+                    pending = pending[~done]
+                    radius = min(radius * 2, max_km)
+        return out_idx, out_d
+
+    def _local_km(self, qlat, qlon, cand):
+        """Equirectangular (query x candidate) distances in float32; within a few
+        hundred km they rank like great-circle ones at a fraction of the cost"""
+        dy = self._lat32[cand][None, :] - qlat.astype(np.float32)[:, None]
+        dx = self._lon32[cand][None, :] - qlon.astype(np.float32)[:, None]
+        dx *= np.cos(np.radians(qlat)).astype(np.float32)[:, None]
+        dx *= dx
+        dy *= dy
+        dx += dy
+        np.sqrt(dx, out=dx)
+        dx *= np.float32(KM_PER_DEG)
+        return dx
+
+    def polygon_indices(self, ring):
+        """Indices of points inside a polygon given as [(lat, lon), ...] (even-odd rule)"""
+        ring = np.asarray(ring, dtype=np.float64)
+        idx = self.bbox_candidates(ring[:, 0].min(), ring[:, 0].max(), ring[:, 1].min(), ring[:, 1].max())
+        y, x = self.lat[idx], self.lon[idx]
+        inside = np.zeros(len(idx), dtype=bool)
+        y0, x0 = ring[:, 0], ring[:, 1]
+        y1, x1 = np.roll(y0, -1), np.roll(x0, -1)
+        for ay, ax, by, bx in zip(y0, x0, y1, x1):
+            crosses = (ay > y) != (by > y)
+            if crosses.any():
+                xi = ax + (y - ay) * (bx - ax) / ((by - ay) or 1e-300)
+                inside ^= crosses & (x < xi)
+        return idx[inside]
@@ -0,0 +1,96 @@
+"""Shared snapshot store written by the polling worker and read by the dashboard.
+
+One SQLite row per (kind, location tile) holding a JSON payload and the time
+it was stored. SQLite in WAL mode lets the worker process write while any
+number of Streamlit sessions read. The database file is only opened (and
+created) on first use, so importing the package leaves the disk alone.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from floodsafe.cache import TILE_DEG, tile_key
+
+DB_PATH = os.environ.get("FLOODSAFE_STORE_DB", "floodsafe_store.sqlite3")
+
+# Worker snapshots older than this are ignored by the dashboard (seconds)
+MAX_AGE = float(os.environ.get("FLOODSAFE_STORE_MAX_AGE", 900))
+
+
+def _json_default(o):
+    # NumPy scalars (shelter capacities, coordinates) serialize as plain numbers
+    if hasattr(o, "item"):
+        return o.item()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+class SnapshotStore:
+    def __init__(self, db_path=DB_PATH, tile_deg=TILE_DEG):
+        self.db_path = db_path
+        self.tile_deg = tile_deg
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def _db(self):
+        if self._conn is None:
+            with self._open_lock:
+                if self._conn is None:
+                    db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+                    db.execute("PRAGMA journal_mode=WAL")
+                    db.execute(
+                        "CREATE TABLE IF NOT EXISTS snapshots ("
+                        "kind TEXT NOT NULL, tile_lat INTEGER NOT NULL, tile_lon INTEGER NOT NULL, "
+                        "stored_at REAL NOT NULL, payload TEXT NOT NULL, "
+                        "PRIMARY KEY (kind, tile_lat, tile_lon))"
+                    )
+                    db.commit()
+                    self._conn = db
+        return self._conn
+
+    def put(self, kind, lat, lon, payload, stored_at=None):
+        ty, tx = tile_key(lat, lon, self.tile_deg)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                (kind, ty, tx, stored_at or time.time(), json.dumps(payload, default=_json_default)),
+            )
+            self._db.commit()
+
+    def get(self, kind, lat, lon, max_age=MAX_AGE):
+        """Stored payload for the tile containing (lat, lon), or None if missing/too old"""
+        row = self.get_with_age(kind, lat, lon)
+        if row is None or (max_age is not None and row[1] > max_age):
+            return None
+        return row[0]
+
+    def nearest(self, kind, lat, lon):
+        """(payload, age_seconds, (tile_lat, tile_lon)) of the closest stored tile, or None"""
+        ty, tx = tile_key(lat, lon, self.tile_deg)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, stored_at, tile_lat, tile_lon FROM snapshots WHERE kind = ? "
+                "ORDER BY (tile_lat - ?) * (tile_lat - ?) + (tile_lon - ?) * (tile_lon - ?) LIMIT 1",
+                (kind, ty, ty, tx, tx),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1], (row[2], row[3])
+
+    def get_with_age(self, kind, lat, lon):
+        """(payload, age_seconds) for the tile containing (lat, lon), or None"""
+        ty, tx = tile_key(lat, lon, self.tile_deg)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, stored_at FROM snapshots WHERE kind = ? AND tile_lat = ? AND tile_lon = ?",
+                (kind, ty, tx),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1]
+
+
+STORE = SnapshotStore()
@@ -0,0 +1,104 @@
+"""Subscriber registry and geofenced matching against risk zones.
+
+Subscribers (home coordinates, language, contact) live in a GridIndex, so a
+circle or polygon zone is matched by scanning only the grid cells it covers.
+`ZoneMatcher` keeps each zone's member set plus a per-subscriber count of
+zones at each risk level; updating one zone only touches that zone's old and
+new members, and reports the subscribers whose effective risk level rose.
+
+Registry file: CSV with id, lat, lon, lang, phone (set FLOODSAFE_SUBSCRIBERS).
+"""
+import os
+import threading
+
+import numpy as np
+
+from floodsafe.risk import LEVELS
+from floodsafe.spatial import GridIndex
+
+REGISTRY_PATH = os.environ.get("FLOODSAFE_SUBSCRIBERS")
+
+NO_RISK = -1
+
+
+class SubscriberIndex(GridIndex):
+    def __init__(self, ids, lat, lon, langs, contacts, cell_deg=0.02):
+        super().__init__(lat, lon, cell_deg)
+        self.ids = np.asarray(ids)[self.order]
+        self.langs = np.asarray(langs, dtype=object)[self.order]
+        self.contacts = np.asarray(contacts, dtype=object)[self.order]
+
+    def in_circle(self, lat, lon, radius_m):
+        return np.sort(self.radius_indices(lat, lon, radius_m / 1000.0)[0])
+
+    def in_polygon(self, ring):
+        return np.sort(self.polygon_indices(ring))
+
+    def match(self, zone):
+        """Indices inside a zone: {"circle": (lat, lon, radius_m)} or {"polygon": [(lat, lon), ...]}"""
+        if "circle" in zone:
+            return self.in_circle(*zone["circle"])
+        return self.in_polygon(zone["polygon"])
+
+
+class ZoneMatcher:
+    def __init__(self, index):
+        self.index = index
+        self.zones = {}  # zone id -> (level code, member indices)
+        # counts[i, level] = number of zones at `level` containing subscriber i
+        self.counts = np.zeros((len(index), len(LEVELS)), dtype=np.int32)
+
+    def _effective(self, idx):
+        c = self.counts[idx] > 0
+        return np.where(c.any(axis=1), len(LEVELS) - 1 - np.argmax(c[:, ::-1], axis=1), NO_RISK)
+
+    def level_of(self, idx):
+        return self._effective(np.asarray(idx))
+
+    def update(self, zone_id, level, zone=None):
+        """Set a zone's risk level (and optionally its geometry); returns indices whose level rose.
+
+        `level` is a name from risk.LEVELS or None to drop the zone. Geometry is
+        re-matched only when given, so a pure level change costs one pass over
+        the zone's members.
+        """
+        old_level, old_members = self.zones.get(zone_id, (None, np.empty(0, dtype=np.int64)))
+        members = self.index.match(zone) if zone is not None else old_members
+        code = None if level is None else LEVELS.index(level)
+        affected = np.union1d(old_members, members)
+        before = self._effective(affected)
+        if old_level is not None:
+            self.counts[old_members, old_level] -= 1
+        if code is None:
+            self.zones.pop(zone_id, None)
+        else:
+            self.counts[members, code] += 1
+            self.zones[zone_id] = (code, members)
+        after = self._effective(affected)
+        return affected[after > before]
+
+    def at_or_above(self, level):
+        """All subscribers whose effective level is at least `level`"""
+        return np.flatnonzero(self.counts[:, LEVELS.index(level):].sum(axis=1) > 0)
+
+
+def load_subscribers(path, cell_deg=0.02):
+    import pandas as pd
+    df = pd.read_csv(path, dtype={"id": str, "phone": str, "lang": str})
+    langs = df["lang"].fillna("en") if "lang" in df else ["en"] * len(df)
+    contacts = df["phone"].fillna("") if "phone" in df else [""] * len(df)
+    return SubscriberIndex(df["id"], df["lat"], df["lon"], langs, contacts, cell_deg=cell_deg)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_subscribers():
+    """Process-wide subscriber index from FLOODSAFE_SUBSCRIBERS, loaded once; None if unset"""
+    global _registry
+    if _registry is None and REGISTRY_PATH:
+        with _registry_lock:
+            if _registry is None:
+                _registry = load_subscribers(REGISTRY_PATH)
+    return _registry
@@ -0,0 +1,261 @@
+"""Lightweight per-rerun timing spans and process metrics.
+
+The page opens a rerun with begin_rerun(session_id, n), marks the top of each
+section with section(name) and wraps finer blocks in span(name). Work handed to the fetch pool is attributed to the same rerun
+through traced(). Finished reruns are kept in a short in-memory ring, folded
+into per-section histograms and, when FLOODSAFE_TELEMETRY_LOG is set, appended
+to that file as JSON lines. Setting FLOODSAFE_METRICS_PORT serves /metrics
+(Prometheus text) and /reruns (JSON lines) from a background thread.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOG_PATH = os.environ.get("FLOODSAFE_TELEMETRY_LOG")
+METRICS_PORT = int(os.environ.get("FLOODSAFE_METRICS_PORT", 0))
+
+# Histogram bucket upper bounds, seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_local = threading.local()
+_lock = threading.Lock()
+_recent = deque(maxlen=200)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+_sections = {}
+_upstream = {}
+_upstream_errors = {}
+
+
+class Rerun:
+    def __init__(self, session_id, rerun_no):
+        self.session_id = session_id
+        self.rerun_no = rerun_no
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = []  # (name, start_s, duration_s, thread name)
+        self.duration = None
+        self._open = None  # (name, start) of the current section()
+        self._lock = threading.Lock()
+
+    def add(self, name, start, end):
+        with self._lock:
+            self.spans.append((name, start - self.t0, end - start, threading.current_thread().name))
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s[1])
+        return {
+            "session": self.session_id,
+            "rerun": self.rerun_no,
+            "started_at": round(self.started_at, 3),
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 2),
+            "spans": [
+                {"name": n, "start_ms": round(s * 1000, 2), "duration_ms": round(d * 1000, 2), "thread": t}
+                for n, s, d, t in spans
+            ],
+        }
+
+
+def begin_rerun(session_id, rerun_no):
+    """Start collecting spans for this script run (on the calling thread)"""
+    _local.rerun = Rerun(session_id, rerun_no)
+    return _local.rerun
+
+
+def current_rerun():
+    return getattr(_local, "rerun", None)
+
+
+def section(name):
+    """End the previous section of this rerun and start timing `name`.
+
+    Suits a top-to-bottom script: one call at the top of each section.
+    """
+    rerun = current_rerun()
+    if rerun is None:
+        return
+    now = time.perf_counter()
+    if rerun._open is not None:
+        rerun.add(rerun._open[0], rerun._open[1], now)
+    rerun._open = (name, now) if name else None
+
+
+def end_rerun():
+    """Close the current rerun: fold it into the histograms, the ring and the log"""
+    rerun = current_rerun()
+    if rerun is None:
+        return None
+    section(None)
+    _local.rerun = None
+    rerun.duration = time.perf_counter() - rerun.t0
+    record = rerun.to_dict()
+    with _lock:
+        _recent.append(record)
+        _sections.setdefault("rerun", Histogram()).observe(rerun.duration)
+        for name, _, d, _ in rerun.spans:
+            _sections.setdefault(name, Histogram()).observe(d)
+    if LOG_PATH:
+        line = json.dumps(record, separators=(",", ":"))
+        with _lock, open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    return record
+
+
+@contextmanager
+def span(name, rerun=None):
+    """Time a block as a span of `rerun` (default: this thread's current rerun)"""
+    rerun = rerun or current_rerun()
+    if rerun is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun.add(name, start, time.perf_counter())
+
+
+def traced(name, fn):
+    """Wrap `fn` so that, run on another thread, it is timed as a span of the caller's rerun"""
+    rerun = current_rerun()
+    if rerun is None:
+        return fn
+
+    def run(*args, **kwargs):
+        with span(name, rerun):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def observe_upstream(host, seconds, ok=True):
+    with _lock:
+        _upstream.setdefault(host, Histogram()).observe(seconds)
+        if not ok:
+            _upstream_errors[host] = _upstream_errors.get(host, 0) + 1
+
+
+def recent_reruns(session_id=None):
+    with _lock:
+        return [r for r in _recent if session_id is None or r["session"] == session_id]
+
+
+def cache_stats():
+    """Hit counters of the process-wide caches, imported only when asked for"""
+    from floodsafe import maps, ratelimit
+    from floodsafe.cache import WEATHER_CACHE
+    from floodsafe.translation import TRANSLATIONS
+
+    w = WEATHER_CACHE.stats()
+    t = TRANSLATIONS.stats()
+    m = maps.cache_stats()
+    r = ratelimit.stats()
+    return {
+        "weather": (w["hits"] + w["stale_hits"], w["misses"]),
+        "translation": (t["hits"] + t["db_hits"], t["misses"]),
+        "map_html": (m["hits"], m["misses"]),
+        "upstream_coalesced": (r["coalesced_callers"], r["upstream_calls"]),
+    }
+
+
+def _histogram_lines(metric, label, hists):
+    lines = [f"# TYPE {metric} histogram"]
+    for key, h in sorted(hists.items()):
+        cumulative = 0
+        for bound, c in zip(BUCKETS + ("+Inf",), h.counts):
+            cumulative += c
+            lines.append(f'{metric}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{{label}="{key}"}} {h.sum:.6f}')
+        lines.append(f'{metric}_count{{{label}="{key}"}} {h.count}')
+    return lines
+
+
+def prometheus_text():
+    with _lock:
+        lines = _histogram_lines("floodsafe_section_seconds", "section", _sections)
+        lines += _histogram_lines("floodsafe_upstream_seconds", "host", _upstream)
+        lines.append("# TYPE floodsafe_upstream_errors_total counter")
+        lines += [f'floodsafe_upstream_errors_total{{host="{h}"}} {n}' for h, n in sorted(_upstream_errors.items())]
+    caches = cache_stats()
+    lines.append("# TYPE floodsafe_cache_hits_total counter")
+    lines += [f'floodsafe_cache_hits_total{{cache="{c}"}} {h}' for c, (h, _) in caches.items()]
+    lines.append("# TYPE floodsafe_cache_misses_total counter")
+    lines += [f'floodsafe_cache_misses_total{{cache="{c}"}} {m}' for c, (_, m) in caches.items()]
+    lines.append("# TYPE floodsafe_cache_hit_ratio gauge")
+    lines += [f'floodsafe_cache_hit_ratio{{cache="{c}"}} {h / (h + m) if h + m else 0.0:.4f}' for c, (h, m) in caches.items()]
+    return "\n".join(lines) + "\n"
+
+
+def waterfall_html(record, width=560):
+    """Inline HTML waterfall of one rerun's spans (for the debug panel)"""
+    spans = record["spans"]
+    total = record["duration_ms"] or max((s["start_ms"] + s["duration_ms"] for s in spans), default=1.0)
+    total = max(total, 1e-3)
+    rows = []
+    for s in spans:
+        left = s["start_ms"] / total * width
+        w = max(1.0, s["duration_ms"] / total * width)
+        color = "#1a73e8" if s["thread"] == "ScriptRunner.scriptThread" else "#34a853"
+        rows.append(
+            f'<div style="display:flex;align-items:center;font:12px monospace;height:18px;">'
+            f'<span style="width:150px;overflow:hidden;">{s["name"]}</span>'
+            f'<span style="position:relative;width:{width}px;height:12px;background:#f1f3f4;">'
+            f'<span style="position:absolute;left:{left:.0f}px;width:{w:.0f}px;height:12px;background:{color};"></span></span>'
+            f'<span style="margin-left:8px;">{s["duration_ms"]:.1f} ms</span></div>'
+        )
+    return "".join(rows)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics"):
+            body, ctype = prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path.startswith("/reruns"):
+            body = "".join(json.dumps(r) + "\n" for r in recent_reruns()).encode()
+            ctype = "application/x-ndjson"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+
+
+def serve_metrics(port=METRICS_PORT):
+    """Start the /metrics endpoint once per process (no-op when port is 0)"""
+    global _server
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
@@ -0,0 +1,246 @@
+"""Append-only gauge time series in memory-mapped ring buffers.
+
+Each station has one ring file per tier under FLOODSAFE_TIMESERIES_DIR:
+raw samples plus min/max/mean downsample tiers (15 min, 1 h, 1 day) that are
+updated in place on every append, so appends are O(1) and a months-long
+chart reads a few hundred pre-aggregated rows. Files are np.memmap'ed on
+demand and only a bounded number of stations is kept open, so thousands of
+stations never need to fit in RAM. Samples must be appended in time order.
+
+Ingest: python -m floodsafe.timeseries ingest readings.csv   (station,t,value)
+"""
+import argparse
+import csv
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from floodsafe.geometry import haversine_km
+
+ROOT = os.environ.get("FLOODSAFE_TIMESERIES_DIR", "timeseries")
+STATIONS_PATH = os.environ.get("FLOODSAFE_GAUGE_STATIONS")
+# change_since() only compares against a sample this close to the requested time
+TOLERANCE_SECONDS = int(os.environ.get("FLOODSAFE_GAUGE_TOLERANCE", "3600"))
+# readings older than this are shown as stale rather than as the current level
+STALE_SECONDS = int(os.environ.get("FLOODSAFE_GAUGE_STALE", str(6 * 3600)))
+
+RAW_DTYPE = np.dtype([("t", "<i8"), ("v", "<f4")])
+AGG_DTYPE = np.dtype([("t", "<i8"), ("min", "<f4"), ("max", "<f4"), ("sum", "<f8"), ("n", "<i4")])
+
+# tier name -> (bucket seconds, ring capacity); raw holds ~1 year of 1-minute samples
+TIERS = OrderedDict([
+    ("raw", (0, 366 * 24 * 60)),
+    ("15m", (900, 366 * 96)),
+    ("1h", (3600, 5 * 366 * 24)),
+    ("1d", (86400, 20 * 366)),
+])
+
+
+class Ring:
+    """Fixed-capacity ring of records in a memory-mapped file with a 2-slot header"""
+
+    def __init__(self, path, dtype, capacity):
+        new = not os.path.exists(path + ".hdr")
+        mode = "w+" if new else "r+"
+        self.hdr = np.memmap(path + ".hdr", dtype="<i8", mode=mode, shape=(2,))  # head, count
+        self.data = np.memmap(path, dtype=dtype, mode=mode, shape=(capacity,))
+        self.capacity = capacity
+
+    @property
+    def count(self):
+        return int(self.hdr[1])
+
+    def append(self, rec):
+        head = int(self.hdr[0])
+        self.data[head] = rec
+        self.hdr[0] = (head + 1) % self.capacity
+        self.hdr[1] = min(self.capacity, int(self.hdr[1]) + 1)
+
+    def last(self):
+        if self.count == 0:
+            return None
+        return self.data[(int(self.hdr[0]) - 1) % self.capacity]
+
+    def set_last(self, rec):
+        self.data[(int(self.hdr[0]) - 1) % self.capacity] = rec
+
+    def _segments(self):
+        """Logical (oldest -> newest) order as at most two contiguous slices"""
+        head, count = int(self.hdr[0]), self.count
+        if count < self.capacity:
+            return [self.data[:count]]
+        return [self.data[head:], self.data[:head]]
+
+    def range(self, start, end):
+        """Records with start <= t < end, oldest first (binary search per segment)"""
+        out = []
+        for seg in self._segments():
+            t = seg["t"]
+            lo, hi = np.searchsorted(t, start, "left"), np.searchsorted(t, end, "left")
+            if hi > lo:
+                out.append(np.array(seg[lo:hi]))
+        return np.concatenate(out) if out else np.empty(0, dtype=self.data.dtype)
+
+    def at_or_before(self, t):
+        """Latest record with time <= t, or None"""
+        for seg in reversed(self._segments()):
+            i = np.searchsorted(seg["t"], t, "right")
+            if i > 0:
+                return seg[i - 1]
+        return None
+
+    def flush(self):
+        self.hdr.flush()
+        self.data.flush()
+
+
+class Station:
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.tiers = OrderedDict(
+            (name, Ring(os.path.join(directory, name + ".ring"), RAW_DTYPE if bucket == 0 else AGG_DTYPE, cap))
+            for name, (bucket, cap) in TIERS.items()
+        )
+
+    def append(self, t, value):
+        t = int(t)
+        self.tiers["raw"].append((t, value))
+        for name, (bucket, _) in TIERS.items():
+            if bucket == 0:
+                continue
+            ring = self.tiers[name]
+            b = t - t % bucket
+            last = ring.last()
+            if last is not None and int(last["t"]) == b:
+                ring.set_last((b, min(last["min"], value), max(last["max"], value), last["sum"] + value, last["n"] + 1))
+            else:
+                ring.append((b, value, value, value, 1))
+
+    def flush(self):
+        for ring in self.tiers.values():
+            ring.flush()
+
+
+class TimeSeriesStore:
+    def __init__(self, root=ROOT, max_open=256):
+        self.root = root
+        self.max_open = max_open
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _station(self, station_id, create=False):
+        with self._lock:
+            st = self._open.get(station_id)
+            if st is not None:
+                self._open.move_to_end(station_id)
+                return st
+            directory = os.path.join(self.root, str(station_id))
+            if not create and not os.path.isdir(directory):
+                return None
+            st = self._open[station_id] = Station(directory)
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)[1].flush()
+            return st
+
+    def append(self, station_id, value, t=None):
+        self._station(station_id, create=True).append(time.time() if t is None else t, value)
+
+    def latest(self, station_id):
+        st = self._station(station_id)
+        rec = st.tiers["raw"].last() if st else None
+        return None if rec is None else (int(rec["t"]), float(rec["v"]))
+
+    def change_since(self, station_id, seconds=86400, tolerance=TOLERANCE_SECONDS, now=None):
+        """(latest value, change over `seconds`, age of the latest sample in s); None without history.
+
+        The change is None unless a sample lies within `tolerance` of
+        `seconds` before the latest one, so a gap in ingest never passes off
+        a week-old level as "since yesterday".
+        """
+        st = self._station(station_id)
+        if st is None or st.tiers["raw"].count == 0:
+            return None
+        raw = st.tiers["raw"]
+        last = raw.last()
+        t_last = int(last["t"])
+        age = (time.time() if now is None else now) - t_last
+        target = t_last - seconds
+        before = raw.at_or_before(target + tolerance)
+        if before is not None and target - int(before["t"]) > tolerance:
+            before = None
+        if before is None:
+            return float(last["v"]), None, age
+        return float(last["v"]), float(last["v"] - before["v"]), age
+
+    def raw(self, station_id, start, end):
+        st = self._station(station_id)
+        return st.tiers["raw"].range(start, end) if st else np.empty(0, dtype=RAW_DTYPE)
+
+    def query(self, station_id, start, end, max_points=1000):
+        """(tier name, records) for [start, end) from the finest tier with <= max_points rows.
+
+        Aggregate tiers return t/min/max/sum/n; mean is sum / n.
+        """
+        st = self._station(station_id)
+        if st is None:
+            return "raw", np.empty(0, dtype=RAW_DTYPE)
+        span = max(1, end - start)
+        for name, (bucket, _) in TIERS.items():
+            expected = span / (bucket or 60)
+            if expected <= max_points or name == next(reversed(TIERS)):
+                return name, st.tiers[name].range(start, end)
+
+    def flush(self):
+        with self._lock:
+            for st in self._open.values():
+                st.flush()
+
+
+def load_stations(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    return {
+        "id": [r["id"] for r in rows],
+        "name": [r.get("name") or r["id"] for r in rows],
+        "lat": np.array([float(r["lat"]) for r in rows]),
+        "lon": np.array([float(r["lon"]) for r in rows]),
+    }
+
+
+_stations = None
+
+
+def nearest_station(lat, lon, max_km=25.0):
+    """(id, name, distance km) of the closest gauge in FLOODSAFE_GAUGE_STATIONS, or None"""
+    global _stations
+    if not STATIONS_PATH:
+        return None
+    if _stations is None:
+        _stations = load_stations(STATIONS_PATH)
+    if not _stations["id"]:
+        return None
+    d = haversine_km(lat, lon, _stations["lat"], _stations["lon"])
+    i = int(np.argmin(d))
+    return (_stations["id"][i], _stations["name"][i], float(d[i])) if d[i] <= max_km else None
+
+
+GAUGES = TimeSeriesStore()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ing = sub.add_parser("ingest", help="append station,t,value rows from a CSV (sorted by time)")
+    ing.add_argument("csv")
+    args = ap.parse_args(argv)
+    with open(args.csv, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            GAUGES.append(row["station"], float(row["value"]), int(float(row["t"])))
+    GAUGES.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Persistent (text, lang) -> translation memo with batched backend calls.
+
+Lookups go through an in-memory LRU, then a SQLite table on disk; whatever
+is still missing is sent to the translation backend as one batched request.
+The SQLite file is only opened (and created) on first use.
+"""
+import importlib.util
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DB_PATH = os.environ.get("FLOODSAFE_TRANSLATIONS_DB", "floodsafe_translations.sqlite3")
+# LibreTranslate-compatible endpoint; when set it replaces googletrans as the backend
+TRANSLATE_URL = os.environ.get("FLOODSAFE_TRANSLATE_URL")
+
+# Joins a batch into a single backend request; translators keep line breaks.
+_BATCH_SEP = "\n"
+
+
+class TranslationMemo:
+    def __init__(self, db_path=DB_PATH, maxsize=8192, backend=None):
+        self.maxsize = maxsize
+        self.backend = backend  # callable(text, dest) -> translated text
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self._open_lock = threading.Lock()
+        self._conn = None
+        self._warmed = set()
+        self._seeded = False
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.backend_calls = 0
+
+    @property
+    def _db(self):
+        if self._conn is None:
+            with self._open_lock:
+                if self._conn is None:
+                    db = sqlite3.connect(self.db_path, check_same_thread=False)
+                    db.execute(
+                        "CREATE TABLE IF NOT EXISTS translations ("
+                        "text TEXT NOT NULL, lang TEXT NOT NULL, translated TEXT NOT NULL, "
+                        "PRIMARY KEY (text, lang))"
+                    )
+                    db.commit()
+                    self._conn = db
+        return self._conn
+
+    def translate(self, text, lang, allow_backend=True):
+        if lang == 'en' or not text:
+            return text
+        return self.translate_many([text], lang, allow_backend)[0]
+
+    def translate_many(self, texts, lang, allow_backend=True):
+        """Translate a list of strings, going to the backend at most once.
+
+        With allow_backend=False (offline mode) only stored translations are used.
+        """
+        if lang == 'en':
+            return list(texts)
+        out = {}
+        wanted = []
+        with self._lock:
+            for t in texts:
+                if not t or t in out:
+                    continue
+                key = (t, lang)
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    out[t] = self._lru[key]
+                    self.hits += 1
+                else:
+                    wanted.append(t)
+            if wanted:
+                found = self._db_get(wanted, lang)
+                self.db_hits += len(found)
+                for t, tr in found.items():
+                    self._remember((t, lang), tr)
+                out.update(found)
+        missing = list(dict.fromkeys(t for t in wanted if t not in out))
+        if missing and allow_backend:
+            self.misses += len(missing)
+            translated = self._call_backend(missing, lang)
+            out.update(translated)
+            self.store(translated, lang)
+        return [out.get(t, t) if t else t for t in texts]
+
+    def store(self, pairs, lang):
+        """Record known translations (dict of source text -> translated text)"""
+        rows = [(t, lang, tr) for t, tr in pairs.items() if t and tr]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?)", rows)
+            self._db.commit()
+            for t, _, tr in rows:
+                self._remember((t, lang), tr)
+
+    def seed_ui_text(self, ui_text):
+        """Load the hand-written UI_TEXT translations so they never hit the backend"""
+        if self._seeded:
+            return
+        self._seeded = True
+        by_lang = {}
+        for entry in ui_text.values():
+            en = entry.get('en')
+            for lang, tr in entry.items():
+                if lang != 'en' and en:
+                    by_lang.setdefault(lang, {})[en] = tr
+        for lang, pairs in by_lang.items():
+            self.store(pairs, lang)
+
+    def warm_up(self, texts, langs, allow_backend=True):
+        """Pre-translate a page's static strings once per process, in the background.
+
+        Without `allow_backend` (offline mode) nothing is sent and the
+        languages stay due for the next online call.
+        """
+        if not allow_backend:
+            return
+        todo = [lang for lang in langs if lang != 'en' and lang not in self._warmed]
+        if not todo:
+            return
+        self._warmed.update(todo)
+
+        def run():
+            for lang in todo:
+                self.translate_many(texts, lang)
+
+        threading.Thread(target=run, name="translation-warmup", daemon=True).start()
+
+    def stats(self):
+        return {
+            "size": len(self._lru),
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "backend_calls": self.backend_calls,
+        }
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def _db_get(self, texts, lang):
+        found = {}
+        # stay well under SQLite's bound-parameter limit
+        for i in range(0, len(texts), 500):
+            chunk = texts[i:i + 500]
+            q = "SELECT text, translated FROM translations WHERE lang = ? AND text IN (%s)" % ",".join("?" * len(chunk))
+            found.update(self._db.execute(q, [lang] + chunk).fetchall())
+        return found
+
+    def _call_backend(self, texts, lang):
+        if self.backend is None:
+            return {}
+        self.backend_calls += 1
+        try:
+            joined = self.backend(_BATCH_SEP.join(texts), lang)
+            parts = joined.split(_BATCH_SEP) if joined else []
+            if len(parts) == len(texts):
+                return dict(zip(texts, (p.strip() for p in parts)))
+        except Exception:
+            pass
+        # The backend merged or dropped lines; fall back to one call per string.
+        out = {}
+        for t in texts:
+            try:
+                self.backend_calls += 1
+                out[t] = self.backend(t, lang)
+            except Exception:
+                pass
+        return out
+
+
+def googletrans_backend():
+    """Backend over googletrans, or None when it isn't installed.
+
+    Nothing is imported until the first call, which also builds the Translator.
+    """
+    if importlib.util.find_spec("googletrans") is None:
+        return None
+    translator = None
+    lock = threading.Lock()
+
+    def translate(text, dest):
+        nonlocal translator
+        with lock:
+            if translator is None:
+                from googletrans import Translator
+                translator = Translator()
+        return translator.translate(text, dest=dest).text
+
+    return translate
+
+
+def http_backend(url, timeout=10):
+    """Backend that POSTs {q, source, target} to a LibreTranslate-style /translate endpoint"""
+    from floodsafe.fetch import SESSION
+
+    def translate(text, dest):
+        r = SESSION.post(url, json={"q": text, "source": "en", "target": dest, "format": "text"}, timeout=timeout)
+        r.raise_for_status()
+        return r.json()["translatedText"]
+
+    return translate
+
+
+TRANSLATIONS = TranslationMemo()
@@ -0,0 +1,64 @@
+"""OpenWeather current-weather and forecast lookups.
+
+Lookups are answered, in order, from the in-process tile cache, from a fresh
+worker snapshot in the shared store, and only then from the upstream API.
+"""
+import os
+
+from floodsafe.cache import WEATHER_CACHE
+from floodsafe.fetch import get_json
+from floodsafe.store import STORE
+
+# --- YOUR OPENWEATHER API KEY (replace with yours if needed) ---
+OPENWEATHER_KEY = os.environ.get("OPENWEATHER_KEY", "d0c51699c6fdb0f61cf6e05f2d4247fa")
+
+OPENWEATHER_BASE = os.environ.get("OPENWEATHER_BASE", "https://api.openweathermap.org")
+
+
+def get_current_weather(lat, lon, api_key=OPENWEATHER_KEY):
+    """Current weather for the ~1 km tile around (lat, lon), served from the shared cache"""
+    return WEATHER_CACHE.get_or_fetch("current", lat, lon, lambda: _stored_or_fetched("current", lat, lon, api_key))
+
+
+def get_forecast(lat, lon, api_key=OPENWEATHER_KEY):
+    """5-day forecast for the ~1 km tile around (lat, lon), served from the shared cache"""
+    return WEATHER_CACHE.get_or_fetch("forecast", lat, lon, lambda: _stored_or_fetched("forecast", lat, lon, api_key))
+
+
+def _stored_or_fetched(kind, lat, lon, api_key):
+    stored = STORE.get(kind, lat, lon)
+    if stored is not None:
+        return stored
+    fetch = fetch_current_weather if kind == "current" else fetch_forecast
+    return fetch(lat, lon, api_key)
+
+
+def fetch_current_weather(lat, lon, api_key=OPENWEATHER_KEY):
+    """Uncached upstream call; None on any failure"""
+    try:
+        url = OPENWEATHER_BASE + "/data/2.5/weather"
+        params = {"lat": lat, "lon": lon, "appid": api_key, "units": "metric"}
+        data = get_json(url, params=params, timeout=8)
+        return {
+            "city": data.get("name",""),
+            "country": data.get("sys",{}).get("country",""),
+            "temp": round(data["main"]["temp"]),
+            "feels_like": round(data["main"]["feels_like"]),
+            "humidity": data["main"]["humidity"],
+            "wind": data["wind"]["speed"],
+            "desc": data["weather"][0]["description"].title(),
+            "rain_1h": data.get("rain", {}).get("1h", 0),
+            "cod": data.get("cod",200)
+        }
+    except Exception:
+        return None
+
+
+def fetch_forecast(lat, lon, api_key=OPENWEATHER_KEY):
+    """Uncached upstream call; None on any failure"""
+    try:
+        url = OPENWEATHER_BASE + "/data/2.5/forecast"
+        params = {"lat": lat, "lon": lon, "appid": api_key, "units": "metric"}
+        return get_json(url, params=params, timeout=8)
+    except Exception:
+        return None
@@ -0,0 +1,142 @@
+"""Background polling worker.
+
+Polls a list of regions on a schedule with bounded concurrency and writes the
+weather, forecast and risk for each region's tile into the shared snapshot
+store, where the dashboard picks them up instead of calling upstream.
+
+Regions file: a JSON list of {"name", "lat", "lon"} objects, or a CSV with
+those columns.
+
+Run: python -m floodsafe.worker --regions regions.json --interval 300 --concurrency 4
+"""
+import argparse
+import csv
+import json
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from floodsafe.dispatch import SMS, alert_text, get_outbox
+from floodsafe.offline import prebuild
+from floodsafe.ratelimit import background
+from floodsafe.risk import LEVELS, RISK_RADIUS_M, derive_risk_from_weather
+from floodsafe.store import STORE
+from floodsafe.subscribers import ZoneMatcher, load_subscribers
+from floodsafe.translation import TRANSLATIONS
+from floodsafe.weather import OPENWEATHER_KEY, fetch_current_weather, fetch_forecast
+
+log = logging.getLogger("floodsafe.worker")
+
+
+def load_regions(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = json.load(f)
+    return [{"name": r.get("name", ""), "lat": float(r["lat"]), "lon": float(r["lon"])} for r in rows]
+
+
+def poll_region(region, store=STORE, api_key=OPENWEATHER_KEY):
+    """Fetch one region and write its snapshots; returns True if weather was stored"""
+    lat, lon = region["lat"], region["lon"]
+    with background():
+        weather = fetch_current_weather(lat, lon, api_key)
+        forecast = fetch_forecast(lat, lon, api_key)
+    if weather is not None:
+        store.put("current", lat, lon, weather)
+        level, reasons = derive_risk_from_weather(weather)
+        store.put("risk", lat, lon, {"level": level, "reasons": reasons})
+    if forecast is not None:
+        store.put("forecast", lat, lon, forecast)
+    return weather is not None
+
+
+def poll_once(regions, concurrency=4, store=STORE, api_key=OPENWEATHER_KEY):
+    """Poll every region once with at most `concurrency` in flight; returns #succeeded"""
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="poll") as pool:
+        results = list(pool.map(lambda r: poll_region(r, store, api_key), regions))
+    return sum(results)
+
+
+def notify_subscribers(regions, matcher, store=STORE, outbox=None):
+    """Re-match each region's risk zone and queue alerts for subscribers whose level rose.
+
+    Only regions whose level changed since the last round are re-matched.
+    Returns the number of alerts queued.
+    """
+    queued = 0
+    for r in regions:
+        risk = store.get("risk", r["lat"], r["lon"]) or {}
+        level = risk.get("level") if risk.get("level") in LEVELS else None
+        zone_id = (r["lat"], r["lon"])
+        known = matcher.zones.get(zone_id, (None,))[0]
+        if (None if level is None else LEVELS.index(level)) == known:
+            continue
+        zone = {"circle": (r["lat"], r["lon"], RISK_RADIUS_M[level])} if level else None
+        rose = matcher.update(zone_id, level, zone)
+        if level not in ("High", "Moderate") or not rose.size:
+            continue
+        index = matcher.index
+        text = alert_text(level, r.get("name") or f"{r['lat']:.3f}, {r['lon']:.3f}")
+        for lang in set(index.langs[rose]):
+            members = rose[index.langs[rose] == lang]
+            contacts = [c for c in index.contacts[members] if c]
+            if contacts:
+                queued += (outbox or get_outbox()).enqueue(SMS, contacts, TRANSLATIONS.translate(text, lang, allow_backend=False))
+    return queued
+
+
+def run(regions, interval=300, concurrency=4, stop=None, prebuild_top=0, matcher=None):
+    """Poll forever (or until `stop` is set), one round every `interval` seconds.
+
+    With `prebuild_top` > 0, offline packages for that many of the riskiest
+    regions are rebuilt after each round.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        started = time.monotonic()
+        ok = poll_once(regions, concurrency)
+        if prebuild_top:
+            prebuild(regions, prebuild_top)
+        if matcher is not None:
+            log.info("queued %d subscriber alerts", notify_subscribers(regions, matcher))
+        took = time.monotonic() - started
+        log.info("polled %d/%d regions in %.1f s", ok, len(regions), took)
+        stop.wait(max(0.0, interval - took))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--regions", required=True, help="JSON or CSV file of regions to poll")
+    ap.add_argument("--interval", type=float, default=300, help="seconds between polling rounds")
+    ap.add_argument("--concurrency", type=int, default=4, help="max regions fetched at once")
+    ap.add_argument("--prebuild-offline", type=int, default=0, metavar="N",
+                    help="prebuild offline map packages for the N riskiest regions after each round "
+                         "(shared with dashboards through FLOODSAFE_OFFLINE_DIR)")
+    ap.add_argument("--subscribers", help="CSV of subscribers (id, lat, lon, lang, phone) to alert when risk rises")
+    ap.add_argument("--once", action="store_true", help="poll a single round and exit")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    regions = load_regions(args.regions)
+    matcher = ZoneMatcher(load_subscribers(args.subscribers)) if args.subscribers else None
+    if args.once:
+        poll_once(regions, args.concurrency)
+        if args.prebuild_offline:
+            prebuild(regions, args.prebuild_offline)
+        if matcher is not None:
+            notify_subscribers(regions, matcher)
+        return
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        run(regions, args.interval, args.concurrency, stop, args.prebuild_offline, matcher)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -6,31 +6,34 @@
 #
 # Run: streamlit run build7.py
 
+# pandas, plotly and folium are imported only by the sections that render them,
+# and googletrans only on the first translation that reaches the backend.
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import json
 import requests
-from PIL import Image
-import io
-import base64
-import time
-import folium
-from streamlit_folium import st_folium
-import zipfile
 import os
-
-# Optional imports
-try:
-    from googletrans import Translator
-    TRANSLATOR = Translator()
-    GT_AVAILABLE = True
-except Exception:
-    TRANSLATOR = None
-    GT_AVAILABLE = False
+import uuid
+
+from floodsafe.fetch import load_dashboard_data
+from floodsafe.translation import TRANSLATE_URL, TRANSLATIONS, googletrans_backend, http_backend
+from floodsafe.weather import OPENWEATHER_KEY, get_current_weather, get_forecast
+from floodsafe.risk import derive_risk_from_weather
+from floodsafe.riskmodel import location_features
+from floodsafe.shelters import find_nearby_shelters
+from floodsafe.routing import get_evacuation_routes
+from floodsafe.roads import get_router
+from floodsafe.assignment import planned_shelters
+from floodsafe.offline import get_offline_package
+from floodsafe.maps import render_map_html
+from floodsafe.shelters import get_registry
+from floodsafe.snapshots import SYNC, load_offline_data, save_snapshot
+from floodsafe.gazetteer import get_gazetteer, preload_in_background
+from floodsafe.dispatch import SMS, SOS_RECIPIENTS, get_outbox
+from floodsafe.analytics import forecast_frame, peak_intensity
+from floodsafe.charts import forecast_figures, gauge_figure
+from floodsafe.timeseries import GAUGES, STALE_SECONDS, nearest_station
+from floodsafe.raster import district_rain
+from floodsafe.lowband import LITE_CSS, PageBudget, compact_summary, contacts_line
+from floodsafe.telemetry import begin_rerun, cache_stats, end_rerun, recent_reruns, section, serve_metrics, span, waterfall_html
 
 # ----------------------------
 # CONFIG
@@ -42,8 +45,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- YOUR OPENWEATHER API KEY (replace with yours if needed) ---
-OPENWEATHER_KEY = "d0c51699c6fdb0f61cf6e05f2d4247fa"
+# Per-rerun timing spans, grouped by session (see floodsafe/telemetry.py)
+if '_session_id' not in st.session_state:
+    st.session_state['_session_id'] = uuid.uuid4().hex[:12]
+st.session_state['_rerun_no'] = st.session_state.get('_rerun_no', 0) + 1
+begin_rerun(st.session_state['_session_id'], st.session_state['_rerun_no'])
+serve_metrics()
+section("setup")
+
+# OpenWeather key: set OPENWEATHER_KEY in the environment (see floodsafe/weather.py)
 
 # ----------------------------
 # CSS Styling + Smooth Scroll JS
@@ -54,7 +64,27 @@ OPENWEATHER_KEY = "d0c51699c6fdb0f61cf6e05f2d4247fa"
 # - SOS: red gradient
 # - Sidebar links: gradient + icons, no underline, lift on hover
 # - Sidebar headings and subheadings: white
-st.markdown("""
+# Battery saver is read from session state here: this CSS is sent before its checkbox renders.
+# In that mode the page is text only and capped at FLOODSAFE_LOWBAND_BUDGET bytes (floodsafe/lowband.py):
+# all of its text goes through page_budget, and the separators and scroll anchors are left out.
+battery_saver = st.session_state.get("battery_saver", False)
+page_budget = PageBudget() if battery_saver else None
+
+
+def divider(anchor=None):
+    """Section separator and scroll anchor, neither of which the text-only page sends"""
+    if battery_saver:
+        return
+    st.markdown("---")
+    if anchor:
+        st.markdown(f'<div id="{anchor}" class="section-anchor"></div>', unsafe_allow_html=True)
+
+
+if battery_saver:
+    page_budget.spend(LITE_CSS)
+    st.markdown(LITE_CSS, unsafe_allow_html=True)
+else:
+    st.markdown("""
 <style>
 /* App background */
 [data-testid="stAppViewContainer"] { background-color: #f0f2f5; color: #111; }
@@ -233,22 +263,89 @@ def ui_t(key, lang_code='en'):
 # ----------------------------
 # UTIL: translation helper (tries googletrans, else internal)
 # ----------------------------
+if TRANSLATIONS.backend is None:
+    TRANSLATIONS.backend = http_backend(TRANSLATE_URL) if TRANSLATE_URL else googletrans_backend()
+
 def translate_text(txt, to_code):
     """
-    Attempt to translate `txt` to language code `to_code` using googletrans if available.
-    If not available, return original text (we rely mainly on UI_TEXT for keys).
+    Translate `txt` to language code `to_code` through the shared translation memo
+    (in-memory LRU -> SQLite -> googletrans if available).
+    If nothing is available, return original text (we rely mainly on UI_TEXT for keys).
     to_code: 'en','hi','bn','ta'
     """
     if to_code == 'en' or txt is None or txt == "":
         return txt
-    if GT_AVAILABLE:
-        try:
-            res = TRANSLATOR.translate(txt, dest=to_code)
-            return res.text
-        except Exception:
-            return txt
-    else:
-        return txt
+    return TRANSLATIONS.translate(txt, to_code, allow_backend=not st.session_state.get('offline_mode', False))
+
+def translate_list(texts, to_code):
+    """Batch version of translate_text: one backend round trip for all misses"""
+    return TRANSLATIONS.translate_many(texts, to_code, allow_backend=not st.session_state.get('offline_mode', False))
+
+# Static English strings rendered through translate_text on every page. They are
+# pre-translated at startup and fetched in one batch per render, so a language
+# switch costs one backend round trip at most.
+EMERGENCY_CONTACT_NAMES = [
+    "National Disaster Response Force", "Police", "Ambulance", "Fire Department",
+    "Local Flood Helpline", "District Emergency Officer", "Rescue Team",
+]
+SAFETY_GUIDELINES = [
+    "Before: Prepare an emergency kit, store food & water, move valuables to higher ground.",
+    "During: Move to higher ground, avoid walking through flood water, avoid electrical hazards.",
+    "After: Avoid flood water, disinfect surfaces, check for structural damage."
+]
+EVACUATION_ADVICE = {
+    "High": {
+        "banner": "Immediate evacuation recommended. Follow these steps:",
+        "steps": [
+            "1. Gather essential items: documents, medicines, water, flashlight",
+            "2. Turn off electricity and gas at the main valves",
+            "3. Move to higher ground or designated shelter immediately",
+            "4. Avoid walking through moving water",
+            "5. Do not attempt to drive through flooded areas"
+        ]
+    },
+    "Moderate": {
+        "banner": "Prepare for possible evacuation. Recommended actions:",
+        "steps": [
+            "1. Prepare an emergency kit with essential supplies",
+            "2. Identify safe routes to higher ground or shelters",
+            "3. Monitor weather updates regularly",
+            "4. Secure important documents in waterproof containers",
+            "5. Charge all electronic devices"
+        ]
+    },
+    "Low": {
+        "banner": "No immediate evacuation needed. Stay informed:",
+        "steps": [
+            "1. Stay updated with weather forecasts",
+            "2. Know your evacuation routes and shelter locations",
+            "3. Prepare an emergency kit as a precaution",
+            "4. Sign up for local emergency alerts",
+            "5. Identify the safest areas of your home on higher floors"
+        ]
+    }
+}
+DEMO_ALERTS = [
+    {'type':'danger','title':'Flood Warning','message':'Heavy rainfall expected in next 24 hours'},
+    {'type':'warning','title':'River Overflow','message':'River level rising above warning mark'},
+    {'type':'info','title':'Shelter Opened','message':'New shelter active at City College'}
+]
+PAGE_STRINGS = (
+    EMERGENCY_CONTACT_NAMES + SAFETY_GUIDELINES
+    + [a[k] for a in DEMO_ALERTS for k in ('title', 'message')]
+    + [t for level in EVACUATION_ADVICE.values() for t in [level["banner"]] + level["steps"]]
+    + [
+        "Searching for nearby shelters...", "Nearby Shelters", "Recommended Evacuation Routes",
+        "Show Emergency Call Instructions",
+        "In a real emergency, dial the numbers above. Save these numbers in your phone for quick access.",
+        "Weather data not available to provide evacuation guidance.",
+        "Safety Guidelines", "Recent Alerts", "SOS", "🚨 Send SOS via WhatsApp",
+    ]
+)
+TRANSLATIONS.seed_ui_text(UI_TEXT)
+preload_in_background()
+if TRANSLATIONS.backend is not None:
+    TRANSLATIONS.warm_up(PAGE_STRINGS, ['hi', 'bn', 'ta'], allow_backend=not st.session_state.get('offline_mode', False))
 
 # ----------------------------
 # SESSION STATE: coords & language
@@ -263,12 +360,16 @@ if 'lang' not in st.session_state:
 # EMERGENCY FUNCTIONS
 # ----------------------------
 def send_emergency_sms():
-    """Simulate sending emergency SMS"""
+    """Queue an emergency SMS to the SOS contacts (FLOODSAFE_SOS_RECIPIENTS); floodsafe.dispatch sends it"""
     if st.session_state.get('coords'):
         lat = st.session_state['coords']['lat']
         lon = st.session_state['coords']['lon']
         message = f"EMERGENCY! Need assistance at coordinates: {lat:.6f}, {lon:.6f}. Google Maps: https://www.google.com/maps?q={lat},{lon}"
-        st.sidebar.success(f"SMS would be sent with location: {lat:.6f}, {lon:.6f}")
+        if SOS_RECIPIENTS:
+            get_outbox().enqueue(SMS, SOS_RECIPIENTS, message)
+            st.sidebar.success(f"SOS SMS queued for {len(SOS_RECIPIENTS)} contact(s) with location: {lat:.6f}, {lon:.6f}")
+        else:
+            st.sidebar.success(f"SMS would be sent with location: {lat:.6f}, {lon:.6f}")
         return message
     else:
         st.sidebar.error("Location not available. Please set your location first.")
@@ -286,16 +387,19 @@ def get_nearby_hospitals(lat, lon, radius=5000):
 # ----------------------------
 # SIDEBAR: Language, Location, Controls (with anchored emergency nav)
 # ----------------------------
+section("sidebar")
 st.sidebar.markdown(f"<h2 style='color:white'>🌊 FloodSafe</h2>", unsafe_allow_html=True)
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 🚨 Emergency Features")
 
 # Sidebar anchor links (smooth scroll). SOS is a red gradient link; others are blue gradient.
-st.sidebar.markdown('<a class="sidebar-btn sos-link" href="#sos-section">🚨 SOS Emergency</a>', unsafe_allow_html=True)
-st.sidebar.markdown('<a class="sidebar-btn" href="#view-alerts">⚠️ View Alerts</a>', unsafe_allow_html=True)
-st.sidebar.markdown('<a class="sidebar-btn" href="#safe-zone-locator">🏠 Find Shelters</a>', unsafe_allow_html=True)
-st.sidebar.markdown('<a class="sidebar-btn" href="#emergency-contacts">📞 Emergency Contacts</a>', unsafe_allow_html=True)
-st.sidebar.markdown('<a class="sidebar-btn" href="#evacuation-routes">🛣️ Evacuation Routes</a>', unsafe_allow_html=True)
+# The text-only page is short and has no anchors, so battery saver skips them.
+if not battery_saver:
+    st.sidebar.markdown('<a class="sidebar-btn sos-link" href="#sos-section">🚨 SOS Emergency</a>', unsafe_allow_html=True)
+    st.sidebar.markdown('<a class="sidebar-btn" href="#view-alerts">⚠️ View Alerts</a>', unsafe_allow_html=True)
+    st.sidebar.markdown('<a class="sidebar-btn" href="#safe-zone-locator">🏠 Find Shelters</a>', unsafe_allow_html=True)
+    st.sidebar.markdown('<a class="sidebar-btn" href="#emergency-contacts">📞 Emergency Contacts</a>', unsafe_allow_html=True)
+    st.sidebar.markdown('<a class="sidebar-btn" href="#evacuation-routes">🛣️ Evacuation Routes</a>', unsafe_allow_html=True)
 
 st.sidebar.markdown("---")
 
@@ -303,6 +407,8 @@ st.sidebar.markdown("---")
 lang_choice = st.sidebar.selectbox("Language / भाषा / ভাষা / மொழி", ["English","Hindi","Bengali","Tamil"])
 lang_map = {"English":"en","Hindi":"hi","Bengali":"bn","Tamil":"ta"}
 st.session_state['lang'] = lang_map[lang_choice]
+# One batched backend call for whatever this page's strings are still missing
+translate_list(PAGE_STRINGS, st.session_state['lang'])
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 🔎 Location")
@@ -318,33 +424,22 @@ st.sidebar.markdown("### 🗺️ Offline Map")
 if st.sidebar.button(ui_t("download_offline_map", st.session_state['lang'])):
     coords = st.session_state.get('coords') or {'lat': lat_manual, 'lon': lon_manual}
     lat0, lon0 = coords['lat'], coords['lon']
-    m = folium.Map(location=[lat0, lon0], zoom_start=12)
-    folium.TileLayer("OpenStreetMap").add_to(m)
-    folium.Marker([lat0, lon0], popup="Selected Location").add_to(m)
-    shelters = [
-        {"name":"Central High School","lat":lat0+0.003,"lon":lon0+0.004},
-        {"name":"Community Center","lat":lat0-0.004,"lon":lon0-0.003},
-        {"name":"City Hospital","lat":lat0+0.006,"lon":lon0-0.002}
-    ]
-    for s in shelters:
-        folium.Marker([s['lat'], s['lon']], popup=s['name']).add_to(m)
-    offline_html = "offline_map.html"
-    m.save(offline_html)
-    shelters_geo = {"type":"FeatureCollection","features":[]}
-    for s in shelters:
-        shelters_geo["features"].append({"type":"Feature","properties":{"name":s['name']},"geometry":{"type":"Point","coordinates":[s['lon'], s['lat']]}})
-    zip_name = "offline_package.zip"
-    with zipfile.ZipFile(zip_name, "w") as zf:
-        zf.write(offline_html)
-        zf.writestr("shelters.geojson", json.dumps(shelters_geo))
-    with open(zip_name, "rb") as f:
-        st.sidebar.download_button("Download Offline Package (HTML + GeoJSON)", data=f, file_name=zip_name, mime="application/zip")
+    # Built in memory and cached by content hash of (position, shelters, risk); only written to
+    # disk when FLOODSAFE_OFFLINE_DIR is set
+    if st.session_state.get('offline_mode'):
+        package_weather = load_offline_data(coords, coords)['weather']
+    else:
+        package_weather = get_current_weather(lat0, lon0)
+    package_risk = derive_risk_from_weather(package_weather)[0]
+    package_zip, package_digest = get_offline_package(lat0, lon0, package_risk)
+    st.sidebar.download_button("Download Offline Package (HTML + GeoJSON)", data=package_zip,
+                               file_name=f"offline_package_{package_digest[:8]}.zip", mime="application/zip")
     st.sidebar.success("Offline package prepared. Check download button above.")
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("### ⚙️ Controls")
-battery_saver = st.sidebar.checkbox("Battery Saver Mode (text only)", value=False)
-offline_mode = st.sidebar.checkbox("Offline Mode (use downloaded files)", value=False)
+battery_saver = st.sidebar.checkbox("Battery Saver Mode (text only)", value=False, key="battery_saver")
+offline_mode = st.sidebar.checkbox("Offline Mode (use downloaded files)", value=False, key="offline_mode")
 
 # ----------------------------
 # JS Geolocation component (main area) - posts a window.postMessage
@@ -385,6 +480,7 @@ def geolocation_component(label):
 # ----------------------------
 # APP HEADER
 # ----------------------------
+section("location")
 st.title(ui_t("title", st.session_state['lang']))
 st.markdown(f"_{ui_t('subtitle', st.session_state['lang'])}_")
 
@@ -392,148 +488,59 @@ st.markdown(f"_{ui_t('subtitle', st.session_state['lang'])}_")
 st.markdown("### Location")
 colA, colB = st.columns([2,3])
 with colA:
-    geolocation_component(ui_t("get_location", st.session_state['lang']))
+    if not battery_saver:
+        geolocation_component(ui_t("get_location", st.session_state['lang']))
     st.markdown(f"**Manual coords:** {lat_manual:.6f}, {lon_manual:.6f}")
 with colB:
     city_input = st.text_input(ui_t("enter_city", st.session_state['lang']))
     
     if city_input:
-        try:
-            geo = requests.get(f"https://api.openweathermap.org/geo/1.0/direct?q={city_input}&limit=1&appid={OPENWEATHER_KEY}", timeout=8).json()
-            if geo:
-                st.session_state['coords'] = {'lat': float(geo[0]['lat']), 'lon': float(geo[0]['lon'])}
-                st.markdown(
-                f"<div style='color:#000;font-weight:600;'>Using coords for {city_input}: "
-                f"{geo[0]['lat']:.6f}, {geo[0]['lon']:.6f}</div>",
-                unsafe_allow_html=True
-            )
-            else:
-                st.warning("City not found (OpenWeather geocoding).")
-        except Exception as e:
-            st.error("Geocoding failed: " + str(e))
+        # Instant local autocomplete from the bundled gazetteer
+        suggestions = [p['name'] for p in get_gazetteer().prefix(city_input, limit=5)]
+        if suggestions and city_input.strip().lower() not in [n.lower() for n in suggestions]:
+            st.caption("Suggestions: " + ", ".join(suggestions))
+        # Close spellings are only offered, never used: "Patan" must not silently become Patna
+        did_you_mean = [f"{p['name']} ({p['state']})" if p['state'] else p['name']
+                        for p in get_gazetteer().suggest(city_input)]
+        if did_you_mean:
+            st.caption("Did you mean: " + ", ".join(did_you_mean) + "?")
+    if offline_mode:
+        # Everything comes from the local snapshot store and gazetteer; no network calls at all
+        local_city = get_gazetteer().lookup(city_input) if city_input else None
+        if local_city:
+            st.session_state['coords'] = {'lat': local_city['lat'], 'lon': local_city['lon']}
+        elif city_input:
+            st.warning("City not found in the offline gazetteer; showing saved data for your last location.")
+        dashboard_data = load_offline_data(st.session_state.get('coords'), {'lat': float(lat_manual), 'lon': float(lon_manual)})
+    else:
+        # Geocoding, IP fallback, weather and forecast all run concurrently on a shared session
+        dashboard_data = load_dashboard_data(
+            city_input,
+            st.session_state.get('coords'),
+            {'lat': float(lat_manual), 'lon': float(lon_manual)},
+            get_current_weather,
+            get_forecast,
+            OPENWEATHER_KEY,
+        )
+        # keep a local snapshot of this location fresh for offline use
+        SYNC.track(dashboard_data['lat'], dashboard_data['lon'], dashboard_data['weather'], dashboard_data['forecast'])
+    if city_input and not offline_mode:
+        if dashboard_data['geo']:
+            geo = dashboard_data['geo']
+            st.session_state['coords'] = {'lat': geo['lat'], 'lon': geo['lon']}
+            st.markdown(
+            f"<div style='color:#000;font-weight:600;'>Using coords for {city_input}: "
+            f"{geo['lat']:.6f}, {geo['lon']:.6f}</div>",
+            unsafe_allow_html=True
+        )
+        elif dashboard_data['geo_error']:
+            st.error("Geocoding failed: " + dashboard_data['geo_error'])
+        else:
+            st.warning("City not found (OpenWeather geocoding).")
 
 # capture posted message from geolocation (some Streamlit versions expose it differently)
 # We won't depend on it here; users can click "Use Manual Coordinates" to set coords explicitly.
 
-if st.session_state.get('coords') is None:
-    # Try IP geolocation fallback (fast)
-    try:
-        ipinfo = requests.get("https://ipinfo.io/json", timeout=5).json()
-        lat_ip, lon_ip = map(float, ipinfo['loc'].split(','))
-    except Exception:
-        lat_ip, lon_ip = lat_manual, lon_manual
-    display_lat, display_lon = lat_ip, lon_ip
-else:
-    display_lat = st.session_state['coords']['lat']
-    display_lon = st.session_state['coords']['lon']
-
-# ----------------------------
-# Weather + Forecast helpers
-# ----------------------------
-def get_current_weather(lat, lon, api_key=OPENWEATHER_KEY):
-    try:
-        url = "https://api.openweathermap.org/data/2.5/weather"
-        params = {"lat": lat, "lon": lon, "appid": api_key, "units": "metric"}
-        r = requests.get(url, params=params, timeout=8)
-        r.raise_for_status()
-        data = r.json()
-        return {
-            "city": data.get("name",""),
-            "country": data.get("sys",{}).get("country",""),
-            "temp": round(data["main"]["temp"]),
-            "feels_like": round(data["main"]["feels_like"]),
-            "humidity": data["main"]["humidity"],
-            "wind": data["wind"]["speed"],
-            "desc": data["weather"][0]["description"].title(),
-            "rain_1h": data.get("rain", {}).get("1h", 0),
-            "cod": data.get("cod",200)
-        }
-    except Exception:
-        return None
-
-def get_forecast(lat, lon, api_key=OPENWEATHER_KEY):
-    try:
-        url = "https://api.openweathermap.org/data/2.5/forecast"
-        params = {"lat": lat, "lon": lon, "appid": api_key, "units": "metric"}
-        r = requests.get(url, params=params, timeout=8)
-        r.raise_for_status()
-        return r.json()
-    except Exception:
-        return None
-
-def derive_risk_from_weather(weather):
-    if not weather:
-        return "Unknown", ["Weather data unavailable"]
-    rain = weather.get("rain_1h", 0)
-    reasons = []
-    level = "Low"
-    if rain >= 50:
-        level = "High"
-        reasons.append(f"Very heavy recent rainfall: {rain} mm/h")
-    elif rain >= 20:
-        level = "Moderate"
-        reasons.append(f"Significant recent rainfall: {rain} mm/h")
-    else:
-        reasons.append("No heavy rainfall detected in last hour")
-    # city-based bump
-    flood_prone = ["Mumbai","Chennai","Kolkata","Guwahati","Patna"]
-    if weather.get("city") in flood_prone and weather.get("rain_1h",0) >= 5:
-        level = "High"
-        reasons.append(f"{weather.get('city')} is flood-prone; small rains can escalate")
-    return level, reasons
-
-# ----------------------------
-# Safe Zone Locator Functions
-# ----------------------------
-def find_nearby_shelters(lat, lon, radius_km=10):
-    """Generate nearby shelters based on the current location"""
-    shelters = []
-    num_shelters = np.random.randint(5, 9)
-    for i in range(num_shelters):
-        angle = np.random.uniform(0, 2 * np.pi)
-        distance = np.random.uniform(0.5, radius_km) / 111  # Convert km to degrees
-        shelter_lat = lat + distance * np.cos(angle)
-        shelter_lon = lon + distance * np.sin(angle)
-        shelter_types = ["School", "Community Center", "Hospital", "Government Building", "Religious Center"]
-        names = ["Central", "North", "South", "East", "West", "Public", "Community"]
-        shelter_type = np.random.choice(shelter_types)
-        name_prefix = np.random.choice(names)
-        shelters.append({
-            "name": f"{name_prefix} {shelter_type}",
-            "lat": shelter_lat,
-            "lon": shelter_lon,
-            "type": shelter_type,
-            "capacity": np.random.randint(50, 501),
-            "occupancy": np.random.randint(0, 401),
-            "distance_km": round(distance * 111, 1)  # Convert back to km
-        })
-    shelters.sort(key=lambda x: x["distance_km"])
-    return shelters
-
-def get_evacuation_routes(lat, lon, shelters):
-    """Generate evacuation routes to the nearest shelters"""
-    routes = []
-    for i, shelter in enumerate(shelters[:3]):  # Top 3 nearest shelters
-        routes.append({
-            "shelter": shelter["name"],
-            "distance": shelter["distance_km"],
-            "direction": calculate_direction(lat, lon, shelter["lat"], shelter["lon"]),
-            "estimated_time": f"{int(shelter['distance_km'] * 2.5)} min"
-        })
-    return routes
-
-def calculate_direction(lat1, lon1, lat2, lon2):
-    """Calculate cardinal direction from point 1 to point 2"""
-    d_lon = lon2 - lon1
-    x = np.cos(np.radians(lat2)) * np.sin(np.radians(d_lon))
-    y = np.cos(np.radians(lat1)) * np.sin(np.radians(lat2)) - np.sin(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.cos(np.radians(d_lon))
-    bearing = np.arctan2(x, y)
-    bearing = np.degrees(bearing)
-    bearing = (bearing + 360) % 360
-    directions = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
-    index = round(bearing / 45) % 8
-    return directions[index]
-
 # ----------------------------
 # Emergency Contacts Data
 # ----------------------------
@@ -551,106 +558,185 @@ def get_emergency_contacts(lang_code='en'):
             {"name": "Rescue Team", "number": "+91-XXX-XXXX-XXX"}
         ]
     }
-    if lang_code != 'en' and GT_AVAILABLE:
+    if lang_code != 'en':
+        names = [c["name"] for category in contacts for c in contacts[category]]
+        translated = dict(zip(names, translate_list(names, lang_code)))
         for category in contacts:
             for contact in contacts[category]:
-                try:
-                    contact["name"] = TRANSLATOR.translate(contact["name"], dest=lang_code).text
-                except:
-                    pass
+                contact["name"] = translated[contact["name"]]
     return contacts
 
 # ----------------------------
 # MAIN DASHBOARD - dynamic update
 # ----------------------------
-st.markdown("---")
+divider()
 st.header("Dashboard")
 
-# Use coordinates: prefer session coords; else ip fallback
-if st.session_state.get('coords'):
-    lat0 = st.session_state['coords']['lat']
-    lon0 = st.session_state['coords']['lon']
-else:
-    try:
-        ipinfo = requests.get("https://ipinfo.io/json", timeout=5).json()
-        lat0, lon0 = map(float, ipinfo['loc'].split(','))
-    except Exception:
-        lat0, lon0 = lat_manual, lon_manual
+# Coordinates, weather and forecast were resolved together above (city > session coords > ip > manual)
+lat0, lon0 = dashboard_data['lat'], dashboard_data['lon']
+weather = dashboard_data['weather']
+forecast = dashboard_data['forecast']
 
-# Get weather and forecast for this location
-weather = get_current_weather(lat0, lon0)
-forecast = get_forecast(lat0, lon0)
+if offline_mode:
+    if dashboard_data['age_s'] is None:
+        st.warning("Offline mode: no saved data near this location yet. Open it once while online.")
+    else:
+        age_min = int(dashboard_data['age_s'] // 60)
+        age_text = f"{age_min} min" if age_min < 120 else f"{age_min // 60} h"
+        stale_css = "alert-danger" if age_min >= 180 else "alert-warning" if age_min >= 30 else "alert-safe"
+        # say where the data is from when it was saved for a neighbouring tile
+        origin_text = ""
+        if dashboard_data['from_km'] >= 1:
+            origin_city = (weather or {}).get('city')
+            origin_text = f" for {origin_city + ', ' if origin_city else 'a spot '}{dashboard_data['from_km']:.0f} km away"
+        offline_banner = f'<div class="alert-banner {stale_css}">📴 Offline mode — showing data saved {age_text} ago{origin_text}</div>'
+        if page_budget is not None:
+            page_budget.spend(offline_banner)
+        st.markdown(offline_banner, unsafe_allow_html=True)
 
 # Dynamic Flood Summary
+section("summary")
 st.subheader(ui_t("area_summary", st.session_state['lang']))
+# Scored once per rerun; the summary, alert count, map and advice all reuse it.
+# A learned model (FLOODSAFE_RISK_MODEL) also sees the forecast and the nearest gauge;
+# the latest ingested rainfall grid adds district-wide exceedance (floodsafe.raster).
+gauge = nearest_station(lat0, lon0)
+reading = GAUGES.change_since(gauge[0]) if gauge else None
+# a gauge that stopped reporting is shown as stale and kept out of the model
+gauge_stale = bool(reading) and reading[2] > STALE_SECONDS
+risk_level, risk_reasons = derive_risk_from_weather(weather, location_features(weather, forecast, None if gauge_stale else reading),
+                                                    district_rain(lat0, lon0))
 if weather:
-    risk_level, risk_reasons = derive_risk_from_weather(weather)
     summary_en = f"Current weather in {weather.get('city','Area')}: {weather.get('desc')}. Temperature: {weather.get('temp')}°C. Rain (1h): {weather.get('rain_1h',0)} mm. Flood risk: {risk_level}."
-    if GT_AVAILABLE:
-        try:
-            trans = TRANSLATOR.translate(summary_en, dest=st.session_state['lang'])
-            summary_text = trans.text
-        except Exception:
-            summary_text = summary_en
-    else:
-        summary_text = summary_en
+    with span("summary_translation"):
+        summary_text = translate_text(summary_en, st.session_state['lang'])
     css_class = "alert-danger" if risk_level=="High" else "alert-warning" if risk_level=="Moderate" else "alert-safe"
-    st.markdown(f'<div class="alert-banner {css_class}">{summary_text}<br><small>{" • ".join(risk_reasons)}</small></div>', unsafe_allow_html=True)
+    summary_html = f'<div class="alert-banner {css_class}">{summary_text}<br><small>{" • ".join(risk_reasons)}</small></div>'
+    if page_budget is not None:
+        page_budget.spend(summary_html)
+    st.markdown(summary_html, unsafe_allow_html=True)
 else:
     st.info("Weather data not available for this location.")
 
 # Top stats row
-col1, col2, col3, col4 = st.columns(4)
-with col1:
-    wl_val = round(4.2 + np.random.normal(0,0.07),2)
-    st.markdown(f'<div class="stat-card"><h4>Water Level</h4><div style="font-size:28px;font-weight:700;">{wl_val} m</div><div style="color:#ea4335;">+0.3m since yesterday</div></div>', unsafe_allow_html=True)
-with col2:
-    rain_val = weather.get('rain_1h',0) if weather else 0
-    st.markdown(f'<div class="stat-card"><h4>Rain (1h)</h4><div style="font-size:28px;font-weight:700;">{rain_val} mm</div><div style="color:#666;">Recent</div></div>', unsafe_allow_html=True)
-with col3:
-    alerts_count = 3 if (weather and derive_risk_from_weather(weather)[0]=="High") else 2 if (weather and derive_risk_from_weather(weather)[0]=="Moderate") else 1
-    st.markdown(f'<div class="stat-card"><h4>Active Alerts</h4><div style="font-size:28px;font-weight:700;">{alerts_count}</div><div style="color:#666;">Updated</div></div>', unsafe_allow_html=True)
-with col4:
-    st.markdown(f'<div class="stat-card"><h4>Nearby Shelters</h4><div style="font-size:28px;font-weight:700;">{len([1,2,3,4])}</div><div style="color:#666;">Within 10 km</div></div>', unsafe_allow_html=True)
-
-st.markdown("---")
+section("stats")
+if reading:
+    wl_val, wl_delta, wl_age = reading
+    if gauge_stale:
+        wl_note = f"{gauge[1]} (stale: last reading {wl_age / 3600:.0f}h ago)"
+        delta_html = f'<div style="color:#666;">{wl_note}</div>'
+    elif wl_delta is None:
+        wl_note = f"{gauge[1]} (no reading from 24h ago)"
+        delta_html = f'<div style="color:#666;">{wl_note}</div>'
+    else:
+        wl_note = f"{wl_delta:+.2f} m since yesterday"
+        delta_color = "#ea4335" if wl_delta > 0 else "#34a853"
+        delta_html = f'<div style="color:{delta_color};">{wl_note}</div>'
+    wl_text = f"{wl_val:.2f} m"
+else:
+    wl_text, wl_note = "n/a", "No gauge nearby"
+    delta_html = '<div style="color:#666;">No gauge nearby</div>'
+rain_val = weather.get('rain_1h',0) if weather else 0
+alerts_count = 3 if risk_level=="High" else 2 if risk_level=="Moderate" else 1
+shelter_registry = get_registry()
+# registered shelters within 10 km; without a registry the map shows three demo shelters
+shelters_count = len(shelter_registry.radius_indices(lat0, lon0, 10)[0]) if shelter_registry is not None else 3
+if battery_saver:
+    # one line instead of four styled cards
+    stats_line = f"Water level: {wl_text} ({wl_note}) · Rain (1h): {rain_val} mm · Active alerts: {alerts_count}"
+    page_budget.spend(stats_line)
+    st.markdown(stats_line)
+else:
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.markdown(f'<div class="stat-card"><h4>Water Level</h4><div style="font-size:28px;font-weight:700;">{wl_text}</div>{delta_html}</div>', unsafe_allow_html=True)
+    with col2:
+        st.markdown(f'<div class="stat-card"><h4>Rain (1h)</h4><div style="font-size:28px;font-weight:700;">{rain_val} mm</div><div style="color:#666;">Recent</div></div>', unsafe_allow_html=True)
+    with col3:
+        st.markdown(f'<div class="stat-card"><h4>Active Alerts</h4><div style="font-size:28px;font-weight:700;">{alerts_count}</div><div style="color:#666;">Updated</div></div>', unsafe_allow_html=True)
+    with col4:
+        st.markdown(f'<div class="stat-card"><h4>Nearby Shelters</h4><div style="font-size:28px;font-weight:700;">{shelters_count}</div><div style="color:#666;">Within 10 km</div></div>', unsafe_allow_html=True)
+
+divider()
 
 # Map area: centered to lat0, lon0 and colored circle for risk
+section("map")
 st.subheader(ui_t("flood_monitoring_map", st.session_state['lang']))
 
-m = folium.Map(location=[lat0, lon0], zoom_start=13 if not battery_saver else 12, control_scale=True)
-folium.Marker([lat0, lon0], popup="Selected Location", icon=folium.Icon(color="blue", icon="user")).add_to(m)
-shelters_demo = [
-    {"name":"Central High School","lat":lat0+0.003,"lon":lon0+0.004,"cap":500,"occ":320},
-    {"name":"Community Center","lat":lat0-0.004,"lon":lon0-0.003,"cap":300,"occ":150},
-    {"name":"City Hospital","lat":lat0+0.006,"lon":lon0-0.002,"cap":200,"occ":180}
-]
-for s in shelters_demo:
-    folium.Marker([s['lat'], s['lon']], popup=f"{s['name']} (Cap: {s['cap']}, Occ: {s['occ']})", icon=folium.Icon(color="green", icon="home")).add_to(m)
-if weather:
-    color_map = {"High":"#ea4335","Moderate":"#fbbc05","Low":"#34a853"}
-    folium.Circle([lat0, lon0], radius=3500 if risk_level=="High" else 2000 if risk_level=="Moderate" else 1200,
-                  color=color_map.get(risk_level,"#34a853"), fill=True, fill_opacity=0.25).add_to(m)
-
-try:
-    st_folium(m, width=900, height=500)
-except Exception:
-    st.error("Map requires streamlit-folium. Please install `streamlit-folium` to view interactive map.")
-    st.write(pd.DataFrame(shelters_demo))
+if shelter_registry is not None:
+    # every registered shelter within 25 km; large sets are clustered by render_map_html
+    map_idx, map_dist = shelter_registry.radius_indices(lat0, lon0, 25)
+    shelters_demo = shelter_registry.to_dicts(map_idx[:5], map_dist[:5])
+    marker_lat, marker_lon = shelter_registry.lat[map_idx], shelter_registry.lon[map_idx]
+    marker_labels = [f"{n} (Cap: {c}, Occ: {o})" for n, c, o in zip(shelter_registry.names[map_idx], shelter_registry.capacity[map_idx], shelter_registry.occupancy[map_idx])]
+else:
+    shelters_demo = [
+        {"name":"Central High School","lat":lat0+0.003,"lon":lon0+0.004,"cap":500,"occ":320},
+        {"name":"Community Center","lat":lat0-0.004,"lon":lon0-0.003,"cap":300,"occ":150},
+        {"name":"City Hospital","lat":lat0+0.006,"lon":lon0-0.002,"cap":200,"occ":180}
+    ]
+    marker_lat = [s['lat'] for s in shelters_demo]
+    marker_lon = [s['lon'] for s in shelters_demo]
+    marker_labels = [f"{s['name']} (Cap: {s['cap']}, Occ: {s['occ']})" for s in shelters_demo]
+
+# With a population plan (FLOODSAFE_POPULATION) the map, the text-only page and the shelter
+# search all route people to their planned shelters
+plan_shelters = (not offline_mode and planned_shelters(lat0, lon0)) or None
+
+# With a road network (FLOODSAFE_ROADS) the map shows the road route to the first recommended
+# shelter: the same capacity-aware choice (plan, else nearest with space) as the route list below
+map_route = None
+if get_router() is not None and shelter_registry is not None and not battery_saver:
+    map_routes = get_evacuation_routes(lat0, lon0, plan_shelters or find_nearby_shelters(lat0, lon0))
+    map_route = next((route for route in map_routes if route.get("path")), None)
+
+if battery_saver:
+    # No map at all: nearest shelters and routes as a few cached lines
+    lite_summary = compact_summary(lat0, lon0, weather, forecast, risk_level, risk_reasons, plan_shelters)
+    lite_lines = translate_list(["Nearest shelters:"] + lite_summary["shelters"] + ["Routes:"] + lite_summary["routes"], st.session_state['lang'])
+    page_budget.spend("  \n".join(lite_lines))
+    st.markdown("  \n".join(lite_lines))
+else:
+    # Cached by (tile, zoom, risk, marker-set hash); offline mode gets a static SVG sketch
+    try:
+        map_html = render_map_html(lat0, lon0, marker_lat, marker_lon, marker_labels,
+                                   risk_level if weather else None, zoom=13, static=offline_mode,
+                                   route=map_route["path"] if map_route else None)
+        st.components.v1.html(map_html, height=340 if offline_mode else 500)
+        if map_route:
+            st.caption(f"Recommended shelter by road: {map_route['shelter']}, "
+                       f"{map_route['distance']} km, ~{map_route['estimated_time']}")
+    except Exception:
+        import pandas as pd
+        st.error("Map requires folium. Please install `folium` to view interactive map.")
+        st.write(pd.DataFrame(shelters_demo))
 
 # ----------------------------
 # SAFE ZONE LOCATOR - Activated Feature anchor
 # ----------------------------
-st.markdown("---")
-st.markdown('<div id="safe-zone-locator" class="section-anchor"></div>', unsafe_allow_html=True)
+section("shelters")
+divider("safe-zone-locator")
 st.subheader(ui_t("safe_zone_locator", st.session_state['lang']))
 
 # Search for nearby shelters
 if st.button(ui_t("search_shelters", st.session_state['lang'])):
     with st.spinner(translate_text("Searching for nearby shelters...", st.session_state['lang'])):
-        time.sleep(1)
-        nearby_shelters = find_nearby_shelters(lat0, lon0)
-        evacuation_routes = get_evacuation_routes(lat0, lon0, nearby_shelters)
+        if offline_mode and dashboard_data.get('shelters'):
+            nearby_shelters = dashboard_data['shelters']
+        else:
+            nearby_shelters = find_nearby_shelters(lat0, lon0)
+            if not offline_mode:
+                save_snapshot(lat0, lon0, shelters=nearby_shelters)
+        # With a population plan (FLOODSAFE_POPULATION) routes follow the capacity-aware assignment
+        evacuation_routes = get_evacuation_routes(lat0, lon0, plan_shelters or nearby_shelters)
+    if battery_saver:
+        # compact lines, only as many as the page budget still allows
+        search_md = page_budget.fit(
+            [f"{s['name']} ({s['type']}): {s['distance_km']} km, {s['capacity'] - s['occupancy']} places free" for s in nearby_shelters[:5]]
+            + [f"{r['shelter']}: head {r['direction']}, {r['distance']} km, ~{r['estimated_time']}" for r in evacuation_routes])
+        if search_md:
+            st.markdown(search_md)
+    else:
         st.markdown(f"### {translate_text('Nearby Shelters', st.session_state['lang'])}")
         for i, shelter in enumerate(nearby_shelters[:5]):
             availability = shelter['capacity'] - shelter['occupancy']
@@ -674,25 +760,34 @@ if st.button(ui_t("search_shelters", st.session_state['lang'])):
 # ----------------------------
 # EMERGENCY CONTACTS - Activated Feature anchor
 # ----------------------------
-st.markdown("---")
-st.markdown('<div id="emergency-contacts" class="section-anchor"></div>', unsafe_allow_html=True)
+section("contacts")
+divider("emergency-contacts")
 st.subheader(ui_t("emergency_contacts", st.session_state['lang']))
 
 emergency_contacts = get_emergency_contacts(st.session_state['lang'])
-col1, col2 = st.columns(2)
-with col1:
-    st.markdown("#### National Emergency Numbers")
-    for contact in emergency_contacts['national']:
-        st.markdown(f"**{contact['name']}**: {contact['number']}")
-with col2:
-    st.markdown("#### Local Emergency Contacts")
-    for contact in emergency_contacts['local']:
-        st.markdown(f"**{contact['name']}**: {contact['number']}")
+if battery_saver:
+    page_budget.spend(contacts_line(emergency_contacts))
+    st.markdown(contacts_line(emergency_contacts))
+else:
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### National Emergency Numbers")
+        for contact in emergency_contacts['national']:
+            st.markdown(f"**{contact['name']}**: {contact['number']}")
+    with col2:
+        st.markdown("#### Local Emergency Contacts")
+        for contact in emergency_contacts['local']:
+            st.markdown(f"**{contact['name']}**: {contact['number']}")
 
 if st.button(translate_text("Show Emergency Call Instructions", st.session_state['lang'])):
-    st.markdown(f"""
+    call_text = translate_text("In a real emergency, dial the numbers above. Save these numbers in your phone for quick access.", st.session_state['lang'])
+    if battery_saver:
+        if page_budget.take(call_text):
+            st.markdown(call_text)
+    else:
+        st.markdown(f"""
     <div style="color:black; background-color:#f0f0f0; padding:10px; border-radius:5px;">
-        {translate_text("In a real emergency, dial the numbers above. Save these numbers in your phone for quick access.", st.session_state['lang'])}
+        {call_text}
     </div>
     """, unsafe_allow_html=True)
 
@@ -700,99 +795,85 @@ if st.button(translate_text("Show Emergency Call Instructions", st.session_state
 # ----------------------------
 # EVACUATION ROUTES - Activated Feature anchor
 # ----------------------------
-st.markdown("---")
-st.markdown('<div id="evacuation-routes" class="section-anchor"></div>', unsafe_allow_html=True)
+section("evacuation")
+divider("evacuation-routes")
 st.subheader(ui_t("evacuation_routes", st.session_state['lang']))
 
 if weather:
-    if risk_level == "High":
-        st.markdown(f"""
-        <div style="color:black; background-color:#ffcccc; padding:10px; border-radius:5px;">
-            <strong>🚨 HIGH RISK:</strong> {translate_text("Immediate evacuation recommended. Follow these steps:", st.session_state['lang'])}
-        </div>
-        """, unsafe_allow_html=True)
-        advice = [
-            translate_text("1. Gather essential items: documents, medicines, water, flashlight", st.session_state['lang']),
-            translate_text("2. Turn off electricity and gas at the main valves", st.session_state['lang']),
-            translate_text("3. Move to higher ground or designated shelter immediately", st.session_state['lang']),
-            translate_text("4. Avoid walking through moving water", st.session_state['lang']),
-            translate_text("5. Do not attempt to drive through flooded areas", st.session_state['lang'])
-        ]
-    elif risk_level == "Moderate":
-        st.markdown(f"""
-        <div style="color:black; background-color:#fff3cd; padding:10px; border-radius:5px;">
-            <strong>⚠️ MODERATE RISK:</strong> {translate_text("Prepare for possible evacuation. Recommended actions:", st.session_state['lang'])}
-        </div>
-        """, unsafe_allow_html=True)
-        advice = [
-            translate_text("1. Prepare an emergency kit with essential supplies", st.session_state['lang']),
-            translate_text("2. Identify safe routes to higher ground or shelters", st.session_state['lang']),
-            translate_text("3. Monitor weather updates regularly", st.session_state['lang']),
-            translate_text("4. Secure important documents in waterproof containers", st.session_state['lang']),
-            translate_text("5. Charge all electronic devices", st.session_state['lang'])
-        ]
-    else:
-        st.markdown(f"""
-        <div style="color:black; background-color:#d4edda; padding:10px; border-radius:5px;">
-            <strong>✅ LOW RISK:</strong> {translate_text("No immediate evacuation needed. Stay informed:", st.session_state['lang'])}
-        </div>
-        """, unsafe_allow_html=True)
-        advice = [
-            translate_text("1. Stay updated with weather forecasts", st.session_state['lang']),
-            translate_text("2. Know your evacuation routes and shelter locations", st.session_state['lang']),
-            translate_text("3. Prepare an emergency kit as a precaution", st.session_state['lang']),
-            translate_text("4. Sign up for local emergency alerts", st.session_state['lang']),
-            translate_text("5. Identify the safest areas of your home on higher floors", st.session_state['lang'])
-        ]
+    advice_banner = {
+        "High": ("#ffcccc", "🚨 HIGH RISK:"),
+        "Moderate": ("#fff3cd", "⚠️ MODERATE RISK:"),
+    }.get(risk_level, ("#d4edda", "✅ LOW RISK:"))
+    advice_en = EVACUATION_ADVICE.get(risk_level, EVACUATION_ADVICE["Low"])
+    advice_text = translate_text(advice_en["banner"], st.session_state['lang'])
+    advice = translate_list(advice_en["steps"], st.session_state['lang'])
 else:
+    advice_text = None
     advice = [translate_text("Weather data not available to provide evacuation guidance.", st.session_state['lang'])]
 
-# Render advice list in black
-for item in advice:
-    st.markdown(f"<div style='color:black;'>{item}</div>", unsafe_allow_html=True)
+if battery_saver:
+    advice_md = "  \n".join(([f"**{advice_banner[1]}** {advice_text}"] if advice_text else []) + advice)
+    page_budget.spend(advice_md)
+    st.markdown(advice_md)
+else:
+    if advice_text:
+        st.markdown(f"""
+    <div style="color:black; background-color:{advice_banner[0]}; padding:10px; border-radius:5px;">
+        <strong>{advice_banner[1]}</strong> {advice_text}
+    </div>
+    """, unsafe_allow_html=True)
+    # Render advice list in black
+    for item in advice:
+        st.markdown(f"<div style='color:black;'>{item}</div>", unsafe_allow_html=True)
 
 
 # ----------------------------
 # Analytics: Forecast charts using OpenWeather forecast data
 # ----------------------------
-st.markdown("---")
+section("analytics")
+divider()
 st.subheader("Analytics (Rain Forecast & Simple Insights)")
 
-if forecast and 'list' in forecast:
-    points = forecast['list'][:12]
-    times = [datetime.fromtimestamp(p['dt']) for p in points]
-    rains = [p.get('rain', {}).get('3h', 0) for p in points]
-    temps = [p['main']['temp'] for p in points]
-    df_fore = pd.DataFrame({"time": times, "rain_mm": rains, "temp": temps})
-    fig1 = px.bar(df_fore, x="time", y="rain_mm", title="Rain Forecast (next ~36 hours, per 3h)", labels={"rain_mm":"Rain (mm)"})
+if battery_saver:
+    # Text only: the 24h outlook instead of three plotly charts
+    lite_forecast = compact_summary(lat0, lon0, weather, forecast, risk_level, risk_reasons, plan_shelters)["forecast"]
+    lite_forecast = translate_text(lite_forecast, st.session_state['lang']) if lite_forecast else "Forecast data not available."
+    page_budget.spend(lite_forecast)
+    st.markdown(lite_forecast)
+elif forecast and forecast.get('list'):
+    # Full 5-day horizon, parsed once per forecast payload (with 6h/24h/72h rolling sums)
+    df_fore = forecast_frame(forecast)
+    rains = df_fore["rain_mm"].to_numpy()
+    peak_slot, peak_mm_h = peak_intensity(rains)
+    mcol1, mcol2, mcol3, mcol4 = st.columns(4)
+    mcol1.metric("Max 6h rain", f"{df_fore['rain_6h'].max():.1f} mm")
+    mcol2.metric("Max 24h rain", f"{df_fore['rain_24h'].max():.1f} mm")
+    mcol3.metric("Max 72h rain", f"{df_fore['rain_72h'].max():.1f} mm")
+    mcol4.metric("Peak intensity", f"{peak_mm_h:.1f} mm/h", df_fore['time'].iloc[int(peak_slot)].strftime("%a %H:%M"), delta_color="off")
+    # Built once per forecast payload (downsampled, WebGL when dense) and shared by all sessions
+    fig1, fig2, fig_pie = forecast_figures(forecast)
     st.plotly_chart(fig1, use_container_width=True)
-    fig2 = px.line(df_fore, x="time", y="temp", markers=True, title="Temperature Forecast (next ~36 hours)")
     st.plotly_chart(fig2, use_container_width=True)
-    high_slots = sum(1 for r in rains if r >= 5)
-    med_slots = sum(1 for r in rains if 1 <= r < 5)
-    low_slots = sum(1 for r in rains if r == 0)
-    df_pie = pd.DataFrame({"category":["High (>=5mm)","Medium (1-5mm)","Low (0mm)"], "count":[high_slots, med_slots, low_slots]})
-    fig_pie = px.pie(df_pie, names="category", values="count", title="Rain Intensity Slots in Forecast")
     st.plotly_chart(fig_pie, use_container_width=True)
 else:
     st.warning("Forecast data not available. Try again later or check your API key / network.")
 
+if gauge and not battery_saver:
+    # Months of gauge history come from the coarsest time-series tier that still resolves them
+    gauge_fig = gauge_figure(gauge[0], gauge[1], days=90)
+    if gauge_fig is not None:
+        st.plotly_chart(gauge_fig, use_container_width=True)
+
 # ----------------------------
 # Safety guidelines (translated) and features grid
 # ----------------------------
-st.markdown("---")
+section("guidelines")
+divider()
 st.subheader(translate_text("Safety Guidelines", st.session_state['lang']))
-guidelines_en = [
-    "Before: Prepare an emergency kit, store food & water, move valuables to higher ground.",
-    "During: Move to higher ground, avoid walking through flood water, avoid electrical hazards.",
-    "After: Avoid flood water, disinfect surfaces, check for structural damage."
-]
-if GT_AVAILABLE:
-    guidelines_trans = [TRANSLATOR.translate(g, dest=st.session_state['lang']).text if st.session_state['lang']!='en' else g for g in guidelines_en]
-else:
-    guidelines_trans = guidelines_en
-for g in guidelines_trans:
-    st.write("• " + g)
+guidelines_trans = translate_list(SAFETY_GUIDELINES, st.session_state['lang'])
+guidelines_md = "\n".join("- " + g for g in guidelines_trans)
+if page_budget is None or page_budget.take(guidelines_md):
+    st.markdown(guidelines_md)
 
 st.subheader("Emergency Features")
 # NOTE: The duplicate "Emergency Features" section that used to appear in main content
@@ -801,25 +882,24 @@ st.subheader("Emergency Features")
 # ----------------------------
 # Recent Alerts (demo) - anchor for View Alerts
 # ----------------------------
-st.markdown("---")
-st.markdown('<div id="view-alerts" class="section-anchor"></div>', unsafe_allow_html=True)
+section("alerts")
+divider("view-alerts")
 st.subheader(translate_text("Recent Alerts", st.session_state['lang']))
-demo_alerts = [
-    {'type':'danger','title':'Flood Warning','message':'Heavy rainfall expected in next 24 hours'},
-    {'type':'warning','title':'River Overflow','message':'River level rising above warning mark'},
-    {'type':'info','title':'Shelter Opened','message':'New shelter active at City College'}
-]
-for a in demo_alerts:
+for a in DEMO_ALERTS:
     cls = "alert-danger" if a['type']=='danger' else "alert-warning" if a['type']=='warning' else "alert-safe"
     title_t = translate_text(a['title'], st.session_state['lang'])
     msg_t = translate_text(a['message'], st.session_state['lang'])
+    if page_budget is not None:
+        if page_budget.take(f"**{title_t}**: {msg_t}"):
+            st.markdown(f"**{title_t}**: {msg_t}")
+        continue
     st.markdown(f'<div class="alert-banner {cls}"><strong>{title_t}</strong><div style="margin-top:6px;">{msg_t}</div></div>', unsafe_allow_html=True)
 
 # ----------------------------
 # SOS button (WhatsApp link) and floating visual SOS - add SOS anchor above
 # ----------------------------
-st.markdown("---")
-st.markdown('<div id="sos-section" class="section-anchor"></div>', unsafe_allow_html=True)
+section("sos")
+divider("sos-section")
 st.subheader(translate_text("SOS", st.session_state['lang']))
 if st.button(translate_text("🚨 Send SOS via WhatsApp", st.session_state['lang']), key="send_sos"):
     if st.session_state.get('coords'):
@@ -828,9 +908,25 @@ if st.button(translate_text("🚨 Send SOS via WhatsApp", st.session_state['lang
         msg = f"🚨 SOS! I need help. My location: https://www.google.com/maps?q={la},{lo}"
     else:
         msg = "🚨 SOS! I need help. (location unavailable)"
+    send_emergency_sms()
     wa_link = "https://wa.me/?text=" + requests.utils.quote(msg)
     st.markdown(f"[Open WhatsApp to send SOS]({wa_link})")
 
 # Floating SOS visual button (red gradient)
-st.markdown(f'<div class="sos-button">SOS</div>', unsafe_allow_html=True)
-
+if not battery_saver:
+    st.markdown(f'<div class="sos-button">SOS</div>', unsafe_allow_html=True)
+if page_budget is not None and page_budget.dropped:
+    st.caption(f"Battery saver: {page_budget.dropped} item(s) left out to stay within the {page_budget.limit:,}-byte page budget.")
+
+# ----------------------------
+# Timing debug panel (?debug=1 or FLOODSAFE_DEBUG_PANEL=1)
+# ----------------------------
+rerun_record = end_rerun()
+if rerun_record and (st.query_params.get("debug") == "1" or os.environ.get("FLOODSAFE_DEBUG_PANEL") == "1"):
+    import pandas as pd
+    with st.expander(f"⏱️ Rerun #{rerun_record['rerun']}: {rerun_record['duration_ms']:.0f} ms", expanded=True):
+        st.markdown(waterfall_html(rerun_record), unsafe_allow_html=True)
+        st.caption("Blue: script thread; green: fetch pool")
+        history = recent_reruns(rerun_record['session'])[-10:]
+        st.write(pd.DataFrame({"rerun": [r['rerun'] for r in history], "ms": [r['duration_ms'] for r in history]}))
+        st.json({name: {"hits": h, "misses": m} for name, (h, m) in cache_stats().items()})